@@ -0,0 +1,40 @@
+"""keyset pagination indexes
+
+Revision ID: d1e2f3a4b5c6
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e2f3a4b5c6'
+down_revision: Union[str, Sequence[str], None] = 'c4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# списки отдаются по (created_at, id) в пределах пользователя, индекс читается в обратном порядке
+KEYSET_INDEXES = {
+    'ix_tasks_user_id_created_at_id': 'tasks',
+    'ix_models_user_id_created_at_id': 'models',
+    'ix_datasets_user_id_created_at_id': 'datasets',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table in KEYSET_INDEXES.items():
+            op.create_index(name, table, ['user_id', 'created_at', 'id'], unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in KEYSET_INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
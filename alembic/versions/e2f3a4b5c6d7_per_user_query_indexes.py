@@ -0,0 +1,47 @@
+"""per-user query indexes
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f3a4b5c6d7'
+down_revision: Union[str, Sequence[str], None] = 'd1e2f3a4b5c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не работает внутри транзакции; if_not_exists - чтобы повторный запуск после сбоя прошел
+    with op.get_context().autocommit_block():
+        # свои модели пользователя (без системных)
+        op.create_index('ix_models_user_id_not_system', 'models', ['user_id'], unique=False,
+                        postgresql_where=sa.text('is_system IS false'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        # системные модели: вторая ветка OR в списке моделей и прогрев кеша
+        op.create_index('ix_models_system_created_at_id', 'models', ['created_at', 'id'], unique=False,
+                        postgresql_where=sa.text('is_system IS true'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_models_dataset_id', 'models', ['dataset_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_tasks_model_id', 'tasks', ['model_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_model_id', table_name='tasks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_models_dataset_id', table_name='models', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_models_system_created_at_id', table_name='models', postgresql_concurrently=True,
+                      if_exists=True)
+        op.drop_index('ix_models_user_id_not_system', table_name='models', postgresql_concurrently=True,
+                      if_exists=True)
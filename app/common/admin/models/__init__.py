@@ -1,4 +1,5 @@
 from .task_admin import TaskAdmin
 from .user_admin import UserAdmin
 from .model_admin import ModelAdmin
-from .dataset_admin import DatasetAdmin
\ No newline at end of file
+from .dataset_admin import DatasetAdmin
+from .cache_admin import CacheAdmin
@@ -0,0 +1,17 @@
+from sqladmin import BaseView, expose
+from starlette.requests import Request
+
+from app.infrastructure.services.cache import cache_service
+
+
+class CacheAdmin(BaseView):
+    name = "Cache"
+    icon = "fa-solid fa-bolt"
+
+    @expose("/cache", methods=["GET"])
+    async def cache_page(self, request: Request):
+        return await self.templates.TemplateResponse(
+            request,
+            "cache.html",
+            context={"stats": cache_service.stats(), "families": cache_service.family_stats()},
+        )
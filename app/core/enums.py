@@ -37,6 +37,9 @@ class CacheTTL(IntEnum):
     MODELS = 5 * 60
     TASKS = 5 * 60
     USER = 5 * 60
+    LISTS_STALE = 5 * 60
+    MISSING = 30
+    REPLICA_READS = 60 * 60
 
 
 class CacheKeysObject(str, Enum):
@@ -44,22 +47,27 @@ class CacheKeysObject(str, Enum):
     MODEL = "model"
     TASK = "task"
     USER = "user"
+    REPLICA_READS = "replica_reads"
 
     @staticmethod
     def dataset(dataset_id: UUID):
-        return f"{CacheKeysObject.DATASET}:{dataset_id}"
+        return f"{CacheKeysObject.DATASET.value}:{dataset_id}"
 
     @staticmethod
     def model(model_id: UUID):
-        return f"{CacheKeysObject.MODEL}:{model_id}"
+        return f"{CacheKeysObject.MODEL.value}:{model_id}"
 
     @staticmethod
     def task(task_id: UUID):
-        return f"{CacheKeysObject.TASK}:{task_id}"
+        return f"{CacheKeysObject.TASK.value}:{task_id}"
 
     @staticmethod
     def user(user_id: UUID):
-        return f"{CacheKeysObject.USER}:{user_id}"
+        return f"{CacheKeysObject.USER.value}:{user_id}"
+
+    @staticmethod
+    def replica_reads(user_id: UUID):
+        return f"{CacheKeysObject.REPLICA_READS.value}:{user_id}"
 
 
 class CacheKeysList(str, Enum):
@@ -67,17 +75,38 @@ class CacheKeysList(str, Enum):
     MODELS = "models"
     TASKS = "tasks"
 
+    def pattern(self, user_id: UUID) -> str:
+        # все ключи семейства одного пользователя - для delete_pattern после изменений
+        return f"{self.value}:{user_id}:*"
+
+    @staticmethod
+    def page(skip: int = 0, cursor: Optional[str] = None) -> str:
+        # в режиме курсора вместо смещения - курсор с префиксом "c", чтобы ключи режимов не пересекались
+        return f"c{cursor}" if cursor is not None else str(skip)
+
     @staticmethod
-    def datasets(user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None):
+    def datasets(user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None,
+                 cursor: Optional[str] = None):
         name_contains_val = name_contains if name_contains else ""
 
-        return f"{CacheKeysList.DATASETS}:{user_id}:{skip}:{limit}:{name_contains_val}"
+        return (f"{CacheKeysList.DATASETS.value}:{user_id}:{CacheKeysList.page(skip, cursor)}:{limit}:"
+                f"{name_contains_val}")
 
     @staticmethod
-    def models(user_id: UUID, skip: int = 0, limit: int = 100, dataset_id: Optional[UUID] = None) -> str:
+    def models(user_id: UUID, skip: int = 0, limit: int = 100, dataset_id: Optional[UUID] = None,
+               cursor: Optional[str] = None, include_system: bool = True) -> str:
         d_val = str(dataset_id) if dataset_id else "all"
-        return f"{CacheKeysList.MODELS}:{user_id}:{skip}:{limit}:{d_val}"
+        return (f"{CacheKeysList.MODELS.value}:{user_id}:{CacheKeysList.page(skip, cursor)}:{limit}:{d_val}:"
+                f"{int(include_system)}")
+
+    @staticmethod
+    def datasets_search(user_id: UUID, query: str, skip: int = 0, limit: int = 100) -> str:
+        return f"{CacheKeysList.DATASETS.value}:{user_id}:search:{skip}:{limit}:{query}"
+
+    @staticmethod
+    def models_search(user_id: UUID, query: str, skip: int = 0, limit: int = 100, include_system: bool = True) -> str:
+        return f"{CacheKeysList.MODELS.value}:{user_id}:search:{skip}:{limit}:{int(include_system)}:{query}"
 
     @staticmethod
-    def tasks(user_id: UUID, skip: int = 0, limit: int = 100) -> str:
-        return f"{CacheKeysList.TASKS}:{user_id}:{skip}:{limit}"
+    def tasks(user_id: UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> str:
+        return f"{CacheKeysList.TASKS.value}:{user_id}:{CacheKeysList.page(skip, cursor)}:{limit}"
@@ -6,3 +6,5 @@ from .storage_interface import IStorageRepository
 from .cache_interface import ICacheRepository
 from .registration_confirmation_interface import IRegistrationConfirmationRepository
 from .mail_interface import IMailService
+from .unit_of_work_interface import IUnitOfWork
+from .outbox_interface import IOutboxRepository, OutboxEntry
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional
 
 
 class ICacheRepository(ABC):
@@ -18,3 +18,16 @@ class ICacheRepository(ABC):
     @abstractmethod
     async def delete_pattern(self, pattern: str) -> None:
         ...
+
+    @abstractmethod
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], expire: int | None = None,
+                          stale_after: int | None = None, missing_ttl: int | None = None) -> Any:
+        ...
+
+    @abstractmethod
+    async def is_known_missing(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def mark_missing(self, key: str, expire: int | None = None) -> None:
+        ...
@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
+from app.core.pagination import Cursor
 from app.infrastructure.persistence.models import Dataset
 from app.presentation import schemas
 
@@ -16,10 +18,19 @@ class IDatasetRepository(ABC):
         ...
 
     @abstractmethod
-    async def get_datasets(self, user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None) -> \
-    List[Optional[Dataset]]:
+    async def get_datasets(self, user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None,
+                           cursor: Optional[Cursor] = None) -> List[Optional[Dataset]]:
+        ...
+
+    @abstractmethod
+    async def search_datasets(self, user_id: UUID, query: str, skip: int = 0, limit: int = 100) -> List[Dataset]:
         ...
 
     @abstractmethod
     async def delete_dataset_by_id(self, dataset_id: UUID):
         ...
+
+    @abstractmethod
+    async def delete_datasets(self, user_id: UUID, dataset_ids: Optional[list[UUID]] = None,
+                              older_than: Optional[datetime] = None) -> list[Dataset]:
+        ...
@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
+from app.core.pagination import Cursor
 from app.infrastructure.persistence.models import Model
 from app.presentation import schemas
 
@@ -17,10 +19,19 @@ class IModelRepository(ABC):
 
     @abstractmethod
     async def get_models(self, user_id: UUID, include_system: bool, skip: int = 0, limit: int = 100,
-                         dataset_id: Optional[UUID] = None
+                         dataset_id: Optional[UUID] = None, cursor: Optional[Cursor] = None
                          ) -> List[Optional[Model]]:
         ...
 
+    @abstractmethod
+    async def search_models(self, user_id: UUID, query: str, skip: int = 0, limit: int = 100,
+                            include_system: bool = True) -> List[Model]:
+        ...
+
+    @abstractmethod
+    async def get_system_models(self) -> list[Model]:
+        ...
+
     @abstractmethod
     async def get_models_by_dataset_id(self, dataset_id: UUID, user_id: UUID) -> Optional[list[Model]]:
         ...
@@ -32,3 +43,8 @@ class IModelRepository(ABC):
     @abstractmethod
     async def delete_model_by_id(self, model_id: UUID, user_id: UUID) -> None:
         ...
+
+    @abstractmethod
+    async def delete_models(self, user_id: UUID, model_ids: Optional[list[UUID]] = None,
+                            dataset_id: Optional[UUID] = None, older_than: Optional[datetime] = None) -> list[Model]:
+        ...
@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+
+@dataclass(frozen=True)
+class OutboxEntry:
+    id: int
+    task_id: UUID
+    queue: str
+    payload: dict
+    # сколько раз сообщение уже забирали на отправку, включая текущую попытку
+    attempts: int
+    created_at: Optional[datetime] = None
+
+
+class IOutboxRepository(ABC):
+    @abstractmethod
+    async def add_message(self, task_id: UUID, queue: str, payload: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def claim_messages(self, limit: int, lease_seconds: float) -> list[OutboxEntry]:
+        ...
+
+    @abstractmethod
+    async def delete_messages(self, message_ids: list[int]) -> None:
+        ...
+
+    @abstractmethod
+    async def reschedule_message(self, message_id: int, available_at: datetime, error: str) -> None:
+        ...
@@ -10,6 +10,10 @@ class IStorageRepository(ABC):
     async def delete_file(self, object_name: str, bucket: str) -> None:
         ...
 
+    @abstractmethod
+    async def delete_files(self, object_names: list[str], bucket: str) -> list[str]:
+        ...
+
     @abstractmethod
     async def get_presigned_file_url(self, object_name: str, bucket: str, expires: int = 3600) -> str:
         ...
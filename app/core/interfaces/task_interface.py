@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
+from app.core.pagination import Cursor
 from app.infrastructure.persistence.models import Task
 from app.presentation import schemas
 
@@ -21,7 +23,11 @@ class ITaskRepository(ABC):
 
     @abstractmethod
     async def get_tasks(self, skip: int = 0, limit: int = 100, user_id: Optional[UUID] = None,
-                        model_id: Optional[UUID] = None) -> list[Task]:
+                        model_id: Optional[UUID] = None, cursor: Optional[Cursor] = None) -> list[Task]:
+        ...
+
+    @abstractmethod
+    async def get_recently_active_user_ids(self, limit: int) -> list[UUID]:
         ...
 
     @abstractmethod
@@ -29,15 +35,14 @@ class ITaskRepository(ABC):
         ...
 
     @abstractmethod
-    async def update_task_status(
-        self,
-        task_id: UUID,
-        status: str,
-        output_path: Optional[str] = None,
-        error_msg: Optional[str] = None,
-    ) -> Optional[Task]:
+    async def update_task_statuses(self, updates: list[dict]) -> list[Task]:
         ...
 
     @abstractmethod
     async def delete_task_by_id(self, task_id: UUID):
         ...
+
+    @abstractmethod
+    async def delete_tasks(self, user_id: UUID, task_ids: Optional[list[UUID]] = None, status: Optional[str] = None,
+                           older_than: Optional[datetime] = None) -> list[Task]:
+        ...
@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+
+
+class IUnitOfWork(ABC):
+    @abstractmethod
+    async def commit(self) -> None:
+        ...
+
+    @abstractmethod
+    async def rollback(self) -> None:
+        ...
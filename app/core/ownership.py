@@ -0,0 +1,19 @@
+from typing import Optional
+from uuid import UUID
+
+# запись сущности хранится в кеше одним значением: "<user_id владельца>\n<json>", у системных - пустой владелец;
+# так проверка доступа на попадании в кеш сравнивает байты заголовка и не разбирает JSON целиком
+OWNER_SEPARATOR = b"\n"
+
+
+def pack_owned(owner_id: Optional[UUID], body: bytes) -> bytes:
+    return (str(owner_id) if owner_id else "").encode() + OWNER_SEPARATOR + body
+
+
+def unpack_owned(entry: bytes) -> tuple[Optional[bytes], bytes]:
+    owner, _, body = entry.partition(OWNER_SEPARATOR)
+    return owner or None, body
+
+
+def owner_key(user_id: UUID) -> bytes:
+    return str(user_id).encode()
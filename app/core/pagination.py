@@ -0,0 +1,49 @@
+import base64
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+from uuid import UUID
+
+from app.core.exceptions import ValidationError
+
+# курсор - (created_at, id) последней строки страницы, следующая страница начинается строго после неё
+Cursor = tuple[datetime, UUID]
+
+# страница в режиме курсора хранится в кеше одним значением: "<next_cursor>\n<json>"
+PAGE_SEPARATOR = b"\n"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_CURSOR_FORMAT = struct.Struct(">q16s")  # микросекунды от эпохи + 16 байт UUID
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(_CURSOR_FORMAT.pack(micros, row_id.bytes)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    # пустой курсор - первая страница в режиме курсора
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        micros, row_id = _CURSOR_FORMAT.unpack(raw)
+    except (ValueError, struct.error):
+        raise ValidationError("Invalid cursor")
+    return _EPOCH + timedelta(microseconds=micros), UUID(bytes=row_id)
+
+
+def next_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def pack_page(body: bytes, cursor: Optional[str]) -> bytes:
+    return (cursor or "").encode() + PAGE_SEPARATOR + body
+
+
+def unpack_page(page: bytes) -> tuple[bytes, Optional[str]]:
+    cursor, _, body = page.partition(PAGE_SEPARATOR)
+    return body, cursor.decode() or None
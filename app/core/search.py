@@ -0,0 +1,13 @@
+from app.core.exceptions import ValidationError
+
+MAX_SEARCH_QUERY_LENGTH = 255
+
+
+def normalize_search_query(query: str) -> str:
+    # pg_trgm не различает регистр и лишние пробелы, так что "Yolo " и "yolo" - один ключ кеша и один запрос
+    normalized = " ".join(query.split()).lower()
+    if not normalized:
+        raise ValidationError("Search query must not be empty")
+    if len(normalized) > MAX_SEARCH_QUERY_LENGTH:
+        raise ValidationError(f"Search query is longer than {MAX_SEARCH_QUERY_LENGTH} characters")
+    return normalized
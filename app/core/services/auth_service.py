@@ -8,7 +8,7 @@ from jwt import InvalidTokenError
 from app.common.security import create_access_token, create_refresh_token, decode_token
 from app.common.security.hashing import get_password_hash_async, verify_password_async
 from app.core.exceptions import MailDeliveryError, ServiceUnavailableError, UnauthorizedError, ValidationError
-from app.core.interfaces import IMailService, IRegistrationConfirmationRepository, IUserRepository
+from app.core.interfaces import IMailService, IRegistrationConfirmationRepository, IUnitOfWork, IUserRepository
 from app.infrastructure.config import settings
 from app.presentation.schemas import (
     LoginRequest,
@@ -26,10 +26,12 @@ class AuthService:
             user_repository: IUserRepository,
             confirmation_repository: IRegistrationConfirmationRepository,
             mail_service: IMailService,
+            uow: IUnitOfWork,
     ):
         self.user_repo = user_repository
         self.confirmation_repo = confirmation_repository
         self.mail_service = mail_service
+        self.uow = uow
 
     async def register(self, user_create: UserCreate) -> RegistrationCodeSent:
         existing_user = await self.user_repo.get_user_by_email(str(user_create.email))
@@ -47,11 +49,13 @@ class AuthService:
             code_hash=code_hash,
             expires_at=self._confirmation_expires_at(),
         )
+        await self.uow.commit()
 
         try:
             await self.mail_service.send_registration_confirmation(email, code)
         except MailDeliveryError:
             await self.confirmation_repo.delete_by_email(email)
+            await self.uow.commit()
             raise ServiceUnavailableError("Could not send registration confirmation email")
 
         return RegistrationCodeSent(detail="Registration confirmation code sent")
@@ -66,12 +70,15 @@ class AuthService:
         if not confirmation:
             raise ValidationError("Registration confirmation code was not requested")
 
+        # отказы ниже тоже меняют состояние (счетчик попыток, удаление кода) - фиксируем до исключения
         if self._is_confirmation_expired(confirmation.expires_at):
             await self.confirmation_repo.delete_by_email(email)
+            await self.uow.commit()
             raise ValidationError("Registration confirmation code expired")
 
         if confirmation.attempts >= settings.REGISTRATION_CODE_MAX_ATTEMPTS:
             await self.confirmation_repo.delete_by_email(email)
+            await self.uow.commit()
             raise ValidationError("Too many confirmation attempts")
 
         expected_code_hash = self._hash_confirmation_code(email, confirm_request.code)
@@ -79,13 +86,16 @@ class AuthService:
             attempts = await self.confirmation_repo.increment_attempts(email)
             if attempts >= settings.REGISTRATION_CODE_MAX_ATTEMPTS:
                 await self.confirmation_repo.delete_by_email(email)
+                await self.uow.commit()
                 raise ValidationError("Too many confirmation attempts")
+            await self.uow.commit()
             raise ValidationError("Invalid registration confirmation code")
 
         created_user = await self.user_repo.create_user(
             UserCreate(email=confirm_request.email, password=confirmation.hashed_password)
         )
         await self.confirmation_repo.delete_by_email(email)
+        await self.uow.commit()
         new_user = await self.user_repo.get_user_by_email(email) or created_user
 
         return self._create_token_pair(new_user)
@@ -1,19 +1,48 @@
-from typing import Optional
+from contextlib import nullcontext
+from datetime import datetime
+from typing import AsyncContextManager, Callable, Optional
 from uuid import UUID
 
+from pydantic import TypeAdapter
+
 from app.core.enums import CacheKeysList, CacheKeysObject, CacheTTL
 from app.core.exceptions import NotFoundError
-from app.core.interfaces import ICacheRepository, IDatasetRepository, IStorageRepository
+from app.core.search import normalize_search_query
+from app.core.interfaces import ICacheRepository, IDatasetRepository, IStorageRepository, IUnitOfWork
+from app.core.ownership import owner_key, pack_owned, unpack_owned
+from app.core.pagination import Cursor, decode_cursor, next_cursor, pack_page, unpack_page
 from app.core.validation import validate_dataset_archive
 from app.infrastructure.config import settings
 from app.presentation.schemas import DatasetCreate, DatasetRead
 
+# в кеше лежат уже готовые JSON-ответы, роутеры отдают их без повторной валидации
+dataset_list_adapter = TypeAdapter(list[DatasetRead])
+
+
+async def ensure_dataset_exists(dataset_repo: IDatasetRepository, cache_repo: ICacheRepository, dataset_id: UUID,
+                                user_id: UUID):
+    # Единая проверка для всех сервисов. Поиск идет без фильтра по пользователю, чтобы отрицательная запись
+    # в кеше была общей для всех; видимость (свой или системный датасет) проверяется уже здесь.
+    cache_key = CacheKeysObject.dataset(dataset_id=dataset_id)
+    if not await cache_repo.is_known_missing(cache_key):
+        dataset = await dataset_repo.get_dataset_by_id(dataset_id)
+        if dataset is None:
+            await cache_repo.mark_missing(cache_key, CacheTTL.MISSING.value)
+        elif dataset.user_id is None or dataset.user_id == user_id:
+            return dataset
+    raise NotFoundError(f"Dataset with id {dataset_id} does not exist or access denied")
+
 
 class DatasetService:
-    def __init__(self, dataset_repo: IDatasetRepository, storage: IStorageRepository, cache_repo: ICacheRepository):
+    def __init__(self, dataset_repo: IDatasetRepository, storage: IStorageRepository, cache_repo: ICacheRepository,
+                 uow: IUnitOfWork,
+                 dataset_repo_scope: Optional[Callable[[], AsyncContextManager[IDatasetRepository]]] = None):
         self.dataset_repo = dataset_repo
         self.storage = storage
         self.cache_repo = cache_repo
+        self.uow = uow
+        # списки обновляются в фоне и могут пережить запрос, поэтому им нужна своя сессия, а не сессия запроса
+        self.dataset_repo_scope = dataset_repo_scope or (lambda: nullcontext(self.dataset_repo))
 
     async def create_dataset(self, dataset: DatasetCreate, file_data: bytes, filename: str, content_type: str,
                              user_id: UUID) -> DatasetRead:
@@ -25,48 +54,71 @@ class DatasetService:
                                                             settings.MINIO_DATASETS_BUCKET)
 
         created = await self.dataset_repo.create_dataset(dataset=dataset, user_id=user_id)
+        await self.uow.commit()
 
         await self.cache_repo.delete(CacheKeysObject.dataset(dataset_id=created.id))
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.DATASETS}:{user_id}:*")
+        await self.cache_repo.delete_pattern(CacheKeysList.DATASETS.pattern(user_id))
 
         return created
 
     async def get_dataset_by_id(self, dataset_id: UUID, user_id: UUID) -> Optional[
         DatasetRead]:
-        cache_key = CacheKeysObject.dataset(dataset_id=dataset_id)
-
-        cached = await self.cache_repo.get(cache_key)
-        if cached is not None:
-            return DatasetRead(**cached)
-
-        dataset = await self._ensure_dataset_exists(dataset_id, user_id)
-
-        if dataset.user_id != user_id:
-            raise PermissionError("Access denied")
+        return DatasetRead.model_validate_json(await self.get_dataset_json(dataset_id, user_id))
+
+    async def get_dataset_json(self, dataset_id: UUID, user_id: UUID) -> bytes:
+        cached = await self.cache_repo.get_or_load(
+            CacheKeysObject.dataset(dataset_id=dataset_id),
+            lambda: self._load_dataset(dataset_id),
+            expire=CacheTTL.DATASETS.value,
+            missing_ttl=CacheTTL.MISSING.value,
+        )
+        if cached is None:
+            raise NotFoundError(f"Dataset with id {dataset_id} does not exist or access denied")
 
-        await self.cache_repo.set(cache_key, DatasetRead.model_validate(dataset).model_dump(),
-                                  expire=CacheTTL.DATASETS.value)
+        # чужая запись неотличима от отсутствующей, системные (без владельца) доступны всем
+        owner, body = unpack_owned(cached)
+        if owner is not None and owner != owner_key(user_id):
+            raise NotFoundError(f"Dataset with id {dataset_id} does not exist or access denied")
 
-        return dataset
+        return body
 
     async def get_datasets(self, user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None) -> \
             list[DatasetRead]:
-        cache_key = CacheKeysList.datasets(user_id=user_id, skip=skip, limit=limit, name_contains=name_contains)
-        cached = await self.cache_repo.get(cache_key)
-        if cached is not None:
-            return [DatasetRead(**item) for item in cached]
-
-        datasets = await self.dataset_repo.get_datasets(user_id=user_id, skip=skip, limit=limit,
-                                                        name_contains=name_contains)
-
-        serialized = [DatasetRead.model_validate(dataset).model_dump() for dataset in datasets]
+        return dataset_list_adapter.validate_json(await self.get_datasets_json(user_id, skip, limit, name_contains))
 
-        await self.cache_repo.set(cache_key, serialized, expire=CacheTTL.LISTS.value)
-
-        return datasets
+    async def get_datasets_json(self, user_id: UUID, skip: int = 0, limit: int = 100,
+                                name_contains: Optional[str] = None) -> bytes:
+        cache_key = CacheKeysList.datasets(user_id=user_id, skip=skip, limit=limit, name_contains=name_contains)
+        return await self.cache_repo.get_or_load(
+            cache_key,
+            lambda: self._load_datasets(user_id, skip, limit, name_contains),
+            expire=CacheTTL.LISTS_STALE.value,
+            stale_after=CacheTTL.LISTS.value,
+        )
+
+    async def get_datasets_page_json(self, user_id: UUID, limit: int = 100, cursor: str = "",
+                                     name_contains: Optional[str] = None) -> tuple[bytes, Optional[str]]:
+        position = decode_cursor(cursor)
+        cache_key = CacheKeysList.datasets(user_id=user_id, limit=limit, name_contains=name_contains, cursor=cursor)
+        page = await self.cache_repo.get_or_load(
+            cache_key,
+            lambda: self._load_datasets(user_id, 0, limit, name_contains, position, paged=True),
+            expire=CacheTTL.LISTS_STALE.value,
+            stale_after=CacheTTL.LISTS.value,
+        )
+        return unpack_page(page)
+
+    async def search_datasets_json(self, user_id: UUID, query: str, skip: int = 0, limit: int = 100) -> bytes:
+        query = normalize_search_query(query)
+        return await self.cache_repo.get_or_load(
+            CacheKeysList.datasets_search(user_id=user_id, query=query, skip=skip, limit=limit),
+            lambda: self._search_datasets(user_id, query, skip, limit),
+            expire=CacheTTL.LISTS_STALE.value,
+            stale_after=CacheTTL.LISTS.value,
+        )
 
     async def delete_dataset_by_id(self, dataset_id: UUID, user_id: UUID) -> None:
-        dataset = await self._ensure_dataset_exists(dataset_id, user_id)
+        dataset = await ensure_dataset_exists(self.dataset_repo, self.cache_repo, dataset_id, user_id)
 
         if dataset.user_id != user_id:
             raise PermissionError("Access denied")
@@ -74,19 +126,48 @@ class DatasetService:
         await self.storage.delete_file(dataset.minio_path, settings.MINIO_DATASETS_BUCKET)
 
         await self.dataset_repo.delete_dataset_by_id(dataset_id)
+        await self.uow.commit()
 
         await self.cache_repo.delete(CacheKeysObject.dataset(dataset_id=dataset_id))
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.DATASETS}:{user_id}:*")
+        await self.cache_repo.delete_pattern(CacheKeysList.DATASETS.pattern(user_id))
+
+    async def delete_datasets(self, user_id: UUID, dataset_ids: Optional[list[UUID]] = None,
+                              older_than: Optional[datetime] = None) -> list[UUID]:
+        datasets = await self.dataset_repo.delete_datasets(user_id, dataset_ids=dataset_ids, older_than=older_than)
+        if not datasets:
+            return []
+        await self.uow.commit()
+
+        await self.storage.delete_files([dataset.minio_path for dataset in datasets if dataset.minio_path],
+                                        settings.MINIO_DATASETS_BUCKET)
+        for dataset in datasets:
+            await self.cache_repo.delete(CacheKeysObject.dataset(dataset_id=dataset.id))
+        await self.cache_repo.delete_pattern(CacheKeysList.DATASETS.pattern(user_id))
+        return [dataset.id for dataset in datasets]
 
     async def download_dataset(self, dataset_id: UUID, user_id: UUID) -> str:
-        dataset = await self._ensure_dataset_exists(dataset_id, user_id)
+        dataset = await ensure_dataset_exists(self.dataset_repo, self.cache_repo, dataset_id, user_id)
         if dataset.user_id != user_id:
             raise PermissionError("Access denied")
         return await self.storage.get_presigned_file_url(dataset.minio_path, settings.MINIO_DATASETS_BUCKET)
 
-    async def _ensure_dataset_exists(self, dataset_id: UUID, user_id: UUID):
-        dataset = await self.dataset_repo.get_dataset_by_id(dataset_id, user_id)
-        if not dataset:
-            raise NotFoundError(f"Dataset with id {dataset_id} does not exist or access denied")
-
-        return dataset
+    async def _load_dataset(self, dataset_id: UUID) -> bytes | None:
+        # загрузку ждут и другие запросы (single-flight), поэтому она не должна зависеть от сессии первого из них
+        async with self.dataset_repo_scope() as dataset_repo:
+            dataset = await dataset_repo.get_dataset_by_id(dataset_id)
+            if not dataset:
+                return None
+            return pack_owned(dataset.user_id, DatasetRead.model_validate(dataset).model_dump_json().encode())
+
+    async def _load_datasets(self, user_id: UUID, skip: int, limit: int, name_contains: Optional[str],
+                             position: Optional[Cursor] = None, paged: bool = False) -> bytes:
+        async with self.dataset_repo_scope() as dataset_repo:
+            datasets = await dataset_repo.get_datasets(user_id=user_id, skip=skip, limit=limit,
+                                                       name_contains=name_contains, cursor=position)
+            body = dataset_list_adapter.dump_json([DatasetRead.model_validate(dataset) for dataset in datasets])
+            return pack_page(body, next_cursor(datasets, limit)) if paged else body
+
+    async def _search_datasets(self, user_id: UUID, query: str, skip: int, limit: int) -> bytes:
+        async with self.dataset_repo_scope() as dataset_repo:
+            datasets = await dataset_repo.search_datasets(user_id=user_id, query=query, skip=skip, limit=limit)
+            return dataset_list_adapter.dump_json([DatasetRead.model_validate(dataset) for dataset in datasets])
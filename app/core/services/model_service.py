@@ -1,28 +1,44 @@
-from typing import Optional
+from contextlib import nullcontext
+from datetime import datetime
+from typing import AsyncContextManager, Callable, Optional
 from uuid import UUID
 
+from pydantic import TypeAdapter
+
 from app.core.enums import CacheKeysList, CacheKeysObject, CacheTTL
 from app.core.exceptions import NotFoundError
-from app.core.interfaces import ICacheRepository, IDatasetRepository, IModelRepository, IStorageRepository
+from app.core.search import normalize_search_query
+from app.core.interfaces import ICacheRepository, IDatasetRepository, IModelRepository, IStorageRepository, \
+    IUnitOfWork
+from app.core.ownership import owner_key, pack_owned, unpack_owned
+from app.core.pagination import Cursor, decode_cursor, next_cursor, pack_page, unpack_page
+from app.core.services.dataset_service import ensure_dataset_exists
 from app.core.validation import validate_model_file
 from app.infrastructure.config import settings
 from app.presentation.schemas import ModelCreate, ModelRead
 
+# в кеше лежат уже готовые JSON-ответы, роутеры отдают их без повторной валидации
+model_list_adapter = TypeAdapter(list[ModelRead])
+
 
 class ModelService:
     def __init__(self, model_repo: IModelRepository, storage: IStorageRepository, dataset_repo: IDatasetRepository,
-                 cache_repo: ICacheRepository):
+                 cache_repo: ICacheRepository, uow: IUnitOfWork,
+                 model_repo_scope: Optional[Callable[[], AsyncContextManager[IModelRepository]]] = None):
         self.model_repo = model_repo
         self.dataset_repo = dataset_repo
         self.storage = storage
         self.cache_repo = cache_repo
+        self.uow = uow
+        # списки обновляются в фоне и могут пережить запрос, поэтому им нужна своя сессия, а не сессия запроса
+        self.model_repo_scope = model_repo_scope or (lambda: nullcontext(self.model_repo))
 
     async def create_model(self, model: ModelCreate, file_data: bytes, filename: str,
                            content_type: str, user_id: UUID) -> ModelRead:
         await validate_model_file(file_data, filename)
 
         if model.dataset_id:
-            await self._ensure_dataset_exists(model.dataset_id, user_id)
+            await ensure_dataset_exists(self.dataset_repo, self.cache_repo, model.dataset_id, user_id)
 
         file_path = f"{str(user_id)}/{filename}"
 
@@ -31,41 +47,85 @@ class ModelService:
 
         model.minio_model_path = model_object
         created_model = await self.model_repo.create_model(model, user_id, is_system=False)
-        pattern = f"{CacheKeysList.MODELS}:{user_id}:*"
+        # кеш сбрасывается только после фиксации, иначе параллельное чтение успеет закешировать старый список
+        await self.uow.commit()
+        pattern = CacheKeysList.MODELS.pattern(user_id)
         await self.cache_repo.delete(CacheKeysObject.model(model_id=created_model.id))
         await self.cache_repo.delete_pattern(pattern)
         return created_model
 
     async def get_model_by_id(self, model_id: UUID, user_id: UUID) -> Optional[
         ModelRead]:
-        cache_key = CacheKeysObject.model(model_id=model_id)
-        cached = await self.cache_repo.get(cache_key)
-        if cached is not None:
-            return ModelRead(**cached)
-
-        model = await self._ensure_model_exists(model_id, user_id)
+        return ModelRead.model_validate_json(await self.get_model_json(model_id, user_id))
+
+    async def get_model_json(self, model_id: UUID, user_id: UUID) -> bytes:
+        cached = await self.cache_repo.get_or_load(
+            CacheKeysObject.model(model_id=model_id),
+            lambda: self._load_model(model_id),
+            expire=CacheTTL.MODELS.value,
+            missing_ttl=CacheTTL.MISSING.value,
+        )
+        if cached is None:
+            raise NotFoundError(f"Model with id {model_id} not found or access denied")
 
-        if model.user_id != user_id:
-            raise PermissionError("Access denied")
+        # чужая запись неотличима от отсутствующей, системные (без владельца) доступны всем
+        owner, body = unpack_owned(cached)
+        if owner is not None and owner != owner_key(user_id):
+            raise NotFoundError(f"Model with id {model_id} not found or access denied")
 
-        await self.cache_repo.set(cache_key, ModelRead.model_validate(model).model_dump(), expire=CacheTTL.MODELS.value)
+        return body
 
-        return model
+    async def warm_system_models(self) -> int:
+        # системные модели общие для всех пользователей - прогреваем их записи при старте воркера
+        models = await self.model_repo.get_system_models()
+        for model in models:
+            body = ModelRead.model_validate(model).model_dump_json().encode()
+            await self.cache_repo.set(CacheKeysObject.model(model_id=model.id), pack_owned(model.user_id, body),
+                                      expire=CacheTTL.MODELS.value)
+        return len(models)
 
     async def get_models(self, user_id: UUID, skip: int = 0, limit: int = 100,
                         dataset_id: Optional[UUID] = None,
                          include_system: bool = True) -> list[ModelRead]:
-        cache_key = CacheKeysList.models(user_id=user_id, skip=skip, limit=limit,
-                                         dataset_id=dataset_id)
-        cached = await self.cache_repo.get(cache_key)
-        if cached is not None:
-            return [ModelRead(**item) for item in cached]
-
-        models = await self.model_repo.get_models(user_id=user_id, skip=skip, limit=limit,
-                                                  dataset_id=dataset_id, include_system=include_system)
-        serialized = [ModelRead.model_validate(model).model_dump() for model in models]
-        await self.cache_repo.set(cache_key, serialized, expire=CacheTTL.LISTS.value)
-        return models
+        return model_list_adapter.validate_json(
+            await self.get_models_json(user_id, skip, limit, dataset_id, include_system)
+        )
+
+    async def get_models_json(self, user_id: UUID, skip: int = 0, limit: int = 100,
+                              dataset_id: Optional[UUID] = None, include_system: bool = True) -> bytes:
+        cache_key = CacheKeysList.models(user_id=user_id, skip=skip, limit=limit, dataset_id=dataset_id,
+                                         include_system=include_system)
+        return await self.cache_repo.get_or_load(
+            cache_key,
+            lambda: self._load_models(user_id, skip, limit, dataset_id, include_system),
+            expire=CacheTTL.LISTS_STALE.value,
+            stale_after=CacheTTL.LISTS.value,
+        )
+
+    async def get_models_page_json(self, user_id: UUID, limit: int = 100, cursor: str = "",
+                                   dataset_id: Optional[UUID] = None,
+                                   include_system: bool = True) -> tuple[bytes, Optional[str]]:
+        position = decode_cursor(cursor)
+        cache_key = CacheKeysList.models(user_id=user_id, limit=limit, dataset_id=dataset_id, cursor=cursor,
+                                         include_system=include_system)
+        page = await self.cache_repo.get_or_load(
+            cache_key,
+            lambda: self._load_models(user_id, 0, limit, dataset_id, include_system, position, paged=True),
+            expire=CacheTTL.LISTS_STALE.value,
+            stale_after=CacheTTL.LISTS.value,
+        )
+        return unpack_page(page)
+
+    async def search_models_json(self, user_id: UUID, query: str, skip: int = 0, limit: int = 100,
+                                 include_system: bool = True) -> bytes:
+        query = normalize_search_query(query)
+        return await self.cache_repo.get_or_load(
+            CacheKeysList.models_search(user_id=user_id, query=query, skip=skip, limit=limit,
+                                        include_system=include_system),
+            lambda: self._search_models(user_id, query, skip, limit, include_system),
+            expire=CacheTTL.LISTS_STALE.value,
+            stale_after=CacheTTL.LISTS.value,
+        )
 
     async def delete_model_by_id(self, model_id: UUID, user_id: UUID) -> None:
         model = await self._ensure_model_exists(model_id, user_id)
@@ -78,8 +138,26 @@ class ModelService:
 
         await self.storage.delete_file(model.minio_model_path, settings.MINIO_MODELS_BUCKET)
         await self.model_repo.delete_model_by_id(model_id, user_id)
+        await self.uow.commit()
         await self.cache_repo.delete(CacheKeysObject.model(model_id=model_id))
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.MODELS}:{user_id}:*")
+        await self.cache_repo.delete_pattern(CacheKeysList.MODELS.pattern(user_id))
+
+    async def delete_models(self, user_id: UUID, model_ids: Optional[list[UUID]] = None,
+                            dataset_id: Optional[UUID] = None, older_than: Optional[datetime] = None) -> list[UUID]:
+        models = await self.model_repo.delete_models(user_id, model_ids=model_ids, dataset_id=dataset_id,
+                                                     older_than=older_than)
+        if not models:
+            return []
+        await self.uow.commit()
+
+        await self.storage.delete_files([model.minio_model_path for model in models],
+                                        settings.MINIO_MODELS_BUCKET)
+        await self.storage.delete_files([model.metrics_path for model in models if model.metrics_path],
+                                        settings.MINIO_METRICS_BUCKET)
+        for model in models:
+            await self.cache_repo.delete(CacheKeysObject.model(model_id=model.id))
+        await self.cache_repo.delete_pattern(CacheKeysList.MODELS.pattern(user_id))
+        return [model.id for model in models]
 
     async def get_model_metrics(self, model_id: UUID, user_id: UUID) -> str:
         model = await self._ensure_model_exists(model_id, user_id)
@@ -103,13 +181,39 @@ class ModelService:
             raise PermissionError("Cannot download system model")
         return await self.storage.get_presigned_file_url(model.minio_model_path, settings.MINIO_MODELS_BUCKET)
 
-    async def _ensure_dataset_exists(self, dataset_id: UUID, user_id: UUID):
-        dataset = await self.dataset_repo.get_dataset_by_id(dataset_id, user_id)
-        if not dataset:
-            raise NotFoundError(f"Dataset with id {dataset_id} does not exist or access denied")
-
-    async def _ensure_model_exists(self, model_id: UUID, user_id: UUID):
-        model = await self.model_repo.get_model_by_id(model_id, user_id)
-        if not model:
-            raise NotFoundError(f"Model with id {model_id} not found or access denied")
-        return model
+    async def _load_model(self, model_id: UUID) -> bytes | None:
+        # загрузку ждут и другие запросы (single-flight), поэтому она не должна зависеть от сессии первого из них
+        async with self.model_repo_scope() as model_repo:
+            model = await model_repo.get_model_by_id(model_id)
+            if not model:
+                return None
+            return pack_owned(model.user_id, ModelRead.model_validate(model).model_dump_json().encode())
+
+    async def _load_models(self, user_id: UUID, skip: int, limit: int, dataset_id: Optional[UUID],
+                           include_system: bool, position: Optional[Cursor] = None, paged: bool = False) -> bytes:
+        async with self.model_repo_scope() as model_repo:
+            models = await model_repo.get_models(user_id=user_id, skip=skip, limit=limit,
+                                                 dataset_id=dataset_id, include_system=include_system,
+                                                 cursor=position)
+            body = model_list_adapter.dump_json([ModelRead.model_validate(model) for model in models])
+            return pack_page(body, next_cursor(models, limit)) if paged else body
+
+    async def _search_models(self, user_id: UUID, query: str, skip: int, limit: int, include_system: bool) -> bytes:
+        async with self.model_repo_scope() as model_repo:
+            models = await model_repo.search_models(user_id=user_id, query=query, skip=skip, limit=limit,
+                                                    include_system=include_system)
+            return model_list_adapter.dump_json([ModelRead.model_validate(model) for model in models])
+
+    async def _ensure_model_exists(self, model_id: UUID, user_id: UUID) -> ModelRead:
+        # та же запись кеша, что и у get_model_json: прогретые системные модели и отрицательные записи работают и здесь
+        cached = await self.cache_repo.get_or_load(
+            CacheKeysObject.model(model_id=model_id),
+            lambda: self._load_model(model_id),
+            expire=CacheTTL.MODELS.value,
+            missing_ttl=CacheTTL.MISSING.value,
+        )
+        if cached is not None:
+            model = ModelRead.model_validate_json(unpack_owned(cached)[1])
+            if model.is_system or model.user_id == user_id:
+                return model
+        raise NotFoundError(f"Model with id {model_id} not found or access denied")
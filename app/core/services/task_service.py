@@ -1,30 +1,44 @@
+from contextlib import nullcontext
 from datetime import datetime, timezone
+from typing import AsyncContextManager, Callable, Optional
 from uuid import UUID
 
+from pydantic import TypeAdapter
 
-from app.core.enums import CacheKeysList, CacheKeysObject, CacheTTL, QueueTypes, TaskType
+from app.core.enums import CacheKeysList, CacheKeysObject, CacheTTL, QueueTypes, TaskStatus, TaskType
 from app.core.exceptions import NotFoundError, ValidationError
-from app.core.interfaces import ICacheRepository, IDatasetRepository, IModelRepository, IStorageRepository, \
-    ITaskRepository
+from app.core.interfaces import ICacheRepository, IDatasetRepository, IModelRepository, IOutboxRepository, \
+    IStorageRepository, ITaskRepository, IUnitOfWork
+from app.core.ownership import owner_key, pack_owned, unpack_owned
+from app.core.pagination import Cursor, decode_cursor, next_cursor, pack_page, unpack_page
+from app.core.services.dataset_service import ensure_dataset_exists
 from app.infrastructure.config import settings
-from app.presentation.schemas import TaskCreate, TaskRead
-from app.infrastructure.services.broker import BobberPublisher
+from app.presentation.schemas import ModelRead, TaskCreate, TaskRead
 
+# в кеше лежат уже готовые JSON-ответы, роутеры отдают их без повторной валидации
+task_list_adapter = TypeAdapter(list[TaskRead])
 
 class TaskService:
     def __init__(self, task_repo: ITaskRepository, storage: IStorageRepository, model_repo: IModelRepository,
-                 dataset_repo: IDatasetRepository, cache_repo: ICacheRepository, bobber_publisher: BobberPublisher):
+                 dataset_repo: IDatasetRepository, cache_repo: ICacheRepository, outbox_repo: IOutboxRepository,
+                 uow: IUnitOfWork,
+                 task_repo_scope: Optional[Callable[[], AsyncContextManager[ITaskRepository]]] = None,
+                 model_repo_scope: Optional[Callable[[], AsyncContextManager[IModelRepository]]] = None):
         self.task_repo = task_repo
         self.storage = storage
         self.model_repo = model_repo
         self.dataset_repo = dataset_repo
         self.cache_repo = cache_repo
-        self.bobber = bobber_publisher
+        self.outbox_repo = outbox_repo
+        self.uow = uow
+        # общие загрузки кеша (single-flight) идут на своей сессии: отмена первого запроса не должна ее закрыть
+        self.task_repo_scope = task_repo_scope or (lambda: nullcontext(self.task_repo))
+        self.model_repo_scope = model_repo_scope or (lambda: nullcontext(self.model_repo))
 
     async def create_inference_task(self, task: TaskCreate, file_data: bytes, filename: str,
                                     content_type: str, user_id: UUID) -> TaskRead:
         if task.model_id:
-            await self._ensure_model_exists(task.model_id)
+            model = await self._ensure_model_exists(task.model_id)
         else:
             raise NotFoundError(f"Model ID does not exist: {task.model_id}.")
 
@@ -38,25 +52,26 @@ class TaskService:
                                                            settings.MINIO_SCHEMAS_BUCKET)
         task.input_path = input_object_path
         created = await self.task_repo.create_inference_task(task)
-        model = await self.model_repo.get_model_by_id(task.model_id)
 
         message = {
             "task_id":    str(created.id),
             "task_type":  TaskType.inference,
             "model_id":   str(task.model_id),
-            "model_arch": model.architecture if hasattr(model, "architecture") else None,
+            "model_arch": model.architecture,
             "input_path": input_object_path,
             "timestamp":  datetime.now(timezone.utc).isoformat()
         }
 
-        await self._publish_inference(QueueTypes.inference_queue, message)
+        # сообщение для брокера пишется в outbox той же транзакцией, что и задача; отправляет его TaskOutboxRelay
+        await self.outbox_repo.add_message(created.id, QueueTypes.inference_queue.value, message)
+        await self.uow.commit()
         await self.cache_repo.delete(CacheKeysObject.task(task_id=created.id))
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.TASKS}:{user_id}:*")
+        await self.cache_repo.delete_pattern(CacheKeysList.TASKS.pattern(user_id))
         return created
 
     async def create_training_task(self, task: TaskCreate) -> TaskRead:
         if task.dataset_id:
-            await self._ensure_dataset_exists(task.dataset_id)
+            await ensure_dataset_exists(self.dataset_repo, self.cache_repo, task.dataset_id, task.user_id)
         created = await self.task_repo.create_training_task(task)
 
         message = {
@@ -71,45 +86,52 @@ class TaskService:
             "timestamp":  datetime.now(timezone.utc).isoformat()
         }
 
-        await self._publish_training(QueueTypes.training_queue, message)
+        await self.outbox_repo.add_message(created.id, QueueTypes.training_queue.value, message)
+        await self.uow.commit()
         cache_key = CacheKeysObject.task(task_id=created.id)
         await self.cache_repo.delete(cache_key)
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.TASKS}:{task.user_id}:*")
+        await self.cache_repo.delete_pattern(CacheKeysList.TASKS.pattern(task.user_id))
         return created
 
     async def get_task_by_id(self, task_id: UUID, user_id: UUID) -> TaskRead:
-        cache_key = CacheKeysObject.task(task_id=task_id)
-        cached = await self.cache_repo.get(cache_key)
-        if cached is not None:
-            return TaskRead(**cached)
-
-        task = await self.task_repo.get_task_by_id(task_id)
-        if not task:
+        return TaskRead.model_validate_json(await self.get_task_json(task_id, user_id))
+
+    async def get_task_json(self, task_id: UUID, user_id: UUID) -> bytes:
+        cached = await self.cache_repo.get_or_load(
+            CacheKeysObject.task(task_id=task_id),
+            lambda: self._load_task(task_id),
+            expire=CacheTTL.TASKS.value,
+            missing_ttl=CacheTTL.MISSING.value,
+        )
+        if cached is None:
             raise NotFoundError(f"Task with id {task_id} does not exist")
 
-        if task.user_id != user_id:
-            raise PermissionError("Access denied")
-        task_read = await self._attach_output_url(task)
-        await self.cache_repo.set(cache_key, task_read.model_dump(), expire=CacheTTL.TASKS.value)
-
-        return task_read
+        # чужая задача неотличима от отсутствующей
+        owner, body = unpack_owned(cached)
+        if owner != owner_key(user_id):
+            raise NotFoundError(f"Task with id {task_id} does not exist")
+        return body
 
     async def get_tasks(self, user_id: UUID, skip: int = 0, limit: int = 100) -> \
             list[TaskRead]:
-        cache_key = CacheKeysList.tasks(user_id=user_id, skip=skip, limit=limit)
-        cached = await self.cache_repo.get(cache_key)
-        if cached is not None:
-            return [TaskRead(**item) for item in cached]
-
-        tasks = await self.task_repo.get_tasks(skip, limit, user_id=user_id)
-
-        task_reads: list[TaskRead] = []
-        for task in tasks:
-            task_reads.append(await self._attach_output_url(task))
-
-        serialized = [task_read.model_dump() for task_read in task_reads]
-        await self.cache_repo.set(cache_key, serialized, expire=CacheTTL.LISTS.value)
-        return task_reads
+        return task_list_adapter.validate_json(await self.get_tasks_json(user_id, skip, limit))
+
+    async def get_tasks_json(self, user_id: UUID, skip: int = 0, limit: int = 100) -> bytes:
+        return await self.cache_repo.get_or_load(
+            CacheKeysList.tasks(user_id=user_id, skip=skip, limit=limit),
+            lambda: self._load_tasks(user_id, skip, limit),
+            expire=CacheTTL.LISTS.value,
+        )
+
+    async def get_tasks_page_json(self, user_id: UUID, limit: int = 100, cursor: str = "") -> \
+            tuple[bytes, Optional[str]]:
+        position = decode_cursor(cursor)
+        page = await self.cache_repo.get_or_load(
+            CacheKeysList.tasks(user_id=user_id, limit=limit, cursor=cursor),
+            lambda: self._load_tasks(user_id, 0, limit, position, paged=True),
+            expire=CacheTTL.LISTS.value,
+        )
+        return unpack_page(page)
 
     async def delete_task_by_id(self, task_id: UUID, user_id: UUID) -> None:
         task = await self.task_repo.get_task_by_id(task_id)
@@ -120,18 +142,66 @@ class TaskService:
             raise PermissionError("Access denied")
 
         await self.task_repo.delete_task_by_id(task_id)
+        await self.uow.commit()
         cache_key = CacheKeysObject.task(task_id=task_id)
         await self.cache_repo.delete_pattern(cache_key)
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.TASKS}:{user_id}:*")
-
-    async def _ensure_model_exists(self, model_id: UUID):
-        if not await self.model_repo.get_model_by_id(model_id):
+        await self.cache_repo.delete_pattern(CacheKeysList.TASKS.pattern(user_id))
+
+    async def delete_tasks(self, user_id: UUID, task_ids: Optional[list[UUID]] = None,
+                           status: Optional[TaskStatus] = None, older_than: Optional[datetime] = None) -> list[UUID]:
+        tasks = await self.task_repo.delete_tasks(user_id, task_ids=task_ids,
+                                                  status=status.value if status else None, older_than=older_than)
+        if not tasks:
+            return []
+        await self.uow.commit()
+
+        await self.storage.delete_files([task.input_path for task in tasks if task.input_path],
+                                        settings.MINIO_SCHEMAS_BUCKET)
+        await self.storage.delete_files([task.output_path for task in tasks if task.output_path],
+                                        settings.MINIO_INFERENCES_BUCKET)
+        for task in tasks:
+            await self.cache_repo.delete(CacheKeysObject.task(task_id=task.id))
+        # списки пользователя сбрасываются один раз на весь вызов, а не на каждую задачу
+        await self.cache_repo.delete_pattern(CacheKeysList.TASKS.pattern(user_id))
+        return [task.id for task in tasks]
+
+    async def _ensure_model_exists(self, model_id: UUID) -> ModelRead:
+        # запись кеша общая с ModelService: для системных моделей она прогрета при старте
+        cached = await self.cache_repo.get_or_load(
+            CacheKeysObject.model(model_id=model_id),
+            lambda: self._load_model(model_id),
+            expire=CacheTTL.MODELS.value,
+            missing_ttl=CacheTTL.MISSING.value,
+        )
+        if cached is None:
             raise NotFoundError(f"Model with id {model_id} does not exist")
-
-    async def _ensure_dataset_exists(self, dataset_id: UUID):
-        if not await self.dataset_repo.get_dataset_by_id(dataset_id):
-            raise NotFoundError(f"Dataset with id {dataset_id} does not exist")
-
+        return ModelRead.model_validate_json(unpack_owned(cached)[1])
+
+    async def _load_model(self, model_id: UUID) -> bytes | None:
+        async with self.model_repo_scope() as model_repo:
+            model = await model_repo.get_model_by_id(model_id)
+            if not model:
+                return None
+            return pack_owned(model.user_id, ModelRead.model_validate(model).model_dump_json().encode())
+
+    async def _load_task(self, task_id: UUID) -> bytes | None:
+        async with self.task_repo_scope() as task_repo:
+            task = await task_repo.get_task_by_id(task_id)
+            if not task:
+                return None
+            task_read = await self._attach_output_url(task)
+            return pack_owned(task.user_id, task_read.model_dump_json().encode())
+
+    async def _load_tasks(self, user_id: UUID, skip: int, limit: int, position: Optional[Cursor] = None,
+                          paged: bool = False) -> bytes:
+        async with self.task_repo_scope() as task_repo:
+            tasks = await task_repo.get_tasks(skip, limit, user_id=user_id, cursor=position)
+
+            task_reads: list[TaskRead] = []
+            for task in tasks:
+                task_reads.append(await self._attach_output_url(task))
+            body = task_list_adapter.dump_json(task_reads)
+            return pack_page(body, next_cursor(tasks, limit)) if paged else body
 
     async def _attach_output_url(self, task) -> TaskRead:
         task_read = TaskRead.model_validate(task)
@@ -142,14 +212,3 @@ class TaskService:
                 expires=CacheTTL.TASKS.value
             )
         return task_read
-
-
-    async def _publish_inference(self, queue: QueueTypes, message: dict):
-        success = self.bobber.publish_inference(queue, message)
-        if not success:
-            raise Exception(f"Publishing inference failed")
-
-    async def _publish_training(self, queue: QueueTypes, message: dict):
-        success = self.bobber.publish_training(queue, message)
-        if not success:
-            raise Exception(f"Publishing training failed")
@@ -1,28 +1,60 @@
+import logging
 from uuid import UUID
 
 from app.core.enums import CacheKeysList, CacheKeysObject, TaskStatus
-from app.core.interfaces import ICacheRepository, ITaskRepository
+from app.core.interfaces import ICacheRepository, ITaskRepository, IUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (TaskStatus.succeeded, TaskStatus.failed)
 
 
 class TaskStatusService:
-    def __init__(self, task_repo: ITaskRepository, cache_repo: ICacheRepository):
+    def __init__(self, task_repo: ITaskRepository, cache_repo: ICacheRepository, uow: IUnitOfWork):
         self.task_repo = task_repo
         self.cache_repo = cache_repo
+        self.uow = uow
 
     async def apply_update(self, update: dict):
-        task_id = UUID(str(update["task_id"]))
-        raw_status = update["status"]
-        status = raw_status if isinstance(raw_status, TaskStatus) else TaskStatus(str(raw_status))
-
-        task = await self.task_repo.update_task_status(
-            task_id=task_id,
-            status=status.value,
-            output_path=update.get("output_path"),
-            error_msg=update.get("error_msg"),
+        # одно сообщение - та же пачка из одного элемента, со всеми ее правилами и сбросом кеша
+        tasks = await self.apply_updates([update])
+        return tasks[0] if tasks else None
+
+    async def apply_updates(self, updates: list[dict]) -> list:
+        latest: dict[UUID, dict] = {}
+        for update in updates:
+            try:
+                task_id = UUID(str(update["task_id"]))
+                status = self._parse_status(update["status"])
+            except (KeyError, ValueError):
+                # одно битое сообщение не должно ронять всю пачку
+                logger.error("Skipping malformed task status update: %s", update)
+                continue
+            previous = latest.get(task_id)
+            # из нескольких сообщений об одной задаче остается последнее, но финальное не уступает промежуточному
+            if previous and previous["status"] in TERMINAL_STATUSES and status not in TERMINAL_STATUSES:
+                continue
+            latest[task_id] = {
+                "task_id": task_id,
+                "status": status,
+                "output_path": update.get("output_path"),
+                "error_msg": update.get("error_msg"),
+            }
+
+        tasks = await self.task_repo.update_task_statuses(
+            [{**update, "status": update["status"].value} for update in latest.values()]
         )
-        if not task:
-            return None
+        await self.uow.commit()
+
+        # списки задач сбрасываем один раз на пользователя, а не на каждое сообщение
+        for task in tasks:
+            await self.cache_repo.delete(CacheKeysObject.task(task_id=task.id))
+        for user_id in {task.user_id for task in tasks}:
+            await self.cache_repo.delete_pattern(CacheKeysList.TASKS.pattern(user_id))
+            # новый статус еще может не доехать до реплики - пользователь какое-то время читает с основной базы
+            await self.cache_repo.delete(CacheKeysObject.replica_reads(user_id=user_id))
+        return tasks
 
-        await self.cache_repo.delete(CacheKeysObject.task(task_id=task.id))
-        await self.cache_repo.delete_pattern(f"{CacheKeysList.TASKS}:{task.user_id}:*")
-        return task
+    @staticmethod
+    def _parse_status(raw_status) -> TaskStatus:
+        return raw_status if isinstance(raw_status, TaskStatus) else TaskStatus(str(raw_status))
@@ -3,7 +3,7 @@ from uuid import UUID
 
 from app.core.enums import CacheKeysObject
 from app.core.exceptions import ValidationError
-from app.core.interfaces import ICacheRepository
+from app.core.interfaces import ICacheRepository, IUnitOfWork
 from app.core.interfaces.user_interface import IUserRepository
 from app.presentation.schemas import DatasetRead, ModelRead, UserCreate, UserRead
 
@@ -12,10 +12,12 @@ class UserService:
     def __init__(
             self,
             user_repo: IUserRepository,
-            cache_repo: ICacheRepository
+            cache_repo: ICacheRepository,
+            uow: IUnitOfWork,
     ):
         self.user_repo = user_repo
         self.cache_repo = cache_repo
+        self.uow = uow
 
     async def create_user(self, user: UserCreate) -> UserRead:
         existing_user = await self.user_repo.get_user_by_email(str(user.email))
@@ -23,6 +25,7 @@ class UserService:
             raise ValidationError("Email already registered")
 
         created_user = await self.user_repo.create_user(user)
+        await self.uow.commit()
 
         await self.cache_repo.delete(CacheKeysObject.user(user_id=created_user.id))
 
@@ -7,20 +7,33 @@ from app.infrastructure.config import settings
 
 is_testing = os.getenv("TESTING", "0") == "1"
 
-if is_testing:
-    engine = create_async_engine(
-        settings.DATABASE_URL,
-        echo=False,
-        poolclass=NullPool,
-    )
-else:
-    engine = create_async_engine(
-        settings.DATABASE_URL,
+
+def _create_engine(url: str, **kwargs):
+    if is_testing:
+        return create_async_engine(
+            url,
+            echo=False,
+            poolclass=NullPool,
+            **kwargs,
+        )
+    return create_async_engine(
+        url,
         echo=False,
         pool_size=20,
         max_overflow=20,
         pool_timeout=60,
         pool_pre_ping=True,
+        **kwargs,
     )
 
+
+engine = _create_engine(settings.DATABASE_URL)
+
+# реплика только читает: даже случайная запись через нее упадет, а не разойдется с основной базой
+replica_engine = _create_engine(
+    settings.DATABASE_REPLICA_URL,
+    connect_args={"server_settings": {"default_transaction_read_only": "on"}},
+) if settings.DATABASE_REPLICA_URL else engine
+
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
@@ -1,16 +1,23 @@
+import asyncio
+from typing import AsyncIterator
+
 from dishka import Provider, Scope, provide
 
 from app.core.interfaces import (
     IDatasetRepository,
     IMailService,
     IModelRepository,
+    IOutboxRepository,
     IRegistrationConfirmationRepository,
     ITaskRepository,
+    IUnitOfWork,
     IUserRepository,
 )
 from app.core.services import DatasetService, ModelService, TaskService, UserService
 from app.core.services.auth_service import AuthService
 from app.infrastructure.config import settings
+from app.infrastructure.di.sqlalchemy_provider import repository_scope
+from app.infrastructure.persistence.repositories import DatasetRepository, ModelRepository, TaskRepository
 from app.infrastructure.services.cache import CacheService, cache_service
 from app.infrastructure.services.cloud_storage import MinioStorage
 from app.infrastructure.services.broker import BobberPublisher
@@ -32,8 +39,9 @@ class ServiceProvider(Provider):
         return cache_service
 
     @provide(scope=Scope.REQUEST)
-    def get_user_service(self, user_repository: IUserRepository, cache_repository: CacheService) -> UserService:
-        return UserService(user_repository, cache_repository)
+    def get_user_service(self, user_repository: IUserRepository, cache_repository: CacheService,
+                         uow: IUnitOfWork) -> UserService:
+        return UserService(user_repository, cache_repository, uow)
 
     @provide(scope=Scope.REQUEST)
     def get_auth_service(
@@ -41,34 +49,46 @@ class ServiceProvider(Provider):
             user_repository: IUserRepository,
             confirmation_repository: IRegistrationConfirmationRepository,
             mail_service: IMailService,
+            uow: IUnitOfWork,
     ) -> AuthService:
-        return AuthService(user_repository, confirmation_repository, mail_service)
+        return AuthService(user_repository, confirmation_repository, mail_service, uow)
 
     @provide(scope=Scope.REQUEST)
     def get_task_service(self, task_repository: ITaskRepository, model_repository: IModelRepository,
                          dataset_repository: IDatasetRepository, storage_repository: MinioStorage,
-                         cache_repository: CacheService, bobber_publisher: BobberPublisher) -> TaskService:
+                         cache_repository: CacheService, outbox_repository: IOutboxRepository,
+                         uow: IUnitOfWork) -> TaskService:
         return TaskService(task_repo=task_repository, storage=storage_repository, model_repo=model_repository,
                            dataset_repo=dataset_repository, cache_repo=cache_repository,
-                           bobber_publisher=bobber_publisher)
+                           outbox_repo=outbox_repository, uow=uow,
+                           task_repo_scope=repository_scope(TaskRepository),
+                           model_repo_scope=repository_scope(ModelRepository))
 
     @provide(scope=Scope.REQUEST)
     def get_dataset_service(self, dataset_repository: IDatasetRepository, cache_repository: CacheService,
-                            storage_repository: MinioStorage) -> DatasetService:
-        return DatasetService(dataset_repo=dataset_repository, cache_repo=cache_repository, storage=storage_repository)
+                            storage_repository: MinioStorage, uow: IUnitOfWork) -> DatasetService:
+        return DatasetService(dataset_repo=dataset_repository, cache_repo=cache_repository, storage=storage_repository,
+                              uow=uow, dataset_repo_scope=repository_scope(DatasetRepository))
 
     @provide(scope=Scope.REQUEST)
     def get_model_service(self, model_repository: IModelRepository, dataset_repository: IDatasetRepository,
-                          cache_repository: CacheService, storage_repository: MinioStorage) -> ModelService:
+                          cache_repository: CacheService, storage_repository: MinioStorage,
+                          uow: IUnitOfWork) -> ModelService:
         return ModelService(model_repo=model_repository, cache_repo=cache_repository, storage=storage_repository,
-                            dataset_repo=dataset_repository)
+                            dataset_repo=dataset_repository, uow=uow, model_repo_scope=repository_scope(ModelRepository))
 
     @provide(scope=Scope.APP)
-    def bobber_publisher(self) -> BobberPublisher:
-        return BobberPublisher(
+    async def bobber_publisher(self) -> AsyncIterator[BobberPublisher]:
+        publisher = BobberPublisher(
             host=settings.BOBBER_HOST or "localhost",
-            port=settings.BOBBER_PORT or 50051
+            port=settings.BOBBER_PORT or 50051,
+            pool_size=settings.BOBBER_PUBLISH_POOL_SIZE,
+            max_pending=settings.BOBBER_PUBLISH_MAX_PENDING,
+            message_format=settings.BROKER_MESSAGE_FORMAT,
         )
+        yield publisher
+        # закрывается вместе с контейнером: close ждет отправки в потоках пула, поэтому не в event loop
+        await asyncio.to_thread(publisher.close)
 
     @provide(scope=Scope.APP)
     def mail_service(self) -> IMailService:
@@ -1,4 +1,5 @@
-from typing import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable, TypeVar
 
 from dishka import Provider, Scope, provide
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,21 +7,42 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.interfaces import (
     IDatasetRepository,
     IModelRepository,
+    IOutboxRepository,
     IRegistrationConfirmationRepository,
     ITaskRepository,
+    IUnitOfWork,
     IUserRepository,
 )
-from app.infrastructure.database import AsyncSessionLocal
-from app.infrastructure.persistence.repositories import DatasetRepository, ModelRepository, TaskRepository, \
-    RegistrationConfirmationRepository, UserRepository
+from app.infrastructure.read_routing import session_factory
+from app.infrastructure.persistence.repositories import DatasetRepository, ModelRepository, OutboxRepository, \
+    TaskRepository, RegistrationConfirmationRepository, UserRepository
+from app.infrastructure.persistence.unit_of_work import SQLAlchemyUnitOfWork
+
+RepositoryT = TypeVar("RepositoryT")
+
+
+def repository_scope(repository_cls: Callable[[AsyncSession], RepositoryT]) -> Callable[[], AsyncContextManager[RepositoryT]]:
+    # репозиторий на собственной сессии - для работы, которая может пережить запрос (фоновые обновления кеша);
+    # фоновая задача наследует контекст запроса, поэтому читает из той же базы, что и он
+    @asynccontextmanager
+    async def scope() -> AsyncIterator[RepositoryT]:
+        async with session_factory()() as session:
+            yield repository_cls(session)
+
+    return scope
 
 
 class SQLAlchemyProvider(Provider):
     @provide(scope=Scope.REQUEST)
     async def get_session(self) -> AsyncIterator[AsyncSession]:
-        async with AsyncSessionLocal() as session:
+        # GET-запросы без недавних записей пользователя получают сессию реплики (ReadRoutingMiddleware)
+        async with session_factory()() as session:
             yield session
 
+    @provide(scope=Scope.REQUEST)
+    def get_unit_of_work(self, session: AsyncSession) -> IUnitOfWork:
+        return SQLAlchemyUnitOfWork(session)
+
     @provide(scope=Scope.REQUEST)
     def get_user_repository(self, session: AsyncSession) -> IUserRepository:
         return UserRepository(session)
@@ -33,6 +55,10 @@ class SQLAlchemyProvider(Provider):
     def get_task_repository(self, session: AsyncSession) -> ITaskRepository:
         return TaskRepository(session)
 
+    @provide(scope=Scope.REQUEST)
+    def get_outbox_repository(self, session: AsyncSession) -> IOutboxRepository:
+        return OutboxRepository(session)
+
     @provide(scope=Scope.REQUEST)
     def get_model_repository(self, session: AsyncSession) -> IModelRepository:
         return ModelRepository(session)
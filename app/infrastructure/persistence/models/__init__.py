@@ -8,3 +8,4 @@ from .user_role import UserRole
 from .role_permission import RolePermission
 from .permission import Permission
 from .registration_confirmation import RegistrationConfirmation
+from .outbox_message import OutboxMessage
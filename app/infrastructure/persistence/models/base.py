@@ -1,3 +1,10 @@
 from sqlalchemy.orm import declarative_base
 
-Base = declarative_base()
+
+class _EagerDefaults:
+    # серверные значения (created_at, updated_at) приходят в RETURNING того же INSERT/UPDATE при flush,
+    # поэтому refresh после записи не нужен
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_EagerDefaults)
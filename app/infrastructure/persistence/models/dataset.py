@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UUID, func, text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UUID, func, text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -8,6 +8,10 @@ from .base import Base
 
 class Dataset(Base):
     __tablename__ = "datasets"
+    __table_args__ = (
+        Index("ix_datasets_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_datasets_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"), default=uuid.uuid4)
     name = Column(String(255), nullable=False)
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import ARRAY, Boolean, Column, DateTime, Enum, ForeignKey, String, Text, UUID, func, text
+from sqlalchemy import ARRAY, Boolean, Column, DateTime, Enum, ForeignKey, Index, String, Text, UUID, func, text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -8,6 +8,13 @@ from .base import Base
 
 class Model(Base):
     __tablename__ = "models"
+    __table_args__ = (
+        Index("ix_models_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_models_user_id_not_system", "user_id", postgresql_where=text("is_system IS false")),
+        Index("ix_models_system_created_at_id", "created_at", "id", postgresql_where=text("is_system IS true")),
+        Index("ix_models_dataset_id", "dataset_id"),
+        Index("ix_models_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"), default=uuid.uuid4)
     name = Column(String(255), nullable=False)
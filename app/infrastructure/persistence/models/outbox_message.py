@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Identity, Index, Integer, String, Text, UUID, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .base import Base
+
+
+class OutboxMessage(Base):
+    __tablename__ = "task_outbox"
+    __table_args__ = (
+        Index("ix_task_outbox_available_at_id", "available_at", "id"),
+    )
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    # задачу удалили до отправки - сообщение уходит вместе с ней
+    task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    queue = Column(String(255), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False, server_default="0", default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, String, Text, UUID, func, text
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, String, Text, UUID, func, text
 from sqlalchemy.orm import relationship
 
 from app.core.enums import TaskStatus
@@ -9,6 +9,10 @@ from .base import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_model_id", "model_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"), default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,14 @@
+from typing import Optional
+
+from sqlalchemy import Select, tuple_
+
+from app.core.pagination import Cursor
+
+
+def paginate(query: Select, entity, skip: int, limit: int, cursor: Optional[Cursor] = None) -> Select:
+    # один порядок для обоих режимов: (created_at, id) уникален и покрывается индексом (user_id, created_at, id)
+    if cursor is not None:
+        query = query.where(tuple_(entity.created_at, entity.id) < cursor)
+    elif skip:
+        query = query.offset(skip)
+    return query.order_by(entity.created_at.desc(), entity.id.desc()).limit(limit)
@@ -3,3 +3,4 @@ from .user_repository import UserRepository
 from .model_repository import ModelRepository
 from .dataset_repository import DatasetRepository
 from .registration_confirmation_repository import RegistrationConfirmationRepository
+from .outbox_repository import OutboxRepository
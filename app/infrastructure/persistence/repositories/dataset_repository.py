@@ -1,11 +1,14 @@
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import delete, exists, func, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.interfaces import IDatasetRepository
-from app.infrastructure.persistence.models import Dataset
+from app.core.pagination import Cursor
+from app.infrastructure.persistence.models import Dataset, Model, Task
+from app.infrastructure.persistence.pagination import paginate
 from app.presentation import schemas
 
 
@@ -21,8 +24,7 @@ class DatasetRepository(IDatasetRepository):
             description=dataset.description,
         )
         self.session.add(db_dataset)
-        await self.session.commit()
-        await self.session.refresh(db_dataset)
+        await self.session.flush()
         return db_dataset
 
     async def get_dataset_by_id(self, dataset_id: UUID, user_id: Optional[UUID] = None) -> Optional[Dataset]:
@@ -35,19 +37,32 @@ class DatasetRepository(IDatasetRepository):
         db_dataset = result.scalar_one_or_none()
         return db_dataset
 
-    async def get_datasets(self, user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None) -> \
-            List[Optional[Dataset]]:
+    async def get_datasets(self, user_id: UUID, skip: int = 0, limit: int = 100, name_contains: Optional[str] = None,
+                           cursor: Optional[Cursor] = None) -> List[Optional[Dataset]]:
         query = select(Dataset).where((Dataset.user_id == user_id) | (Dataset.user_id.is_(None)))
 
         if name_contains:
             query = query.where(Dataset.name.ilike(f"%{name_contains}%"))
 
-        query = query.offset(skip).limit(limit)
+        query = paginate(query, Dataset, skip, limit, cursor)
 
         result = await self.session.execute(query)
         db_datasets = result.scalars().all()
         return [dataset for dataset in db_datasets]
 
+    async def search_datasets(self, user_id: UUID, query: str, skip: int = 0, limit: int = 100) -> List[Dataset]:
+        # `query <% name` идет по GIN-индексу pg_trgm, поэтому кандидатов ищем в индексе, а не перебором
+        similarity = func.word_similarity(query, Dataset.name)
+        statement = (select(Dataset)
+                     .where((Dataset.user_id == user_id) | (Dataset.user_id.is_(None)))
+                     .where(literal(query).op("<%")(Dataset.name))
+                     .order_by(similarity.desc(), Dataset.id)
+                     .offset(skip)
+                     .limit(limit))
+
+        result = await self.session.execute(statement)
+        return list(result.scalars().all())
+
     async def delete_dataset_by_id(self, dataset_id: UUID) -> None:
         query = select(Dataset).where(dataset_id == Dataset.id)
         result = await self.session.execute(query)
@@ -55,4 +70,21 @@ class DatasetRepository(IDatasetRepository):
 
         if db_dataset:
             await self.session.delete(db_dataset)
-            await self.session.commit()
+            await self.session.flush()
+
+    async def delete_datasets(self, user_id: UUID, dataset_ids: Optional[list[UUID]] = None,
+                              older_than: Optional[datetime] = None) -> list[Dataset]:
+        # датасеты, на которые ссылаются модели или задачи, пропускаются так же, как в ModelRepository.delete_models
+        query = (delete(Dataset)
+                 .where(user_id == Dataset.user_id)
+                 .where(~exists().where(Model.dataset_id == Dataset.id))
+                 .where(~exists().where(Task.dataset_id == Dataset.id)))
+        if dataset_ids is not None:
+            query = query.where(Dataset.id.in_(dataset_ids))
+        if older_than is not None:
+            query = query.where(Dataset.created_at < older_than)
+        query = query.returning(Dataset).execution_options(synchronize_session=False)
+
+        result = await self.session.execute(query)
+        db_datasets = list(result.scalars().all())
+        return db_datasets
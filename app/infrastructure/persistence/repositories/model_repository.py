@@ -1,11 +1,15 @@
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import or_, select
+from sqlalchemy import delete, exists, func, literal, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.core.interfaces import IModelRepository
-from app.infrastructure.persistence.models import Model
+from app.core.pagination import Cursor
+from app.infrastructure.persistence.models import Model, Task
+from app.infrastructure.persistence.pagination import paginate
 from app.presentation import schemas
 
 
@@ -26,8 +30,7 @@ class ModelRepository(IModelRepository):
             base_model_id=model.base_model_id,
         )
         self.session.add(db_model)
-        await self.session.commit()
-        await self.session.refresh(db_model)
+        await self.session.flush()
         return db_model
 
     async def get_model_by_id(self, model_id: UUID, user_id: Optional[UUID] = None) -> Optional[Model]:
@@ -42,7 +45,8 @@ class ModelRepository(IModelRepository):
 
     async def get_models(self, user_id: UUID, skip: int = 0, limit: int = 100,
                          dataset_id: Optional[UUID] = None,
-                         include_system: bool = True
+                         include_system: bool = True,
+                         cursor: Optional[Cursor] = None,
                          ) -> List[Optional[Model]]:
         query = select(Model).where(
             (Model.user_id == user_id) |
@@ -51,13 +55,32 @@ class ModelRepository(IModelRepository):
         if dataset_id is not None:
             query = query.where(dataset_id == Model.dataset_id)
 
-        query = query.order_by(Model.id)
-        query = query.offset(skip).limit(limit)
+        query = paginate(query, Model, skip, limit, cursor)
 
         result = await self.session.execute(query)
         db_models = result.scalars().all()
         return [model for model in db_models]
 
+    async def search_models(self, user_id: UUID, query: str, skip: int = 0, limit: int = 100,
+                            include_system: bool = True) -> List[Model]:
+        # `query <% name` идет по GIN-индексу pg_trgm, поэтому кандидатов ищем в индексе, а не перебором
+        similarity = func.word_similarity(query, Model.name)
+        statement = (select(Model)
+                     .where((Model.user_id == user_id) |
+                            (Model.is_system.is_(True) if include_system else False))
+                     .where(literal(query).op("<%")(Model.name))
+                     .order_by(similarity.desc(), Model.id)
+                     .offset(skip)
+                     .limit(limit))
+
+        result = await self.session.execute(statement)
+        return list(result.scalars().all())
+
+    async def get_system_models(self) -> list[Model]:
+        query = select(Model).where(Model.is_system.is_(True))
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def get_models_by_dataset_id(self, dataset_id: UUID, user_id: UUID) -> list[Model]:
         query = (select(Model)
                  .where(dataset_id == Model.dataset_id,
@@ -85,6 +108,27 @@ class ModelRepository(IModelRepository):
         db_model = result.scalar_one_or_none()
         if db_model:
             await self.session.delete(db_model)
-            await self.session.commit()
+            await self.session.flush()
         else:
             raise PermissionError("Model not found")
+
+    async def delete_models(self, user_id: UUID, model_ids: Optional[list[UUID]] = None,
+                            dataset_id: Optional[UUID] = None, older_than: Optional[datetime] = None) -> list[Model]:
+        # Модели, на которые еще ссылаются задачи или дообученные модели, пропускаются, а не валят
+        # весь DELETE на внешнем ключе - их id просто не вернутся в RETURNING.
+        derived = aliased(Model)
+        query = (delete(Model)
+                 .where(user_id == Model.user_id, Model.is_system.is_(False))
+                 .where(~exists().where(Task.model_id == Model.id))
+                 .where(~exists().where(derived.base_model_id == Model.id)))
+        if model_ids is not None:
+            query = query.where(Model.id.in_(model_ids))
+        if dataset_id is not None:
+            query = query.where(dataset_id == Model.dataset_id)
+        if older_than is not None:
+            query = query.where(Model.created_at < older_than)
+        query = query.returning(Model).execution_options(synchronize_session=False)
+
+        result = await self.session.execute(query)
+        db_models = list(result.scalars().all())
+        return db_models
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.interfaces import IOutboxRepository, OutboxEntry
+from app.infrastructure.persistence.models import OutboxMessage
+
+
+class OutboxRepository(IOutboxRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_message(self, task_id: UUID, queue: str, payload: dict) -> None:
+        # только add: строка уходит в базу тем же commit, что и задача
+        self.session.add(OutboxMessage(task_id=task_id, queue=queue, payload=payload))
+
+    async def claim_messages(self, limit: int, lease_seconds: float) -> list[OutboxEntry]:
+        # Строки не держатся под FOR UPDATE на время отправки: одним UPDATE они сдвигаются на now() + lease
+        # (аренда) со счетчиком попыток, и relay сразу фиксирует транзакцию. SKIP LOCKED нужен только на время
+        # этого UPDATE, чтобы параллельные воркеры не забрали одну строку; если воркер упадет во время отправки,
+        # строки снова станут доступны, когда истечет аренда.
+        claimable = (select(OutboxMessage.id)
+                     .where(OutboxMessage.available_at <= func.now())
+                     .order_by(OutboxMessage.available_at, OutboxMessage.id)
+                     .limit(limit)
+                     .with_for_update(skip_locked=True))
+        query = (update(OutboxMessage)
+                 .where(OutboxMessage.id.in_(claimable.scalar_subquery()))
+                 .values(attempts=OutboxMessage.attempts + 1,
+                         available_at=func.now() + timedelta(seconds=lease_seconds))
+                 .returning(OutboxMessage.id, OutboxMessage.task_id, OutboxMessage.queue, OutboxMessage.payload,
+                            OutboxMessage.attempts, OutboxMessage.created_at)
+                 .execution_options(synchronize_session=False))
+        result = await self.session.execute(query)
+        return sorted((OutboxEntry(*row) for row in result.all()), key=lambda entry: entry.id)
+
+    async def delete_messages(self, message_ids: list[int]) -> None:
+        if not message_ids:
+            return
+        await self.session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(message_ids)))
+
+    async def reschedule_message(self, message_id: int, available_at: datetime, error: str) -> None:
+        await self.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(available_at=available_at, last_error=error)
+            .execution_options(synchronize_session=False)
+        )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.interfaces.registration_confirmation_interface import IRegistrationConfirmationRepository
@@ -36,22 +36,21 @@ class RegistrationConfirmationRepository(IRegistrationConfirmationRepository):
         confirmation.expires_at = expires_at
         confirmation.attempts = 0
 
-        await self.session.commit()
-        await self.session.refresh(confirmation)
+        await self.session.flush()
         return confirmation
 
     async def increment_attempts(self, email: str) -> int:
-        confirmation = await self.get_by_email(email)
-        if confirmation is None:
-            return 0
-
-        confirmation.attempts += 1
-        await self.session.commit()
-        await self.session.refresh(confirmation)
-        return int(confirmation.attempts)
+        # инкремент на стороне базы: параллельные попытки не теряют друг друга, а новое значение приходит в RETURNING
+        result = await self.session.execute(
+            update(RegistrationConfirmation)
+            .where(RegistrationConfirmation.email == email)
+            .values(attempts=RegistrationConfirmation.attempts + 1)
+            .returning(RegistrationConfirmation.attempts)
+        )
+        attempts = result.scalar_one_or_none()
+        return int(attempts) if attempts is not None else 0
 
     async def delete_by_email(self, email: str) -> None:
         await self.session.execute(
             delete(RegistrationConfirmation).where(RegistrationConfirmation.email == email)
         )
-        await self.session.commit()
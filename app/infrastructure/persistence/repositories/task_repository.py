@@ -2,14 +2,21 @@ from typing import Optional
 from datetime import datetime, timezone
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import String, Text, case, cast, column, delete, func, or_, select, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.enums import TaskStatus
 from app.core.interfaces import ITaskRepository
+from app.core.pagination import Cursor
 from app.infrastructure.persistence.models import Task
+from app.infrastructure.persistence.pagination import paginate
 from app.presentation import schemas
 
 
+# из этих статусов задача уже никуда не уходит, кроме другого финального (повторный или поправленный результат)
+TERMINAL_STATUSES = (TaskStatus.succeeded.value, TaskStatus.failed.value)
+
+
 class TaskRepository(ITaskRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -25,8 +32,7 @@ class TaskRepository(ITaskRepository):
             error_msg=task.error_msg,
         )
         self.session.add(db_task)
-        await self.session.commit()
-        await self.session.refresh(db_task)
+        await self.session.flush()
         return db_task
 
     async def create_training_task(self, task: schemas.TaskCreate) -> Task | None:
@@ -40,8 +46,7 @@ class TaskRepository(ITaskRepository):
             error_msg=None,
         )
         self.session.add(db_task)
-        await self.session.commit()
-        await self.session.refresh(db_task)
+        await self.session.flush()
         return db_task
 
     async def get_task_by_id(self, task_id: UUID) -> Optional[Task]:
@@ -56,6 +61,7 @@ class TaskRepository(ITaskRepository):
             limit: int = 100,
             user_id: Optional[UUID] = None,
             model_id: Optional[UUID] = None,
+            cursor: Optional[Cursor] = None,
     ) -> list[Task | None]:
 
         query = select(Task)
@@ -64,13 +70,21 @@ class TaskRepository(ITaskRepository):
             query = query.where(user_id == Task.user_id)
         if model_id:
             query = query.where(model_id == Task.model_id)
-            
-        query = query.offset(skip).limit(limit)
+
+        query = paginate(query, Task, skip, limit, cursor)
 
         result = await self.session.execute(query)
         db_tasks = result.scalars().all()
         return [task for task in db_tasks]
 
+    async def get_recently_active_user_ids(self, limit: int) -> list[UUID]:
+        query = (select(Task.user_id)
+                 .group_by(Task.user_id)
+                 .order_by(func.max(Task.created_at).desc())
+                 .limit(limit))
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def get_tasks_by_user_id(self, user_id: UUID) -> list[Task]:
         query = select(Task).where(user_id == Task.user_id)
 
@@ -78,29 +92,42 @@ class TaskRepository(ITaskRepository):
         db_tasks = result.scalars().all()
         return [task for task in db_tasks]
 
-    async def update_task_status(
-            self,
-            task_id: UUID,
-            status: str,
-            output_path: Optional[str] = None,
-            error_msg: Optional[str] = None,
-    ) -> Optional[Task]:
-        db_task = await self.get_task_by_id(task_id)
-        if not db_task:
-            return None
-
-        db_task.status = status
-        db_task.updated_at = datetime.now(timezone.utc)
-        if output_path is not None:
-            db_task.output_path = output_path
-        if error_msg is not None:
-            db_task.error_msg = error_msg
-        elif status != "failed":
-            db_task.error_msg = None
-
-        await self.session.commit()
-        await self.session.refresh(db_task)
-        return db_task
+    async def update_task_statuses(self, updates: list[dict]) -> list[Task]:
+        if not updates:
+            return []
+        # пачка обновлений от брокера - одним UPDATE ... FROM (VALUES ...) ... RETURNING; условие на статус отсекает
+        # сообщения, пришедшие не по порядку (running после succeeded)
+        rows = values(
+            column("id", Task.id.type),
+            column("status", String),
+            column("output_path", String),
+            column("error_msg", Text),
+            name="updates",
+        ).data([
+            (update_["task_id"], update_["status"], update_.get("output_path"), update_.get("error_msg"))
+            for update_ in updates
+        ])
+        query = (
+            update(Task)
+            .where(Task.id == rows.c.id)
+            .where(or_(rows.c.status.in_(TERMINAL_STATUSES), Task.status.not_in(TERMINAL_STATUSES)))
+            .values(
+                status=cast(rows.c.status, Task.status.type),
+                updated_at=datetime.now(timezone.utc),
+                output_path=func.coalesce(rows.c.output_path, Task.output_path),
+                error_msg=case(
+                    (rows.c.error_msg.is_not(None), rows.c.error_msg),
+                    (rows.c.status != TaskStatus.failed.value, None),
+                    else_=Task.error_msg,
+                ),
+            )
+            .returning(Task)
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await self.session.execute(query)
+        db_tasks = list(result.scalars().all())
+        return db_tasks
 
     async def delete_task_by_id(self, task_id: UUID) -> None:
         query = select(Task).where(task_id == Task.id)
@@ -108,4 +135,20 @@ class TaskRepository(ITaskRepository):
         db_task = result.scalar_one_or_none()
         if db_task:
             await self.session.delete(db_task)
-            await self.session.commit()
+            await self.session.flush()
+
+    async def delete_tasks(self, user_id: UUID, task_ids: Optional[list[UUID]] = None, status: Optional[str] = None,
+                           older_than: Optional[datetime] = None) -> list[Task]:
+        # владелец проверяется в самом DELETE: чужие id просто не попадут в RETURNING
+        query = delete(Task).where(user_id == Task.user_id)
+        if task_ids is not None:
+            query = query.where(Task.id.in_(task_ids))
+        if status is not None:
+            query = query.where(status == Task.status)
+        if older_than is not None:
+            query = query.where(Task.created_at < older_than)
+        query = query.returning(Task).execution_options(synchronize_session=False)
+
+        result = await self.session.execute(query)
+        db_tasks = list(result.scalars().all())
+        return db_tasks
@@ -34,8 +34,7 @@ class UserRepository(IUserRepository):
         default_role = result.scalar_one()
         db_user.user_roles.append(UserRole(role=default_role))
         self.session.add(db_user)
-        await self.session.commit()
-        await self.session.refresh(db_user)
+        await self.session.flush()
         return db_user
 
     async def get_user_by_id(self, user_id: UUID) -> Optional[User]:
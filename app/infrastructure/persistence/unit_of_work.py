@@ -0,0 +1,16 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.interfaces import IUnitOfWork
+
+
+class SQLAlchemyUnitOfWork(IUnitOfWork):
+    # Репозитории запроса работают в одной транзакции и только делают flush; фиксирует ее сервис одним commit,
+    # когда сценарий закончен. Незафиксированное откатывается при закрытии сессии вместе со скоупом запроса.
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
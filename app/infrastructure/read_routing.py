@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.enums import CacheKeysObject, CacheTTL
+from app.core.interfaces import ICacheRepository
+from app.infrastructure.database import AsyncReadSessionLocal, AsyncSessionLocal
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def session_factory() -> async_sessionmaker[AsyncSession]:
+    # реплика - только внутри replica_reads(); записи, консьюмер брокера и все остальное идут в основную базу
+    return AsyncReadSessionLocal if _replica_reads.get() else AsyncSessionLocal
+
+
+class ReadYourWrites:
+    # В кеше лежит момент, с которого пользователю снова можно читать с реплики. Запись удаляет ключ
+    # (delete расходится по шине инвалидации во все воркеры), и следующий GET ставит новый срок now + window.
+    # Нет ключа - читаем с основной базы: после рестарта или обрыва шины ошибаемся в безопасную сторону.
+    def __init__(self, cache: ICacheRepository, window_seconds: float):
+        self.cache = cache
+        self.window_seconds = window_seconds
+
+    async def replica_ready(self, user_id: UUID | str) -> bool:
+        key = CacheKeysObject.replica_reads(user_id=user_id)
+        ready_at = await self.cache.get(key)
+        now = time.time()
+        if ready_at is None:
+            await self.cache.set(key, str(now + self.window_seconds).encode(), expire=CacheTTL.REPLICA_READS.value)
+            return False
+        return now >= float(ready_at.decode())
+
+    async def record_write(self, user_id: UUID | str) -> None:
+        await self.cache.delete(CacheKeysObject.replica_reads(user_id=user_id))
@@ -1,2 +1,3 @@
 from .bobber_publisher import BobberPublisher
+from .outbox_relay import TaskOutboxRelay
 from .task_status_consumer import BobberTaskStatusConsumer
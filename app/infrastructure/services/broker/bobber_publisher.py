@@ -1,26 +1,64 @@
-import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue
+
 from bobber import BobberClient
-from typing import Dict, Any
-import json
+
+from app.core.enums import TaskType
+from .messages import JSON_FORMAT, MessageKind, encode_message
 
 
 class BobberPublisher:
-    def __init__(self, host: str = 'localhost', port: int = 50051):
-        self.client = BobberClient(host, port)
-        if not self.client.healthcheck():
+    def __init__(self, host: str = 'localhost', port: int = 50051, pool_size: int = 4, max_pending: int = 1000,
+                 message_format: str = JSON_FORMAT):
+        # BobberClient блокирующий: каждый поток пула публикует через свой клиент, поэтому produce идут параллельно,
+        # а медленная отправка занимает один поток, а не event loop
+        self.clients = [BobberClient(host, port) for _ in range(pool_size)]
+        if not self.clients[0].healthcheck():
+            for client in self.clients:
+                client.close()
             raise ConnectionError("Bobber broker unavailable")
+        self._idle = SimpleQueue()
+        for client in self.clients:
+            self._idle.put(client)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bobber-publisher")
+        # ограничение на отправки в ожидании потока: при недоступном брокере корутины ждут слота, а не копят очередь
+        self._pending = asyncio.Semaphore(max_pending)
+        self._message_format = message_format
 
     def publish_inference(self, queue: str, message: dict):
         key = f"inference_{message.get('task_id', 'unknown')}"
-        value = json.dumps(message)
-        success = self.client.produce(queue, key, value)
+        value = encode_message(MessageKind.inference, message, self._message_format)
+        success = self._produce(queue, key, value)
         return success
 
     def publish_training(self, queue: str, message: dict):
         key = f"training_{message.get('task_id', 'unknown')}"
-        value = json.dumps(message)
-        success = self.client.produce(queue, key, value)
+        value = encode_message(MessageKind.training, message, self._message_format)
+        success = self._produce(queue, key, value)
         return success
 
+    async def publish(self, queue: str, message: dict) -> bool:
+        if message.get("task_type") == TaskType.training:
+            publish = self.publish_training
+        else:
+            publish = self.publish_inference
+        async with self._pending:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, publish, queue, message)
+
+    async def publish_batch(self, messages: list[tuple[str, dict]]) -> list[bool | BaseException]:
+        # сообщения пачки расходятся по всем клиентам пула сразу, а не отправляются по одному
+        return await asyncio.gather(*(self.publish(queue, message) for queue, message in messages),
+                                    return_exceptions=True)
+
     def close(self):
-        self.client.close()
+        self._executor.shutdown(wait=True)
+        for client in self.clients:
+            client.close()
+
+    def _produce(self, queue: str, key: str, value: str | bytes):
+        client = self._idle.get()
+        try:
+            return client.produce(queue, key, value)
+        finally:
+            self._idle.put(client)
@@ -0,0 +1,205 @@
+import json
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Any, Callable
+from uuid import UUID
+
+import msgpack
+
+from app.core.enums import TaskStatus
+
+MESSAGE_VERSION = 1
+
+JSON_FORMAT = "json"
+MSGPACK_FORMAT = "msgpack"
+
+
+class MessageKind(IntEnum):
+    inference = 1
+    training = 2
+    status = 3
+
+
+class MessageDecodeError(ValueError):
+    pass
+
+
+# Поле схемы - (имя, обязательное, упаковка для msgpack, проверка при чтении). Чтение принимает и компактное
+# представление (16 байт UUID, msgpack Timestamp), и JSON-строки старого формата, поэтому одна схема проверяет оба.
+Field = tuple[str, bool, Callable[[Any], Any], Callable[[Any], Any]]
+
+
+def _pack_uuid(value: Any) -> bytes | None:
+    # str(None) в старых сообщениях о дообучении - это "None", а не отсутствие значения
+    if value is None or value == "None":
+        return None
+    return (value if isinstance(value, UUID) else UUID(str(value))).bytes
+
+
+def _read_uuid(value: Any) -> UUID | None:
+    if type(value) is bytes:
+        return UUID(bytes=value)
+    if isinstance(value, UUID):
+        return value
+    if isinstance(value, str):
+        return None if value == "None" else UUID(value)
+    raise TypeError(f"expected UUID, got {type(value).__name__}")
+
+
+def _pack_timestamp(value: Any) -> datetime:
+    timestamp = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def _read_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    raise TypeError(f"expected timestamp, got {type(value).__name__}")
+
+
+_STATUSES = {status.value: status for status in TaskStatus}
+
+
+def _read_status(value: Any) -> TaskStatus:
+    # словарь вместо TaskStatus(value): вызов Enum заметно дороже на каждом сообщении
+    status = _STATUSES.get(value) if isinstance(value, str) else None
+    if status is None:
+        raise ValueError(f"unknown task status {value!r}")
+    return status
+
+
+def _read_of(*types: type) -> Callable[[Any], Any]:
+    def read(value: Any) -> Any:
+        # bool - подкласс int, но в числовых полях его быть не должно
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise TypeError(f"expected {' or '.join(t.__name__ for t in types)}, got {type(value).__name__}")
+        return value
+
+    return read
+
+
+def _same(value: Any) -> Any:
+    return value
+
+
+_read_str = _read_of(str)
+_read_int = _read_of(int)
+
+# Порядок полей - часть версии схемы: msgpack-сообщение - это массив [версия, вид, поля...].
+# Новые поля только дописываются в конец; читатель старой версии игнорирует лишние хвостовые элементы.
+SCHEMAS: dict[MessageKind, tuple[Field, ...]] = {
+    MessageKind.inference: (
+        ("task_id", True, _pack_uuid, _read_uuid),
+        ("model_id", True, _pack_uuid, _read_uuid),
+        ("model_arch", True, _same, _read_str),
+        ("input_path", True, _same, _read_str),
+        ("timestamp", True, _pack_timestamp, _read_timestamp),
+    ),
+    MessageKind.training: (
+        ("task_id", True, _pack_uuid, _read_uuid),
+        ("model_id", False, _pack_uuid, _read_uuid),
+        ("dataset_id", False, _pack_uuid, _read_uuid),
+        ("user_id", True, _pack_uuid, _read_uuid),
+        ("image_size", False, _same, _read_int),
+        ("epochs", False, _same, _read_int),
+        ("name", False, _same, _read_str),
+        ("timestamp", True, _pack_timestamp, _read_timestamp),
+    ),
+    MessageKind.status: (
+        ("task_id", True, _pack_uuid, _read_uuid),
+        ("status", True, lambda value: _read_status(value).value, _read_status),
+        ("output_path", False, _same, _read_str),
+        ("error_msg", False, _same, _read_str),
+    ),
+}
+
+_REQUIRED = {kind: tuple(name for name, required, _, _ in schema if required) for kind, schema in SCHEMAS.items()}
+
+# на эти поля в JSON-сообщениях не смотрят: их задает сам вид сообщения
+_IMPLIED_FIELDS = {"task_type"}
+
+
+def encode_message(kind: MessageKind, message: dict, message_format: str = JSON_FORMAT) -> str | bytes:
+    if message_format == JSON_FORMAT:
+        # старые воркеры читают только JSON, поэтому он остается прежним, без версии и сжатия
+        return json.dumps(message)
+    if message_format != MSGPACK_FORMAT:
+        raise ValueError(f"Unknown broker message format: {message_format}")
+
+    values = [MESSAGE_VERSION, int(kind)]
+    for name, required, pack, _ in SCHEMAS[kind]:
+        value = message.get(name)
+        if value is None:
+            if required:
+                raise ValueError(f"{kind.name} message is missing '{name}'")
+            values.append(None)
+        else:
+            values.append(pack(value))
+    return msgpack.packb(values, datetime=True)
+
+
+def decode_message(kind: MessageKind, raw: Any) -> dict:
+    # формат определяется по самим данным: словарь от клиента, JSON-строка/байты или msgpack-массив
+    if isinstance(raw, dict):
+        return _validate_mapping(kind, raw)
+    if isinstance(raw, str):
+        return _validate_mapping(kind, _loads_json(raw))
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        raw = bytes(raw)
+        if raw[:1] == b"{":
+            return _validate_mapping(kind, _loads_json(raw))
+        return _validate_packed(kind, raw)
+    raise MessageDecodeError(f"Broker message must be dict, str or bytes, got {type(raw).__name__}")
+
+
+def _loads_json(raw: str | bytes) -> dict:
+    try:
+        value = json.loads(raw)
+    except ValueError as exc:
+        raise MessageDecodeError(f"Invalid JSON broker message: {exc}") from exc
+    if not isinstance(value, dict):
+        raise MessageDecodeError(f"JSON broker message must be an object, got {type(value).__name__}")
+    return value
+
+
+def _validate_mapping(kind: MessageKind, message: dict) -> dict:
+    decoded = _read_fields(kind, ((field, message.get(field[0])) for field in SCHEMAS[kind]))
+    for name, value in message.items():
+        # поля, о которых схема не знает, передаются как есть: их может добавить более новый воркер
+        if name not in decoded and name not in _IMPLIED_FIELDS:
+            decoded[name] = value
+    return decoded
+
+
+def _validate_packed(kind: MessageKind, raw: bytes) -> dict:
+    try:
+        values = msgpack.unpackb(raw, timestamp=3, use_list=False)
+    except Exception as exc:
+        raise MessageDecodeError(f"Invalid msgpack broker message: {exc}") from exc
+    schema = SCHEMAS[kind]
+    if not isinstance(values, tuple) or len(values) < 2:
+        raise MessageDecodeError("msgpack broker message must be an array [version, kind, fields...]")
+    version, packed_kind = values[0], values[1]
+    if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+        raise MessageDecodeError(f"Unsupported broker message version: {version!r}")
+    if packed_kind != kind:
+        raise MessageDecodeError(f"Expected {kind.name} message, got kind {packed_kind!r}")
+
+    fields = values[2:]
+    if len(fields) < len(schema):
+        raise MessageDecodeError(f"{kind.name} message v{version} has {len(fields)} fields, expected {len(schema)}")
+    return _read_fields(kind, zip(schema, fields))
+
+
+def _read_fields(kind: MessageKind, fields) -> dict:
+    # один проход без промежуточных объектов: сообщение сразу превращается в словарь с UUID, TaskStatus и datetime
+    try:
+        decoded = {name: None if value is None else read(value) for (name, _, _, read), value in fields}
+    except (TypeError, ValueError) as exc:
+        raise MessageDecodeError(f"Invalid {kind.name} message: {exc}") from exc
+    for name in _REQUIRED[kind]:
+        if decoded[name] is None:
+            raise MessageDecodeError(f"{kind.name} message is missing '{name}'")
+    return decoded
@@ -0,0 +1,48 @@
+from app.infrastructure.metrics import DEFAULT_SIZE_BUCKETS, Counter, Gauge, Histogram, MetricsRegistry, \
+    metrics_registry
+
+
+class TaskStatusMetrics:
+    def __init__(self, registry: MetricsRegistry | None = None):
+        self.batch_size = Histogram(
+            "task_status_batch_size", "Broker status messages applied per transaction", buckets=DEFAULT_SIZE_BUCKETS,
+        )
+        self.flush_seconds = Histogram("task_status_flush_duration_seconds", "Time to apply one status batch")
+        self.updates = Counter("task_status_updates_total", "Broker status messages by outcome", ("result",))
+        self.queue_depth = Gauge("task_status_queue_depth", "Broker status messages waiting for an apply worker")
+        self.apply_seconds = Histogram(
+            "task_status_apply_latency_seconds", "Time from receiving a status message to applying it",
+        )
+        self.backpressure_waits = Counter(
+            "task_status_backpressure_waits_total", "Times a broker subscription thread waited for queue space",
+        )
+        if registry is not None:
+            for metric in self.all():
+                registry.register(metric)
+
+    def all(self) -> list:
+        return [self.batch_size, self.flush_seconds, self.updates, self.queue_depth, self.apply_seconds,
+                self.backpressure_waits]
+
+
+class OutboxMetrics:
+    def __init__(self, registry: MetricsRegistry | None = None):
+        self.batch_size = Histogram(
+            "task_outbox_batch_size", "Outbox messages claimed per relay transaction", buckets=DEFAULT_SIZE_BUCKETS,
+        )
+        self.relay_seconds = Histogram("task_outbox_relay_duration_seconds", "Time to relay one outbox batch")
+        self.dispatch_lag = Histogram(
+            "task_outbox_dispatch_lag_seconds", "Time from task commit to broker publish",
+            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+        )
+        self.messages = Counter("task_outbox_messages_total", "Outbox messages by outcome", ("result",))
+        if registry is not None:
+            for metric in self.all():
+                registry.register(metric)
+
+    def all(self) -> list:
+        return [self.batch_size, self.relay_seconds, self.dispatch_lag, self.messages]
+
+
+task_status_metrics = TaskStatusMetrics(metrics_registry)
+outbox_metrics = OutboxMetrics(metrics_registry)
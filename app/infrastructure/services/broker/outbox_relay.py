@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncContextManager, Callable
+
+from app.core.enums import TaskStatus
+from app.core.interfaces import OutboxEntry
+from app.core.services.task_status_service import TaskStatusService
+from app.infrastructure.database import AsyncSessionLocal
+from app.infrastructure.persistence.repositories import OutboxRepository, TaskRepository
+from app.infrastructure.persistence.unit_of_work import SQLAlchemyUnitOfWork
+from app.infrastructure.services.cache import cache_service
+from .bobber_publisher import BobberPublisher
+from .metrics import OutboxMetrics, outbox_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TaskOutboxRelay:
+    def __init__(
+        self,
+        publisher: BobberPublisher,
+        session_factory: Callable[[], AsyncContextManager] = AsyncSessionLocal,
+        batch_size: int = 100,
+        poll_interval: float = 0.2,
+        max_attempts: int = 10,
+        retry_base: float = 1.0,
+        retry_max: float = 60.0,
+        lease_seconds: float = 60.0,
+        metrics: OutboxMetrics | None = None,
+    ):
+        self._publisher = publisher
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._retry_base = retry_base
+        self._retry_max = retry_max
+        # аренда должна быть дольше отправки пачки, иначе строку заберет другой воркер и сообщение уйдет дважды
+        self._lease_seconds = lease_seconds
+        self._metrics = metrics or outbox_metrics
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.get_running_loop().create_task(self._relay_forever())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        # пачка в полете дописывается и фиксируется, новая уже не берется
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def relay_once(self) -> int:
+        started = time.perf_counter()
+        # забор строк фиксируется отдельной короткой транзакцией: на время отправки в брокер
+        # ни блокировок, ни открытой транзакции не остается
+        async with self._session_factory() as session:
+            messages = await OutboxRepository(session).claim_messages(self._batch_size, self._lease_seconds)
+            if not messages:
+                return 0
+            await session.commit()
+
+        errors = await self._publish_batch(messages)
+
+        async with self._session_factory() as session:
+            outbox = OutboxRepository(session)
+            now = datetime.now(timezone.utc)
+            done, exhausted = [], []
+            for message in messages:
+                error = errors.get(message.id)
+                if error is None:
+                    done.append(message.id)
+                    if message.created_at is not None:
+                        self._metrics.dispatch_lag.observe((now - message.created_at).total_seconds())
+                elif message.attempts >= self._max_attempts:
+                    done.append(message.id)
+                    exhausted.append(message)
+                else:
+                    available_at = now + timedelta(seconds=self._retry_delay(message.attempts - 1))
+                    await outbox.reschedule_message(message.id, available_at, error)
+            await outbox.delete_messages(done)
+
+            if exhausted:
+                # задача так и не попала в брокер - помечаем ее failed, иначе она навсегда останется queued;
+                # apply_updates фиксирует транзакцию вместе с удалением строк outbox
+                service = TaskStatusService(
+                    task_repo=TaskRepository(session),
+                    cache_repo=cache_service,
+                    uow=SQLAlchemyUnitOfWork(session),
+                )
+                await service.apply_updates([
+                    {
+                        "task_id": message.task_id,
+                        "status": TaskStatus.failed.value,
+                        "error_msg": f"Task could not be dispatched to the broker: {errors[message.id]}",
+                    }
+                    for message in exhausted
+                ])
+            else:
+                await session.commit()
+
+        self._metrics.batch_size.observe(len(messages))
+        self._metrics.relay_seconds.observe(time.perf_counter() - started)
+        self._metrics.messages.inc("published", amount=len(messages) - len(errors))
+        retried = len(errors) - len(exhausted)
+        if retried:
+            self._metrics.messages.inc("retried", amount=retried)
+            logger.warning("%s of %s outbox messages were not published, will retry", retried, len(messages))
+        if exhausted:
+            self._metrics.messages.inc("failed", amount=len(exhausted))
+            logger.error("Giving up on %s outbox messages after %s attempts", len(exhausted), self._max_attempts)
+        return len(messages)
+
+    async def _relay_forever(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                relayed = await self.relay_once()
+            except Exception:
+                logger.exception("Task outbox relay failed")
+                relayed = 0
+            # полная пачка - скорее всего в outbox есть еще, отдаем цикл и продолжаем
+            if relayed >= self._batch_size:
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _publish_batch(self, messages: list[OutboxEntry]) -> dict[int, str]:
+        results = await self._publisher.publish_batch([(message.queue, message.payload) for message in messages])
+        errors = {}
+        for message, result in zip(messages, results):
+            if isinstance(result, BaseException):
+                errors[message.id] = str(result) or type(result).__name__
+            elif not result:
+                errors[message.id] = "broker rejected the message"
+        return errors
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self._retry_max, self._retry_base * 2 ** attempts)
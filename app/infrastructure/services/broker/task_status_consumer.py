@@ -1,8 +1,8 @@
 import asyncio
-import json
 import logging
-from concurrent.futures import Future
-from typing import Any
+import threading
+import time
+from typing import Any, AsyncContextManager, Callable
 
 from bobber import BobberClient
 
@@ -10,10 +10,16 @@ from app.core.enums import QueueTypes
 from app.core.services.task_status_service import TaskStatusService
 from app.infrastructure.database import AsyncSessionLocal
 from app.infrastructure.persistence.repositories import TaskRepository
+from app.infrastructure.persistence.unit_of_work import SQLAlchemyUnitOfWork
 from app.infrastructure.services.cache import cache_service
+from .messages import MessageDecodeError, MessageKind, decode_message
+from .metrics import TaskStatusMetrics, task_status_metrics
 
 logger = logging.getLogger(__name__)
 
+# как часто поток подписки, ждущий места в очереди, проверяет, не закрыт ли консьюмер
+SLOT_WAIT_SECONDS = 0.1
+
 
 class BobberTaskStatusConsumer:
     def __init__(
@@ -21,10 +27,32 @@ class BobberTaskStatusConsumer:
         host: str = "localhost",
         port: int = 50051,
         loop: asyncio.AbstractEventLoop | None = None,
+        max_batch_size: int = 100,
+        flush_interval: float = 0.005,
+        workers: int = 4,
+        max_pending: int = 1000,
+        session_factory: Callable[[], AsyncContextManager] = AsyncSessionLocal,
+        metrics: TaskStatusMetrics | None = None,
+        retry_attempts: int = 3,
+        retry_backoff: float = 0.1,
     ):
         self.client = BobberClient(host, port)
         self._loop = loop
         self._threads = []
+        self._max_batch_size = max_batch_size
+        self._flush_interval = flush_interval
+        self._session_factory = session_factory
+        self._metrics = metrics or task_status_metrics
+        self._retry_attempts = retry_attempts
+        self._retry_backoff = retry_backoff
+        # свободные места в очереди: поток подписки занимает место до постановки сообщения, воркер освобождает
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._closed = threading.Event()
+        # все, что ниже, трогается только из потока event loop;
+        # сообщения одной задачи всегда попадают к одному воркеру, поэтому их порядок сохраняется
+        self._queues: list[asyncio.Queue] = [asyncio.Queue(maxsize=max_pending) for _ in range(workers)]
+        self._workers: list[asyncio.Task] = []
+        self._closing = asyncio.Event()
 
     def start(self) -> None:
         if self._loop is None:
@@ -38,6 +66,7 @@ class BobberTaskStatusConsumer:
         if not self.client.healthcheck():
             raise ConnectionError("Bobber broker unavailable")
 
+        self._workers = [self._loop.create_task(self._apply_forever(queue)) for queue in self._queues]
         for topic in (
             QueueTypes.inference_queue_result.value,
             QueueTypes.training_queue_result.value,
@@ -46,8 +75,19 @@ class BobberTaskStatusConsumer:
             logger.info("Listening to broker topic '%s'", topic)
 
     def close(self) -> None:
+        # потоки подписки, ждущие места в очереди, выходят по этому флагу, а не висят на семафоре
+        self._closed.set()
         self.client.close()
 
+    async def drain(self) -> None:
+        # дописываем то, что уже пришло из брокера, прежде чем закрыть пул соединений
+        self._closing.set()
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
     def _on_broker_message(self, payload: dict) -> None:
         message = self._parse_message(payload)
         if not message:
@@ -57,27 +97,108 @@ class BobberTaskStatusConsumer:
             logger.error("Cannot apply task status update without an active event loop: %s", message)
             return
 
-        future = asyncio.run_coroutine_threadsafe(self._apply_status_update(message), self._loop)
-        future.add_done_callback(lambda done: self._log_status_update_result(done, message))
+        received_at = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            # очередь полна (база не успевает): поток подписки ждет здесь и не забирает из брокера новые сообщения,
+            # вместо того чтобы копить их в памяти и в event loop
+            self._metrics.backpressure_waits.inc()
+            while not self._slots.acquire(timeout=SLOT_WAIT_SECONDS):
+                if self._closed.is_set():
+                    logger.warning("Consumer closed, dropping task status update: %s", message)
+                    return
+        try:
+            # цикл мог закрыться, пока поток ждал места
+            if self._loop.is_closed():
+                raise RuntimeError("Event loop is closed")
+            self._loop.call_soon_threadsafe(self._enqueue, message, received_at)
+        except RuntimeError:
+            self._slots.release()
+            logger.error("Cannot apply task status update without an active event loop: %s", message)
 
-    @staticmethod
-    def _log_status_update_result(future: Future, message: dict) -> None:
+    def _enqueue(self, message: dict, received_at: float) -> None:
+        queue = self._queues[hash(message["task_id"]) % len(self._queues)]
+        queue.put_nowait((message, received_at))
+        self._report_depth()
+
+    async def _apply_forever(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            # сообщения копятся несколько миллисекунд или до max_batch_size и применяются одной транзакцией
+            if queue.qsize() + 1 < self._max_batch_size and not self._closing.is_set():
+                try:
+                    await asyncio.wait_for(self._closing.wait(), self._flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self._max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            for _ in batch:
+                self._slots.release()
+            self._report_depth()
+            try:
+                await self._apply_batch(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _report_depth(self) -> None:
+        self._metrics.queue_depth.set(value=sum(queue.qsize() for queue in self._queues))
+
+    async def _apply_batch(self, batch: list[tuple[dict, float]]) -> None:
+        started = time.perf_counter()
+        updates = [message for message, _ in batch]
         try:
-            future.result()
-        except Exception:
-            logger.exception("Failed to apply task status update: %s", message)
+            tasks, failed = await self._apply_with_retry(updates)
+        finally:
+            self._metrics.batch_size.observe(len(batch))
+            self._metrics.flush_seconds.observe(time.perf_counter() - started)
+            finished = time.perf_counter()
+            for _, received_at in batch:
+                self._metrics.apply_seconds.observe(finished - received_at)
 
-    async def _apply_status_update(self, message: dict) -> None:
-        async with AsyncSessionLocal() as session:
+        if failed:
+            self._metrics.updates.inc("failed", amount=failed)
+        self._metrics.updates.inc("applied", amount=len(tasks))
+        skipped = len(batch) - len(tasks) - failed
+        if skipped:
+            # дубликаты в пачке, неизвестная задача или устаревший статус для уже завершенной
+            self._metrics.updates.inc("skipped", amount=skipped)
+            logger.warning("%s of %s task status updates were not applied", skipped, len(batch))
+        for task in tasks:
+            logger.info("Task %s status updated to %s", task.id, task.status)
+
+    async def _apply_with_retry(self, updates: list[dict]) -> tuple[list, int]:
+        # сбой базы обычно временный: пачка повторяется с растущей паузой
+        for attempt in range(self._retry_attempts):
+            try:
+                return await self._apply_updates(updates), 0
+            except Exception:
+                logger.warning("Failed to apply %s task status updates (attempt %s of %s)",
+                               len(updates), attempt + 1, self._retry_attempts, exc_info=True)
+            if attempt + 1 < self._retry_attempts:
+                await asyncio.sleep(self._retry_backoff * 2 ** attempt)
+
+        if len(updates) == 1:
+            logger.error("Dropping task status update: %s", updates[0])
+            return [], 1
+        # пачка так и не применилась - похоже, в ней сломанное сообщение: применяем по одному,
+        # в исходном порядке, чтобы потерять только его
+        tasks, failed = [], 0
+        for update in updates:
+            try:
+                tasks.extend(await self._apply_updates([update]))
+            except Exception:
+                failed += 1
+                logger.exception("Dropping task status update: %s", update)
+        return tasks, failed
+
+    async def _apply_updates(self, updates: list[dict]) -> list:
+        async with self._session_factory() as session:
             service = TaskStatusService(
                 task_repo=TaskRepository(session),
                 cache_repo=cache_service,
+                uow=SQLAlchemyUnitOfWork(session),
             )
-            task = await service.apply_update(message)
-            if not task:
-                logger.warning("Task status update references unknown task: %s", message.get("task_id"))
-                return
-            logger.info("Task %s status updated to %s", task.id, task.status)
+            return await service.apply_updates(updates)
 
     @staticmethod
     def _parse_message(payload: dict[str, Any]) -> dict | None:
@@ -85,13 +206,9 @@ class BobberTaskStatusConsumer:
         if raw_value is None:
             logger.error("Broker message missing 'value': %s", payload)
             return None
-        if isinstance(raw_value, dict):
-            return raw_value
-        if not isinstance(raw_value, str):
-            logger.error("Broker message value must be str or dict, got %s", type(raw_value))
-            return None
         try:
-            return json.loads(raw_value)
-        except json.JSONDecodeError:
-            logger.exception("Failed to decode broker message JSON: %s", raw_value)
+            # проверка схемы идет еще в потоке подписки: в event loop попадают только годные сообщения
+            return decode_message(MessageKind.status, raw_value)
+        except MessageDecodeError:
+            logger.exception("Failed to decode broker status message: %r", raw_value)
             return None
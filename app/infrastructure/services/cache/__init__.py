@@ -1 +1,4 @@
 from .cache_service import CacheService, cache_service
+from .invalidation_bus import PostgresInvalidationBus, asyncpg_dsn
+from .metrics import CacheMetrics
+from .redis_store import RedisCacheStore, RedisError
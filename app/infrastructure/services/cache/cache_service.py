@@ -1,93 +1,459 @@
+import asyncio
+import concurrent.futures
+import heapq
+import logging
+import math
 import random
 import re
+import sys
 import time
-import threading
-from typing import Any, Optional, Union
+from collections import OrderedDict
+from functools import partial
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Coroutine, Optional, Union
 
 from app.core.interfaces import ICacheRepository
+from app.infrastructure.config import settings
+from app.infrastructure.metrics import metrics_registry
+from .keys import KEY_SEPARATOR, key_family, key_prefixes, owner_prefix
+from .metrics import CacheMetrics
+from .redis_store import RedisCacheStore, RedisError
+
+if TYPE_CHECKING:
+    from .invalidation_bus import PostgresInvalidationBus
+
+logger = logging.getLogger(__name__)
+
+WILDCARDS = ("*", "?")
+# недоступность разделяемого хранилища не должна ронять запросы: работаем на L1
+SHARED_STORE_ERRORS = (OSError, EOFError, RedisError)
+# отрицательная запись: сущности с таким ключом нет в БД
+MISSING = object()
+
+
+def _compile_pattern(pattern: str) -> re.Pattern:
+    regex = "^" + re.escape(pattern).replace(r"\*", ".*").replace(r"\?", ".") + "$"
+    return re.compile(regex)
+
+
+def _estimate_size(value: Any) -> int:
+    # приблизительный размер: getsizeof контейнера плюс содержимое, без учета общих объектов
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+
+class _CacheEntry:
+    __slots__ = ("value", "expiry", "size", "refresh_at")
+
+    def __init__(self, value: Any, expiry: float, size: int, refresh_at: float = float('inf')):
+        self.value = value
+        self.expiry = expiry
+        self.size = size
+        # после refresh_at значение еще отдается, но его пора обновить в фоне
+        self.refresh_at = refresh_at
 
 
 class AsyncMemoryCache:
-    def __init__(self):
-        self._store: dict[str, tuple[Any, float]] = {}
-        self._lock = threading.RLock()
+    # Кеш привязан к одному event loop и не берет блокировок: все вызовы должны идти из этого loop.
+    # Из других потоков - только через CacheService.submit.
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, metrics: CacheMetrics | None = None):
+        # порядок _store - порядок LRU: в начале самые давно использованные ключи
+        self._store: OrderedDict[str, _CacheEntry] = OrderedDict()
+        # префикс ключа по сегментам -> ключи, чтобы delete_pattern не сканировал весь _store
+        self._prefix_index: dict[str, set[str]] = {}
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        # (expiry, key); устаревшие записи (ключ перезаписан или удален) выбрасываются при sweep
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._bytes = 0
+        self._evictions = 0
+        self._rejected = 0
+        self._expired = 0
+        self._metrics = metrics or CacheMetrics()
 
     async def get(self, key: str) -> Optional[Any]:
-        with self._lock:
-            if key in self._store:
-                value, expiry = self._store[key]
-                if time.time() < expiry:
-                    return value
-                del self._store[key]
-            return None
-
-    async def set(self, key: str, value: Any, ttl: int = 0) -> None:
-        with self._lock:
-            if ttl > 0:
-                expiry = time.time() + ttl
-            else:
-                expiry = float('inf')
-            self._store[key] = (value, expiry)
-
-    async def delete(self, key: str) -> bool:
-        with self._lock:
-            if key in self._store:
-                del self._store[key]
-                return True
-            return False
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
 
-    async def keys(self, pattern: str = "*") -> list[str]:
-        regex = "^" + re.escape(pattern).replace(r"\*", ".*").replace(r"\?", ".") + "$"
-        compiled = re.compile(regex)
+    def get_entry(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._store.get(key)
+        if entry is not None:
+            if time.time() < entry.expiry:
+                self._store.move_to_end(key)
+                return entry
+            self._expire(key)
+        return None
 
+    async def set(self, key: str, value: Any, ttl: int = 0, refresh_after: int = 0) -> None:
         now = time.time()
-        matched = []
-        expired_keys = []
+        expiry = now + ttl if ttl > 0 else float('inf')
+        refresh_at = now + refresh_after if refresh_after > 0 else float('inf')
+        size = _estimate_size(key) + _estimate_size(value)
 
-        with self._lock:
-            for key in self._store:
-                if compiled.match(key):
-                    _, expiry = self._store[key]
-                    if now < expiry:
-                        matched.append(key)
-                    else:
-                        expired_keys.append(key)
+        if key in self._store:
+            self._remove(key)
+        if self._max_bytes and size > self._max_bytes:
+            self._rejected += 1
+            return
 
-            for k in expired_keys:
-                del self._store[k]
+        self._index(key)
+        self._store[key] = _CacheEntry(value, expiry, size, refresh_at)
+        self._bytes += size
+        self._metrics.add_entry(key_family(key), size)
+        if ttl > 0:
+            heapq.heappush(self._expiry_heap, (expiry, key))
+        self._evict()
 
+    async def delete(self, key: str) -> bool:
+        if key in self._store:
+            self._remove(key)
+            return True
+        return False
+
+    async def keys(self, pattern: str = "*") -> list[str]:
+        now = time.time()
+        matched = []
+        for key in self._scan(pattern)[0]:
+            if now < self._store[key].expiry:
+                matched.append(key)
+            else:
+                self._expire(key)
         return matched
 
+    async def delete_pattern(self, pattern: str) -> tuple[int, int]:
+        # (удалено ключей, просмотрено кандидатов)
+        matched, scanned = self._scan(pattern)
+        for key in matched:
+            self._remove(key)
+        return len(matched), scanned
+
     async def clear(self) -> None:
-        with self._lock:
-            self._store.clear()
+        self._store.clear()
+        self._prefix_index.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
+        self._metrics.reset_entries()
 
     @property
     def size(self) -> int:
+        # просроченные ключи, до которых еще не дошел sweep, тоже учитываются
+        return len(self._store)
+
+    def sweep(self, max_keys: int) -> int:
+        # за один вызов просматривает не больше max_keys записей кучи, чтобы не блокировать event loop
         now = time.time()
-        with self._lock:
-            return sum(1 for _, exp in self._store.values() if now < exp)
+        processed = 0
+        heap = self._expiry_heap
+        while heap and processed < max_keys and heap[0][0] <= now:
+            expiry, key = heapq.heappop(heap)
+            processed += 1
+            entry = self._store.get(key)
+            if entry is not None and entry.expiry == expiry:
+                self._expire(key)
+
+        if len(heap) > 4 * len(self._store) + 1024:
+            self._expiry_heap = [(e.expiry, k) for k, e in self._store.items() if e.expiry != float('inf')]
+            heapq.heapify(self._expiry_heap)
+        return processed
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "evictions": self._evictions,
+            "rejected": self._rejected,
+            "expired": self._expired,
+        }
+
+    def _evict(self) -> None:
+        while self._store and (
+                (self._max_entries and len(self._store) > self._max_entries)
+                or (self._max_bytes and self._bytes > self._max_bytes)
+        ):
+            oldest = next(iter(self._store))
+            self._remove(oldest)
+            self._evictions += 1
+            self._metrics.evictions.inc(key_family(oldest))
+
+    def _scan(self, pattern: str) -> tuple[list[str], int]:
+        wildcard_at = min((pattern.find(w) for w in WILDCARDS if w in pattern), default=-1)
+        if wildcard_at == -1:
+            return ([pattern], 1) if pattern in self._store else ([], 1)
+
+        head = pattern[:wildcard_at]
+        prefix = head[:head.rfind(KEY_SEPARATOR) + 1]
+        candidates = self._prefix_index.get(prefix, ()) if prefix else self._store
+
+        if prefix == head and pattern == head + "*":
+            return list(candidates), len(candidates)
+
+        compiled = _compile_pattern(pattern)
+        return [key for key in candidates if compiled.match(key)], len(candidates)
+
+    def _index(self, key: str) -> None:
+        for prefix in key_prefixes(key):
+            self._prefix_index.setdefault(prefix, set()).add(key)
+
+    def _expire(self, key: str) -> None:
+        self._remove(key)
+        self._expired += 1
+        self._metrics.expirations.inc(key_family(key))
+
+    def _remove(self, key: str) -> None:
+        entry = self._store.pop(key)
+        self._bytes -= entry.size
+        self._metrics.remove_entry(key_family(key), entry.size)
+        for prefix in key_prefixes(key):
+            keys = self._prefix_index.get(prefix)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._prefix_index[prefix]
+
 
 class CacheService(ICacheRepository):
-    def __init__(self, base_ttl: int = 5, jitter_ratio: float = 0.3):
-        self._cache = AsyncMemoryCache()
+    def __init__(self, base_ttl: int = 5, jitter_ratio: float = 0.3, max_entries: int = 0, max_bytes: int = 0,
+                 metrics: CacheMetrics | None = None, shared: RedisCacheStore | None = None):
+        self._metrics = metrics or CacheMetrics()
+        # L2, общий для всех воркеров и нод; L1 (_cache) остается первым уровнем
+        self._shared = shared
+        self._cache = AsyncMemoryCache(max_entries=max_entries, max_bytes=max_bytes, metrics=self._metrics)
         self._base_ttl = base_ttl
         self._jitter_ratio = jitter_ratio
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sweeper: asyncio.Task | None = None
+        self._bus: Optional["PostgresInvalidationBus"] = None
+        # ключ -> загрузка, которую ждут все одновременные промахи по этому ключу
+        self._inflight: dict[str, asyncio.Task] = {}
 
     async def get(self, key: str) -> Optional[Union[dict, list]]:
-        return await self._cache.get(key)
+        value = await self._cache.get(key)
+        if value is not None:
+            self._metrics.hits.inc(key_family(key))
+            if value is MISSING:
+                self._metrics.negative_hits.inc(key_family(key))
+                return None
+            return value
+
+        self._metrics.misses.inc(key_family(key))
+        if self._shared is not None:
+            value, ttl = await self._get_shared(key)
+            if value is not None:
+                await self._cache.set(key, value, ttl=ttl)
+        return value
 
-    async def set(self, key: str, value: Any, expire: int | None = None) -> None:
+    async def set(self, key: str, value: Any, expire: int | None = None, stale_after: int | None = None) -> None:
         ttl = self._calculate_ttl(expire)
-        await self._cache.set(key, value, ttl=ttl)
+        refresh_after = self._calculate_ttl(stale_after) if stale_after else 0
+        if ttl:
+            refresh_after = min(refresh_after, ttl)
+        self._metrics.sets.inc(key_family(key))
+        await self._cache.set(key, value, ttl=ttl, refresh_after=refresh_after)
+        # в L2 попадают только готовые JSON-ответы в байтах, остальное живет лишь в памяти процесса
+        if self._shared is not None and isinstance(value, bytes):
+            try:
+                await self._shared.set(key, value, ttl=ttl)
+            except SHARED_STORE_ERRORS:
+                self._shared_failed(key, "set")
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], expire: int | None = None,
+                          stale_after: int | None = None, missing_ttl: int | None = None) -> Any:
+        # stale_after - мягкий TTL: после него значение отдается сразу, а обновляется одной фоновой загрузкой;
+        # missing_ttl - сколько помнить, что loader вернул None
+        family = key_family(key)
+        entry = self._cache.get_entry(key)
+        if entry is not None:
+            self._metrics.hits.inc(family)
+            if entry.value is MISSING:
+                self._metrics.negative_hits.inc(family)
+                return None
+            if entry.refresh_at <= time.time():
+                self._metrics.stale_hits.inc(family)
+                if key not in self._inflight:
+                    self._start_load(key, loader, expire, stale_after, missing_ttl, background=True)
+            return entry.value
+
+        self._metrics.misses.inc(family)
+        load = self._inflight.get(key) or self._start_load(key, loader, expire, stale_after, missing_ttl)
+        # отмена одного ожидающего не должна отменять загрузку для остальных
+        return await asyncio.shield(load)
+
+    async def is_known_missing(self, key: str) -> bool:
+        entry = self._cache.get_entry(key)
+        if entry is None or entry.value is not MISSING:
+            return False
+        self._metrics.hits.inc(key_family(key))
+        self._metrics.negative_hits.inc(key_family(key))
+        return True
+
+    async def mark_missing(self, key: str, expire: int | None = None) -> None:
+        # только L1: создание сущности удаляет ключ через delete, и запись пропадает во всех воркерах по шине
+        await self._cache.set(key, MISSING, ttl=self._calculate_ttl(expire))
 
     async def delete(self, key: str) -> None:
-        await self._cache.delete(key)
+        await self.delete_local(key)
+        if self._shared is not None:
+            try:
+                await self._shared.delete(key)
+            except SHARED_STORE_ERRORS:
+                self._shared_failed(key, "delete")
+        if self._bus is not None:
+            self._bus.publish_key(key)
 
     async def delete_pattern(self, pattern: str) -> None:
-        keys = await self._cache.keys(pattern)
-        for key in keys:
-            await self._cache.delete(key)
+        await self.delete_pattern_local(pattern)
+        if self._shared is not None:
+            await self._delete_pattern_shared(pattern)
+        if self._bus is not None:
+            self._bus.publish_pattern(pattern)
+
+    # *_local применяют инвалидацию только в этом воркере, без публикации в шину
+    async def delete_local(self, key: str) -> None:
+        self._inflight.pop(key, None)
+        self._metrics.invalidations.inc(key_family(key))
+        await self._cache.delete(key)
+
+    async def delete_pattern_local(self, pattern: str) -> None:
+        if self._inflight:
+            compiled = _compile_pattern(pattern)
+            for key in [key for key in self._inflight if compiled.match(key)]:
+                del self._inflight[key]
+        family = key_family(pattern)
+        started = time.perf_counter()
+        _, scanned = await self._cache.delete_pattern(pattern)
+        self._metrics.invalidations.inc(family)
+        self._metrics.pattern_delete_seconds.observe(time.perf_counter() - started, family)
+        self._metrics.pattern_delete_scanned.observe(scanned, family)
+
+    async def clear_local(self) -> None:
+        await self._cache.clear()
+
+    def attach_bus(self, bus: Optional["PostgresInvalidationBus"]) -> None:
+        self._bus = bus
+
+    def stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+    def family_stats(self) -> dict[str, dict]:
+        return self._metrics.by_family()
+
+    async def close_shared(self) -> None:
+        if self._shared is not None:
+            await self._shared.close()
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        # для редких вызовов не из event loop кеша, например из потоков подписки брокера
+        if self._loop is None or self._loop.is_closed():
+            coro.close()
+            raise RuntimeError("CacheService is not bound to a running event loop")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def start_sweeper(self, interval: float = 1.0, batch_size: int = 1000) -> None:
+        self.bind_loop(asyncio.get_running_loop())
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever(interval, batch_size))
+
+    async def stop_sweeper(self) -> None:
+        if self._sweeper is None:
+            return
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
+
+    async def _sweep_forever(self, interval: float, batch_size: int) -> None:
+        while True:
+            try:
+                processed = self._cache.sweep(batch_size)
+            except Exception:
+                logger.exception("Cache sweep failed")
+                processed = 0
+            # полный батч - скорее всего есть еще просроченные ключи, отдаем цикл и продолжаем
+            await asyncio.sleep(0 if processed >= batch_size else interval)
+
+    def _start_load(self, key: str, loader: Callable[[], Awaitable[Any]], expire: int | None,
+                    stale_after: int | None, missing_ttl: int | None, background: bool = False) -> asyncio.Task:
+        load = asyncio.get_running_loop().create_task(
+            self._load(key, loader, expire, stale_after, missing_ttl, background)
+        )
+        self._inflight[key] = load
+        load.add_done_callback(partial(self._forget_load, key, background))
+        return load
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], expire: int | None,
+                    stale_after: int | None, missing_ttl: int | None, background: bool = False) -> Any:
+        # фоновое обновление идет сразу в источник: в L2 скорее всего лежит то же устаревающее значение
+        if self._shared is not None and not background:
+            value, ttl = await self._get_shared(key)
+            if value is not None:
+                if self._inflight.get(key) is asyncio.current_task():
+                    await self._cache.set(key, value, ttl=ttl)
+                return value
+
+        started = time.perf_counter()
+        value = await loader()
+        self._metrics.load_seconds.observe(time.perf_counter() - started, key_family(key))
+        # если ключ инвалидировали во время загрузки, значение могло устареть - отдаем, но не кешируем
+        if self._inflight.get(key) is asyncio.current_task():
+            if value is not None:
+                await self.set(key, value, expire, stale_after=stale_after)
+            elif missing_ttl:
+                await self.mark_missing(key, missing_ttl)
+        return value
+
+    def _forget_load(self, key: str, background: bool, load: asyncio.Task) -> None:
+        if self._inflight.get(key) is load:
+            del self._inflight[key]
+        if load.cancelled():
+            return
+        exc = load.exception()
+        if exc is not None and background:
+            logger.warning("Background refresh of cache key '%s' failed", key, exc_info=exc)
+
+    async def _get_shared(self, key: str) -> tuple[Any, int]:
+        family = key_family(key)
+        try:
+            value, ttl_ms = await self._shared.get(key)
+        except SHARED_STORE_ERRORS:
+            self._shared_failed(key, "get")
+            return None, 0
+        if value is None:
+            self._metrics.shared_misses.inc(family)
+            return None, 0
+        self._metrics.shared_hits.inc(family)
+        # в L1 значение живет не дольше, чем осталось в L2
+        return value, math.ceil(ttl_ms / 1000) if ttl_ms > 0 else 0
+
+    async def _delete_pattern_shared(self, pattern: str) -> None:
+        wildcard_at = min((pattern.find(w) for w in WILDCARDS if w in pattern), default=-1)
+        try:
+            if wildcard_at == -1:
+                await self._shared.delete(pattern)
+                return
+            # в L2 теги есть только у ключей владельца ("tasks:<user_id>:"), шаблон должен быть не шире его
+            prefix = owner_prefix(pattern[:wildcard_at])
+            if prefix is None:
+                logger.warning("Pattern '%s' has no owner prefix, shared cache entries are left to expire", pattern)
+                return
+            compiled = _compile_pattern(pattern)
+            await self._shared.delete_tagged(prefix, lambda key: compiled.match(key) is not None)
+        except SHARED_STORE_ERRORS:
+            self._shared_failed(pattern, "delete_pattern")
+
+    def _shared_failed(self, key: str, operation: str) -> None:
+        self._metrics.shared_errors.inc(key_family(key))
+        logger.warning("Shared cache %s failed for '%s'", operation, key, exc_info=True)
 
     def _calculate_ttl(self, expire: int | None = None) -> int:
         base_ttl = expire if expire is not None else self._base_ttl
@@ -97,4 +463,22 @@ class CacheService(ICacheRepository):
         return int(base_ttl + jitter)
 
 
-cache_service = CacheService()
+def _shared_store() -> RedisCacheStore | None:
+    if settings.CACHE_BACKEND == "memory":
+        return None
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheStore.from_url(
+            settings.CACHE_REDIS_URL,
+            pool_size=settings.CACHE_REDIS_POOL_SIZE,
+            timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+            tag_ttl=settings.CACHE_REDIS_TAG_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+cache_service = CacheService(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    metrics=CacheMetrics(metrics_registry),
+    shared=_shared_store(),
+)
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+if TYPE_CHECKING:
+    from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payload ограничен 8000 байтами (считаются байты закодированной строки, не символы)
+MAX_PAYLOAD_BYTES = 7900
+
+
+def _encode(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class PostgresInvalidationBus:
+    def __init__(self, dsn: str, channel: str, cache: "CacheService", reconnect_delay: float = 1.0):
+        self._dsn = dsn
+        self._channel = channel
+        self._cache = cache
+        self._reconnect_delay = reconnect_delay
+        self._origin = uuid4().hex
+        self._queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        # инвалидация, не влезшая в предыдущую пачку, уходит первой в следующей
+        self._carry: tuple[str, str] | None = None
+        # часть инвалидаций не дошла до соседей - при первой возможности они сбрасывают весь L1
+        self._flush_pending = False
+        self._connection: asyncpg.Connection | None = None
+        # завершившиеся задачи (в том числе переподключения) убирают себя сами, см. _spawn
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def start(self) -> None:
+        self._cache.attach_bus(self)
+        self._spawn(self._connect_forever(first_attempt=True))
+        self._spawn(self._publish_forever())
+
+    async def close(self) -> None:
+        self._closed = True
+        self._cache.attach_bus(None)
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+
+    def publish_key(self, key: str) -> None:
+        self._queue.put_nowait(("k", key))
+
+    def publish_pattern(self, pattern: str) -> None:
+        self._queue.put_nowait(("p", pattern))
+
+    async def _connect_forever(self, first_attempt: bool = False) -> None:
+        while not self._closed:
+            try:
+                connection = await asyncpg.connect(self._dsn)
+                await connection.add_listener(self._channel, self._on_notify)
+                connection.add_termination_listener(self._on_termination)
+            except Exception:
+                logger.exception("Cache invalidation bus failed to connect, retrying in %ss", self._reconnect_delay)
+                await asyncio.sleep(self._reconnect_delay)
+                first_attempt = False
+                continue
+
+            self._connection = connection
+            if not first_attempt:
+                # пока соединения не было, чужие инвалидации могли пройти мимо
+                await self._cache.clear_local()
+            if self._flush_pending:
+                # а наши не дошли до соседей: просим их тоже сбросить L1
+                await self._send({"o": self._origin, "f": 1})
+            logger.info("Cache invalidation bus listening on '%s'", self._channel)
+            return
+
+    def _on_termination(self, _connection: asyncpg.Connection) -> None:
+        self._connection = None
+        if not self._closed:
+            logger.warning("Cache invalidation bus connection lost, reconnecting")
+            self._spawn(self._connect_forever())
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish_forever(self) -> None:
+        while True:
+            if self._carry is not None:
+                (op, value), self._carry = self._carry, None
+            else:
+                op, value = await self._queue.get()
+            batch = {"o": self._origin, "k": [], "p": []}
+            batch[op].append(value)
+            size = len(_encode(batch).encode())
+            while not self._queue.empty():
+                op, value = self._queue.get_nowait()
+                # точный размер элемента в JSON плюс запятая-разделитель
+                item_size = len(_encode(value).encode()) + 1
+                if size + item_size > MAX_PAYLOAD_BYTES:
+                    self._carry = (op, value)
+                    break
+                batch[op].append(value)
+                size += item_size
+
+            if size > MAX_PAYLOAD_BYTES:
+                # один ключ больше лимита NOTIFY - адресно его не передать, соседи сбрасывают L1 целиком
+                logger.warning("Cache invalidation of %s bytes exceeds NOTIFY limit, flushing peers", size)
+                batch = {"o": self._origin, "f": 1}
+            if self._flush_pending:
+                batch = {"o": self._origin, "f": 1}
+            await self._send(batch)
+
+    async def _send(self, batch: dict) -> None:
+        connection = self._connection
+        if connection is None:
+            # отправим сброс L1 соседям сразу после переподключения
+            self._flush_pending = True
+            logger.warning("Cache invalidation bus is disconnected, peers will flush their local cache on reconnect")
+            return
+        try:
+            await connection.execute("SELECT pg_notify($1, $2)", self._channel, _encode(batch))
+        except Exception:
+            self._flush_pending = True
+            logger.exception("Failed to publish cache invalidations, peers will flush their local cache")
+            return
+        if batch.get("f"):
+            self._flush_pending = False
+
+    async def _on_notify(self, _connection: asyncpg.Connection, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.error("Malformed cache invalidation payload: %s", payload)
+            return
+        if message.get("o") == self._origin:
+            return
+        if message.get("f"):
+            await self._cache.clear_local()
+            return
+
+        for key in message.get("k", ()):
+            await self._cache.delete_local(key)
+        for pattern in message.get("p", ()):
+            await self._cache.delete_pattern_local(pattern)
@@ -0,0 +1,23 @@
+from typing import Iterable, Optional
+
+KEY_SEPARATOR = ":"
+
+
+def key_family(key: str) -> str:
+    # семейство - первый сегмент ключа: "tasks:<user_id>:0:100" -> "tasks"
+    return key.partition(KEY_SEPARATOR)[0]
+
+
+def key_prefixes(key: str) -> Iterable[str]:
+    # "tasks:<user_id>:0:100" -> "tasks:", "tasks:<user_id>:", "tasks:<user_id>:0:"
+    index = key.find(KEY_SEPARATOR)
+    while index != -1:
+        yield key[:index + 1]
+        index = key.find(KEY_SEPARATOR, index + 1)
+
+
+def owner_prefix(key: str) -> Optional[str]:
+    # "tasks:<user_id>:0:100" -> "tasks:<user_id>:"; у ключей объектов ("task:<id>") второго разделителя нет -> None
+    first = key.find(KEY_SEPARATOR)
+    second = key.find(KEY_SEPARATOR, first + 1) if first != -1 else -1
+    return key[:second + 1] if second != -1 else None
@@ -0,0 +1,71 @@
+from app.infrastructure.metrics import DEFAULT_SIZE_BUCKETS, Counter, Gauge, Histogram, MetricsRegistry
+
+
+class CacheMetrics:
+    def __init__(self, registry: MetricsRegistry | None = None):
+        labels = ("family",)
+        self.hits = Counter("cache_hits_total", "Cache lookups answered from memory", labels)
+        self.stale_hits = Counter("cache_stale_hits_total", "Hits served past the soft TTL", labels)
+        self.negative_hits = Counter("cache_negative_hits_total", "Hits on remembered not-found lookups", labels)
+        self.misses = Counter("cache_misses_total", "Cache lookups that missed", labels)
+        self.sets = Counter("cache_sets_total", "Values written to the cache", labels)
+        self.invalidations = Counter("cache_invalidations_total", "Key and pattern invalidations", labels)
+        self.evictions = Counter("cache_evictions_total", "Entries evicted by the LRU limits", labels)
+        self.expirations = Counter("cache_expirations_total", "Entries dropped after their TTL", labels)
+        self.shared_hits = Counter("cache_shared_hits_total", "L1 misses answered by the shared store", labels)
+        self.shared_misses = Counter("cache_shared_misses_total", "L1 misses the shared store missed too", labels)
+        self.shared_errors = Counter("cache_shared_errors_total", "Failed shared store operations", labels)
+        self.entries = Gauge("cache_entries", "Entries currently cached", labels)
+        self.bytes = Gauge("cache_bytes", "Approximate size of cached entries", labels)
+        self.load_seconds = Histogram("cache_load_duration_seconds", "Loader latency on cache misses", labels)
+        self.pattern_delete_seconds = Histogram(
+            "cache_pattern_delete_duration_seconds", "delete_pattern latency", labels,
+        )
+        self.pattern_delete_scanned = Histogram(
+            "cache_pattern_delete_scanned_keys", "Keys examined by delete_pattern", labels,
+            buckets=DEFAULT_SIZE_BUCKETS,
+        )
+        if registry is not None:
+            for metric in self.all():
+                registry.register(metric)
+
+    def all(self) -> list:
+        return [
+            self.hits, self.stale_hits, self.negative_hits, self.misses, self.sets, self.invalidations, self.evictions,
+            self.expirations, self.shared_hits, self.shared_misses, self.shared_errors, self.entries, self.bytes,
+            self.load_seconds, self.pattern_delete_seconds, self.pattern_delete_scanned,
+        ]
+
+    def add_entry(self, family: str, size: int) -> None:
+        self.entries.inc(family)
+        self.bytes.inc(family, amount=size)
+
+    def remove_entry(self, family: str, size: int) -> None:
+        self.entries.inc(family, amount=-1)
+        self.bytes.inc(family, amount=-size)
+
+    def reset_entries(self) -> None:
+        self.entries.reset()
+        self.bytes.reset()
+
+    def by_family(self) -> dict[str, dict]:
+        # сводка для админки: одна строка на семейство ключей
+        counters = {
+            "hits": self.hits, "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits, "misses": self.misses, "sets": self.sets,
+            "invalidations": self.invalidations, "evictions": self.evictions, "expirations": self.expirations,
+            "shared_hits": self.shared_hits, "shared_misses": self.shared_misses, "shared_errors": self.shared_errors,
+            "entries": self.entries, "bytes": self.bytes,
+        }
+        families: dict[str, dict] = {}
+        for name, metric in counters.items():
+            for (family,), value in metric.snapshot().items():
+                families.setdefault(family, dict.fromkeys(counters, 0))[name] = value
+        for name, histogram in (("load", self.load_seconds), ("pattern_scan", self.pattern_delete_scanned)):
+            for (family,), summary in histogram.snapshot().items():
+                families.setdefault(family, dict.fromkeys(counters, 0))[name] = summary
+
+        for row in families.values():
+            lookups = row["hits"] + row["misses"]
+            row["hit_ratio"] = row["hits"] / lookups if lookups else None
+        return dict(sorted(families.items()))
@@ -0,0 +1,88 @@
+import time
+from typing import Callable, Optional
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
+
+from .keys import owner_prefix
+
+# префикс отличается от прежних тегов-множеств ("tag:"): ZADD в оставшееся множество упал бы с WRONGTYPE,
+# а старые множества больше никто не продлевает, и они истекают сами
+TAG_PREFIX = "ztag:"
+# тег читается через ZSCAN порциями такого размера, и удаляются ключи теми же порциями
+TAG_SCAN_COUNT = 500
+
+
+class RedisCacheStore:
+    # Разделяемый L2 поверх Redis. Для delete_pattern ключи списков складываются в тег своего
+    # владельца ("ztag:tasks:<user_id>:"), поэтому SCAN по всей базе не нужен. Ключи объектов ("task:<id>")
+    # удаляются только точечно и в теги не попадают.
+    # Тег - ZSET с временем истечения ключа в качестве score: ключи поиска и name_contains приходят от
+    # пользователя, и без чистки тег активного владельца рос бы бесконечно. Каждая запись в тег заодно
+    # убирает из него уже истекшие ключи, так что его размер ограничен числом живых ключей.
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 pool_size: int = 8, timeout: float = 0.5, tag_ttl: int = 3600, url: Optional[str] = None):
+        # блокирующий пул: при занятых соединениях запрос ждет свободное до timeout, а не открывает новое
+        options = dict(max_connections=pool_size, timeout=timeout, socket_timeout=timeout,
+                       socket_connect_timeout=timeout)
+        if url:
+            pool = BlockingConnectionPool.from_url(url, **options)
+        else:
+            pool = BlockingConnectionPool(host=host, port=port, db=db, password=password, **options)
+        self._redis = Redis.from_pool(pool)
+        self._tag_ttl = tag_ttl
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCacheStore":
+        return cls(url=url, **kwargs)
+
+    async def get(self, key: str) -> tuple[Optional[bytes], int]:
+        # значение и оставшийся TTL в миллисекундах (-1 - без срока) за один round-trip
+        async with self._redis.pipeline(transaction=False) as pipe:
+            value, ttl_ms = await pipe.get(key).pttl(key).execute()
+        return value, ttl_ms
+
+    async def set(self, key: str, value: bytes, ttl: int = 0) -> None:
+        tag = owner_prefix(key)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, value, ex=ttl or None)
+            if tag is not None:
+                now = time.time()
+                # ключ без срока из тега не вычищается
+                expires_at = now + ttl if ttl else float("inf")
+                (pipe.zadd(TAG_PREFIX + tag, {key: expires_at})
+                 .zremrangebyscore(TAG_PREFIX + tag, "-inf", now)
+                 .expire(TAG_PREFIX + tag, max(ttl, self._tag_ttl)))
+            await pipe.execute()
+
+    async def delete(self, key: str) -> None:
+        tag = owner_prefix(key)
+        if tag is None:
+            await self._redis.delete(key)
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            await pipe.delete(key).zrem(TAG_PREFIX + tag, key).execute()
+
+    async def delete_tagged(self, prefix: str, predicate: Callable[[str], bool]) -> int:
+        tag = TAG_PREFIX + prefix
+        deleted = 0
+        batch: list[str] = []
+        async for member, _expires_at in self._redis.zscan_iter(tag, count=TAG_SCAN_COUNT):
+            key = member.decode()
+            if predicate(key):
+                batch.append(key)
+            if len(batch) >= TAG_SCAN_COUNT:
+                deleted += await self._delete_members(tag, batch)
+                batch = []
+        if batch:
+            deleted += await self._delete_members(tag, batch)
+        return deleted
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+    async def _delete_members(self, tag: str, keys: list[str]) -> int:
+        # ключи и их записи в теге удаляются одной транзакцией MULTI/EXEC
+        async with self._redis.pipeline(transaction=True) as pipe:
+            await pipe.delete(*keys).zrem(tag, *keys).execute()
+        return len(keys)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from dishka import AsyncContainer
+
+from app.core.interfaces import ITaskRepository
+from app.core.services import DatasetService, ModelService
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    # Каждая задача прогрева открывает свой request-контейнер (и свою сессию), одновременно - не больше concurrency.
+    def __init__(self, container: AsyncContainer, concurrency: int = 4, hot_users: int = 0):
+        self._container = container
+        self._concurrency = max(1, concurrency)
+        self._hot_users = hot_users
+
+    async def run(self) -> dict[str, int]:
+        started = time.perf_counter()
+        counts = {"system_models": 0, "models": 0, "datasets": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def bounded(name: str, job: Callable[[], Awaitable[int]]) -> None:
+            async with semaphore:
+                try:
+                    warmed = await job()
+                except Exception:
+                    counts["failed"] += 1
+                    logger.exception("Cache warm-up step '%s' failed", name)
+                    return
+                counts[name] += warmed
+
+        jobs = [bounded("system_models", self._warm_system_models)]
+        for user_id in await self._hot_user_ids():
+            jobs.append(bounded("models", lambda user_id=user_id: self._warm_models(user_id)))
+            jobs.append(bounded("datasets", lambda user_id=user_id: self._warm_datasets(user_id)))
+        await asyncio.gather(*jobs)
+
+        logger.info(
+            "Cache warm-up finished in %.2fs: %s system models, %s model pages, %s dataset pages, %s failed",
+            time.perf_counter() - started, counts["system_models"], counts["models"], counts["datasets"],
+            counts["failed"],
+        )
+        return counts
+
+    async def _hot_user_ids(self) -> list[UUID]:
+        if self._hot_users <= 0:
+            return []
+        try:
+            async with self._container() as request_container:
+                task_repo = await request_container.get(ITaskRepository)
+                return await task_repo.get_recently_active_user_ids(self._hot_users)
+        except Exception:
+            logger.exception("Failed to select hot users for cache warm-up")
+            return []
+
+    async def _warm_system_models(self) -> int:
+        async with self._container() as request_container:
+            service = await request_container.get(ModelService)
+            return await service.warm_system_models()
+
+    async def _warm_models(self, user_id: UUID) -> int:
+        # первая страница с параметрами по умолчанию - ровно тот ключ, который запросит клиент
+        async with self._container() as request_container:
+            service = await request_container.get(ModelService)
+            await service.get_models_json(user_id)
+            return 1
+
+    async def _warm_datasets(self, user_id: UUID) -> int:
+        async with self._container() as request_container:
+            service = await request_container.get(DatasetService)
+            await service.get_datasets_json(user_id)
+            return 1
@@ -1,26 +1,41 @@
+import hashlib
+import hmac
 import io
+import logging
+import time
 import uuid
-from datetime import timedelta
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import quote
 
 from miniopy_async import Minio
+from miniopy_async.deleteobjects import DeleteObject
 
 from app.core.interfaces.storage_interface import IStorageRepository
 
+logger = logging.getLogger(__name__)
+
+# доля срока жизни ссылки, в течение которой одна и та же подписанная ссылка отдается повторно
+PRESIGN_REUSE_RATIO = 0.25
+MAX_PRESIGN_EXPIRES = 7 * 24 * 60 * 60
+PRESIGN_REGION = "us-east-1" # возможно костыль, другого решения в целом я не нашел пока что
+
 
 class MinioStorage(IStorageRepository):
     def __init__(self, endpoint: str, access_key: str, secret_key: str, bucket: str | None = None,
-                 secure: bool = False):
+                 secure: bool = False, presigned_cache_size: int = 10_000):
         self.client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=secure)
         self.internal_endpoint = endpoint
         self.public_endpoint = "localhost:9000"
-        self.signer_client = Minio(
-            self.public_endpoint,
-            access_key=access_key,
-            secret_key=secret_key,
-            secure=secure,
-            region="us-east-1" # возможно костыль, другого решения в целом я не нашел пока что
-        )
         self.bucket = bucket
+        # ссылки подписываются здесь же, без запросов к MinIO; ключ SigV4 зависит только от дня - (день, ключ)
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._scheme = "https" if secure else "http"
+        self._signing_key: tuple[str, bytes] | None = None
+        # (bucket, object) -> {expires: (начало окна, url)}; LRU по объектам
+        self._presigned: OrderedDict[tuple[str, str], dict[int, tuple[int, str]]] = OrderedDict()
+        self._presigned_cache_size = presigned_cache_size
 
     async def _ensure_bucket_exists(self, bucket: str) -> None:
         found = await self.client.bucket_exists(bucket)
@@ -41,13 +56,68 @@ class MinioStorage(IStorageRepository):
 
     async def delete_file(self, object_name: str, bucket: str) -> None:
         await self.client.remove_object(bucket, object_name)
+        self._presigned.pop((bucket, object_name), None)
+
+    async def delete_files(self, object_names: list[str], bucket: str) -> list[str]:
+        if not object_names:
+            return []
+        # один запрос DeleteObjects на пачку (клиент сам режет по 1000 объектов) вместо remove_object на каждый
+        errors = await self.client.remove_objects(bucket, [DeleteObject(name) for name in object_names])
+        for object_name in object_names:
+            self._presigned.pop((bucket, object_name), None)
 
+        failed = [error.name for error in errors]
+        if failed:
+            logger.warning("Failed to delete %d objects from bucket %s: %s", len(failed), bucket, failed)
+        return failed
 
     async def get_presigned_file_url(self, object_name: str, bucket: str, expires: int = 3600) -> str:
-        url = await self.signer_client.presigned_get_object(
-            bucket_name=bucket,
-            object_name=object_name,
-            expires=timedelta(seconds=expires)
-        )
+        # Подпись привязана к началу окна длиной expires * PRESIGN_REUSE_RATIO и продлена на длину окна:
+        # внутри окна ссылка берется из кеша, и при этом живет не меньше запрошенных expires.
+        window = max(1, int(expires * PRESIGN_REUSE_RATIO))
+        now = int(time.time())
+        window_start = now - now % window
 
+        object_key = (bucket, object_name)
+        by_expires = self._presigned.get(object_key)
+        if by_expires is not None:
+            self._presigned.move_to_end(object_key)
+            cached = by_expires.get(expires)
+            if cached is not None and cached[0] == window_start:
+                return cached[1]
+
+        url = self._presign_get(bucket, object_name, min(expires + window, MAX_PRESIGN_EXPIRES),
+                                datetime.fromtimestamp(window_start, timezone.utc))
+
+        if by_expires is None:
+            by_expires = self._presigned[object_key] = {}
+            if len(self._presigned) > self._presigned_cache_size:
+                self._presigned.popitem(last=False)
+        by_expires[expires] = (window_start, url)
         return url
+
+    def _presign_get(self, bucket: str, object_name: str, expires: int, date: datetime) -> str:
+        # SigV4 query-подпись GET-ссылки, как в Minio.presigned_get_object, но ключ подписи не выводится
+        # заново четырьмя HMAC на каждую ссылку, а берется из экземпляра, пока не сменился день
+        amz_date = date.strftime("%Y%m%dT%H%M%SZ")
+        day = amz_date[:8]
+        scope = f"{day}/{PRESIGN_REGION}/s3/aws4_request"
+        path = f"/{bucket}/{quote(object_name)}"
+        query = (
+            f"X-Amz-Algorithm=AWS4-HMAC-SHA256&X-Amz-Credential={quote(f'{self._access_key}/{scope}', safe='')}"
+            f"&X-Amz-Date={amz_date}&X-Amz-Expires={expires}&X-Amz-SignedHeaders=host"
+        )
+        canonical_request = f"GET\n{path}\n{query}\nhost:{self.public_endpoint}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n{hashlib.sha256(canonical_request.encode()).hexdigest()}"
+        )
+        signature = hmac.new(self._day_signing_key(day), string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{self._scheme}://{self.public_endpoint}{path}?{query}&X-Amz-Signature={signature}"
+
+    def _day_signing_key(self, day: str) -> bytes:
+        if self._signing_key is None or self._signing_key[0] != day:
+            key = ("AWS4" + self._secret_key).encode()
+            for part in (day, PRESIGN_REGION, "s3", "aws4_request"):
+                key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+            self._signing_key = (day, key)
+        return self._signing_key[1]
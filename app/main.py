@@ -1,4 +1,5 @@
 import asyncio
+import logging
 
 from dishka.integrations.fastapi import setup_dishka
 from fastapi import FastAPI
@@ -6,15 +7,21 @@ from fastapi.responses import JSONResponse
 from app.core.exceptions import NotFoundError, ServiceUnavailableError, UnauthorizedError, ValidationError
 from app.infrastructure.di.container import container
 from app.infrastructure.config import settings
-from app.infrastructure.services.broker import BobberTaskStatusConsumer
+from app.infrastructure.services.broker import BobberPublisher, BobberTaskStatusConsumer, TaskOutboxRelay
+from app.infrastructure.services.cache import PostgresInvalidationBus, asyncpg_dsn, cache_service
+from app.infrastructure.services.cache.warmup import CacheWarmer
 from app.middleware.admin_guard import AdminGuardMiddleware
+from app.middleware.read_routing import ReadRoutingMiddleware
 from app.presentation.routers import admin, auth, datasets, models, tasks
+from app.presentation.routers.pagination import NEXT_CURSOR_HEADER
 
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.infrastructure.rate_limiter import init_rate_limiter
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(redirect_slashes=True)
 init_rate_limiter(app)
 
@@ -25,16 +32,103 @@ async def start_task_status_consumer():
         host=settings.BOBBER_HOST or "localhost",
         port=settings.BOBBER_PORT or 50051,
         loop=asyncio.get_running_loop(),
+        max_batch_size=settings.TASK_STATUS_BATCH_SIZE,
+        flush_interval=settings.TASK_STATUS_FLUSH_INTERVAL_SECONDS,
+        workers=settings.TASK_STATUS_WORKERS,
+        max_pending=settings.TASK_STATUS_MAX_PENDING,
     )
     consumer.start()
     app.state.task_status_consumer = consumer
 
 
+@app.on_event("startup")
+async def start_task_outbox_relay():
+    relay = TaskOutboxRelay(
+        publisher=await app.state.dishka_container.get(BobberPublisher),
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        retry_base=settings.OUTBOX_RETRY_BASE_SECONDS,
+        retry_max=settings.OUTBOX_RETRY_MAX_SECONDS,
+        lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+    )
+    relay.start()
+    app.state.task_outbox_relay = relay
+
+
+@app.on_event("startup")
+async def start_cache_sweeper():
+    cache_service.start_sweeper(
+        interval=settings.CACHE_SWEEP_INTERVAL_SECONDS,
+        batch_size=settings.CACHE_SWEEP_BATCH_SIZE,
+    )
+
+
+@app.on_event("startup")
+async def start_cache_invalidation_bus():
+    if not settings.CACHE_INVALIDATION_BUS_ENABLED:
+        return
+    bus = PostgresInvalidationBus(
+        dsn=asyncpg_dsn(settings.DATABASE_URL),
+        channel=settings.CACHE_INVALIDATION_CHANNEL,
+        cache=cache_service,
+    )
+    await bus.start()
+    app.state.cache_invalidation_bus = bus
+
+
+@app.on_event("startup")
+async def warm_up_cache():
+    if not settings.CACHE_WARMUP_ENABLED:
+        return
+    warmer = CacheWarmer(
+        app.state.dishka_container,
+        concurrency=settings.CACHE_WARMUP_CONCURRENCY,
+        hot_users=settings.CACHE_WARMUP_HOT_USERS,
+    )
+    try:
+        await asyncio.wait_for(warmer.run(), settings.CACHE_WARMUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Cache warm-up did not finish in %ss, continuing cold",
+                       settings.CACHE_WARMUP_TIMEOUT_SECONDS)
+
+
 @app.on_event("shutdown")
 async def stop_task_status_consumer():
     consumer = getattr(app.state, "task_status_consumer", None)
     if consumer:
         consumer.close()
+        await consumer.drain()
+
+
+@app.on_event("shutdown")
+async def stop_task_outbox_relay():
+    relay = getattr(app.state, "task_outbox_relay", None)
+    if relay:
+        await relay.close()
+
+
+@app.on_event("shutdown")
+async def close_di_container():
+    # после остановки relay: финализаторы APP-зависимостей закрывают, в том числе, пул BobberPublisher
+    await app.state.dishka_container.close()
+
+
+@app.on_event("shutdown")
+async def stop_cache_sweeper():
+    await cache_service.stop_sweeper()
+
+
+@app.on_event("shutdown")
+async def stop_cache_invalidation_bus():
+    bus = getattr(app.state, "cache_invalidation_bus", None)
+    if bus:
+        await bus.close()
+
+
+@app.on_event("shutdown")
+async def close_shared_cache():
+    await cache_service.close_shared()
 
 app.add_middleware(
     CORSMiddleware,
@@ -42,6 +136,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 @app.exception_handler(NotFoundError)
@@ -63,6 +158,8 @@ async def service_unavailable_error_handler(_, exc: ServiceUnavailableError):
 setup_dishka(container=container, app=app)
 
 app.add_middleware(AdminGuardMiddleware)
+if settings.DATABASE_REPLICA_URL:
+    app.add_middleware(ReadRoutingMiddleware)
 app.add_middleware(
     SessionMiddleware,
     secret_key=settings.JWT_SECRET,
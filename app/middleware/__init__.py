@@ -1 +1,2 @@
-from .admin_guard import AdminGuardMiddleware
\ No newline at end of file
+from .admin_guard import AdminGuardMiddleware
+from .read_routing import ReadRoutingMiddleware
\ No newline at end of file
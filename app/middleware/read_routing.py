@@ -0,0 +1,60 @@
+from jose import JWTError, jwt
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.infrastructure.config import settings
+from app.infrastructure.read_routing import ReadYourWrites, replica_reads
+from app.infrastructure.services.cache import cache_service
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+# SSE живет долго и опрашивает задачу раз в секунду: прочитанный с отстающей реплики статус
+# лег бы в кеш после инвалидации от брокера, поэтому подписка всегда читает с основной базы
+PRIMARY_READ_PREFIXES = ("/tasks/subscribe/",)
+
+
+def _user_id(scope: Scope) -> str | None:
+    for name, value in scope.get("headers", ()):
+        if name != b"authorization":
+            continue
+        scheme, _, token = value.decode("latin-1").partition(" ")
+        if scheme != "Bearer" or not token.strip():
+            return None
+        try:
+            payload = jwt.decode(token.strip(), settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        except JWTError:
+            return None
+        user_id = payload.get("sub")
+        return str(user_id) if user_id else None
+    return None
+
+
+class ReadRoutingMiddleware:
+    # Выбирает базу для сессии запроса: GET без недавних записей пользователя читает с реплики,
+    # остальное - с основной. Сама сессия создается в SQLAlchemyProvider по replica_reads().
+    def __init__(self, app: ASGIApp, read_your_writes: ReadYourWrites | None = None):
+        self.app = app
+        self.read_your_writes = read_your_writes or ReadYourWrites(cache_service, settings.READ_YOUR_WRITES_SECONDS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(PRIMARY_READ_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = _user_id(scope)
+        if scope["method"] in READ_METHODS:
+            if user_id is None or await self.read_your_writes.replica_ready(user_id):
+                with replica_reads():
+                    await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        # окно открывается еще до записи, чтобы параллельный GET не закешировал старые данные с реплики,
+        # и отсчитывается заново после ответа
+        await self.read_your_writes.record_write(user_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.read_your_writes.record_write(user_id)
@@ -1,10 +1,16 @@
+from pathlib import Path
+
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from sqladmin import Admin
 
 from app.common.admin import AdminAuth
-from app.common.admin.models import DatasetAdmin, ModelAdmin, TaskAdmin, UserAdmin
+from app.common.admin.models import CacheAdmin, DatasetAdmin, ModelAdmin, TaskAdmin, UserAdmin
 from app.infrastructure.config import settings
 from app.infrastructure.database import engine
+from app.infrastructure.metrics import metrics_registry
+
+ADMIN_TEMPLATES_DIR = Path(__file__).resolve().parents[2] / "common" / "admin" / "templates"
 
 
 def _normalize_admin_base_url(path: str) -> str:
@@ -20,15 +26,23 @@ ADMIN_BASE_URL = _normalize_admin_base_url(settings.ADMIN_BASE_URL)
 router = APIRouter(prefix=ADMIN_BASE_URL, tags=["admin"])
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # формат Prometheus text exposition; доступ закрыт AdminGuardMiddleware, как и вся админка
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 def init_admin(app):
     admin = Admin(
         app=app,
         engine=engine,
         base_url=ADMIN_BASE_URL,
         authentication_backend=AdminAuth(),
+        templates_dir=str(ADMIN_TEMPLATES_DIR),
     )
     admin.add_view(UserAdmin)
     admin.add_view(DatasetAdmin)
     admin.add_view(TaskAdmin)
     admin.add_view(ModelAdmin)
+    admin.add_base_view(CacheAdmin)
     return admin
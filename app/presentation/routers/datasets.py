@@ -3,12 +3,14 @@ from uuid import UUID
 
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
 import asyncio
 
 from app.common.security.dependencies import get_current_user
 from app.core.services import DatasetService
-from app.presentation.schemas import DatasetCreate, DatasetCreateRequest, DatasetListRequest, DatasetRead
+from app.presentation.routers.pagination import next_cursor_headers
+from app.presentation.schemas import BulkDeleteResponse, DatasetBulkDeleteRequest, DatasetCreate, DatasetCreateRequest, \
+    DatasetListRequest, DatasetRead
 
 router = APIRouter(prefix="/datasets", tags=["datasets"], route_class=DishkaRoute)
 
@@ -42,16 +44,25 @@ async def get_datasets(service: Annotated[DatasetService, FromDishka()],
                        params: Annotated[DatasetListRequest, Depends()],
                        current_user: dict = Depends(get_current_user),
                        ):
-    datasets = await service.get_datasets(user_id=UUID(current_user.get("id")), skip=params.skip, limit=params.limit,
-                                          name_contains=params.name_contains)
-    return [DatasetRead.model_validate(d) for d in datasets]
+    if params.search is not None:
+        body = await service.search_datasets_json(user_id=UUID(current_user.get("id")), query=params.search,
+                                                  skip=params.skip, limit=params.limit)
+        return Response(content=body, media_type="application/json")
+    if params.cursor is not None:
+        body, next_cursor = await service.get_datasets_page_json(user_id=UUID(current_user.get("id")),
+                                                                 limit=params.limit, cursor=params.cursor,
+                                                                 name_contains=params.name_contains)
+        return Response(content=body, media_type="application/json", headers=next_cursor_headers(next_cursor))
+    body = await service.get_datasets_json(user_id=UUID(current_user.get("id")), skip=params.skip, limit=params.limit,
+                                           name_contains=params.name_contains)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{dataset_id}", response_model=DatasetRead)
 async def get_dataset(service: Annotated[DatasetService, FromDishka()], dataset_id: UUID,
                       current_user: dict = Depends(get_current_user)):
-    dataset = await service.get_dataset_by_id(dataset_id, UUID(current_user.get("id")))
-    return DatasetRead.model_validate(dataset)
+    body = await service.get_dataset_json(dataset_id, UUID(current_user.get("id")))
+    return Response(content=body, media_type="application/json")
 
 @router.get("/download/{dataset_id}", response_model=dict)
 async def download_dataset(service: Annotated[DatasetService, FromDishka()], dataset_id: UUID,current_user: dict = Depends(get_current_user)):
@@ -62,3 +73,10 @@ async def download_dataset(service: Annotated[DatasetService, FromDishka()], dat
 async def delete_dataset(service: Annotated[DatasetService, FromDishka()], dataset_id: UUID,
                          current_user: dict = Depends(get_current_user)):
     await service.delete_dataset_by_id(dataset_id, UUID(current_user.get("id")))
+
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+async def delete_datasets(service: Annotated[DatasetService, FromDishka()], payload: DatasetBulkDeleteRequest,
+                          current_user: dict = Depends(get_current_user)):
+    deleted = await service.delete_datasets(UUID(current_user.get("id")), dataset_ids=payload.ids,
+                                            older_than=payload.older_than)
+    return BulkDeleteResponse(deleted=deleted)
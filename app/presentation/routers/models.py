@@ -3,14 +3,16 @@ from uuid import UUID
 
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
 from starlette import status
 import asyncio
 
 from app.common.security.dependencies import get_current_user
 from app.core.services import ModelService
-from app.presentation.schemas import ModelCreate, ModelCreateRequest, ModelListRequest, ModelRead
+from app.presentation.schemas import BulkDeleteResponse, ModelBulkDeleteRequest, ModelCreate, ModelCreateRequest, \
+    ModelListRequest, ModelRead
 from app.infrastructure.rate_limiter import limiter
+from app.presentation.routers.pagination import next_cursor_headers
 
 router = APIRouter(prefix="/models", tags=["models"], route_class=DishkaRoute)
 
@@ -49,22 +51,39 @@ async def create_model(request: Request, service: Annotated[ModelService, FromDi
 async def get_models(service: Annotated[ModelService, FromDishka()],
                      params: Annotated[ModelListRequest, Depends()],
                      current_user: dict = Depends(get_current_user)):
-    models = await service.get_models(
+    if params.search is not None:
+        body = await service.search_models_json(
+            user_id=UUID(current_user.get("id")),
+            query=params.search,
+            skip=params.skip,
+            limit=params.limit,
+            include_system=params.include_system,
+        )
+        return Response(content=body, media_type="application/json")
+    if params.cursor is not None:
+        body, next_cursor = await service.get_models_page_json(
+            user_id=UUID(current_user.get("id")),
+            limit=params.limit,
+            cursor=params.cursor,
+            dataset_id=params.dataset_id,
+            include_system=params.include_system,
+        )
+        return Response(content=body, media_type="application/json", headers=next_cursor_headers(next_cursor))
+    body = await service.get_models_json(
         user_id=UUID(current_user.get("id")),
         skip=params.skip,
         limit=params.limit,
         dataset_id=params.dataset_id,
         include_system=params.include_system,
     )
-
-    return [ModelRead.model_validate(model) for model in models]
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{model_id}", response_model=ModelRead)
 async def get_model(service: Annotated[ModelService, FromDishka()], model_id: UUID,
                     current_user: dict = Depends(get_current_user)):
-    model = await service.get_model_by_id(model_id, UUID(current_user.get("id")))
-    return ModelRead.model_validate(model)
+    body = await service.get_model_json(model_id, UUID(current_user.get("id")))
+    return Response(content=body, media_type="application/json")
 
 @router.get("/metrics/{model_id}", response_model=None)
 async def get_model_metrics(service: Annotated[ModelService, FromDishka()], model_id: UUID,
@@ -77,6 +96,13 @@ async def delete_model(service: Annotated[ModelService, FromDishka()], model_id:
                        current_user: dict = Depends(get_current_user)):
     await service.delete_model_by_id(model_id, UUID(current_user.get("id")))
 
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+async def delete_models(service: Annotated[ModelService, FromDishka()], payload: ModelBulkDeleteRequest,
+                        current_user: dict = Depends(get_current_user)):
+    deleted = await service.delete_models(UUID(current_user.get("id")), model_ids=payload.ids,
+                                          dataset_id=payload.dataset_id, older_than=payload.older_than)
+    return BulkDeleteResponse(deleted=deleted)
+
 @router.get("/download/{model_id}", response_model=dict)
 async def download_model(service: Annotated[ModelService, FromDishka()], model_id: UUID,current_user: dict = Depends(get_current_user)):
     url = await service.download_model(model_id, UUID(current_user.get("id")))
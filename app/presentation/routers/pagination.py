@@ -0,0 +1,8 @@
+from typing import Optional
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def next_cursor_headers(next_cursor: Optional[str]) -> Optional[dict[str, str]]:
+    # тело ответа остается списком, курсор следующей страницы уходит в заголовке; нет заголовка - страниц больше нет
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
@@ -3,7 +3,7 @@ from uuid import UUID
 
 from dishka import FromDishka
 from dishka.integrations.fastapi import DishkaRoute
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from fastapi.sse import EventSourceResponse
 import asyncio
 
@@ -11,13 +11,16 @@ from app.common.security.dependencies import get_current_user
 from app.core.enums import TaskType
 from app.core.services import TaskService
 from app.presentation.schemas import (
+    BulkDeleteResponse,
     InferenceTaskCreateRequest,
+    TaskBulkDeleteRequest,
     TaskCreate,
     TaskListRequest,
     TaskRead,
     TrainingTaskCreateRequest,
 )
 from app.infrastructure.rate_limiter import limiter
+from app.presentation.routers.pagination import next_cursor_headers
 
 router = APIRouter(prefix="/tasks", tags=["tasks"], route_class=DishkaRoute)
 
@@ -75,9 +78,13 @@ async def create_training_task(
 async def get_tasks(service: Annotated[TaskService, FromDishka()],
                     params: Annotated[TaskListRequest, Depends()],
                     current_user: dict = Depends(get_current_user)):
-    tasks = await service.get_tasks(skip=params.skip, limit=params.limit, user_id=UUID(current_user.get("id")))
-
-    return [TaskRead.model_validate(task) for task in tasks]
+    user_id = UUID(current_user.get("id"))
+    if params.cursor is not None:
+        body, next_cursor = await service.get_tasks_page_json(user_id=user_id, limit=params.limit,
+                                                              cursor=params.cursor)
+        return Response(content=body, media_type="application/json", headers=next_cursor_headers(next_cursor))
+    body = await service.get_tasks_json(skip=params.skip, limit=params.limit, user_id=user_id)
+    return Response(content=body, media_type="application/json")
 
 @router.get("/subscribe/{task_id}", response_class=EventSourceResponse, response_model=None)
 async def subscribe_to_task_updates(service: Annotated[TaskService, FromDishka()], task_id: UUID,
@@ -96,11 +103,18 @@ async def subscribe_to_task_updates(service: Annotated[TaskService, FromDishka()
 @router.get("/{task_id}", response_model=TaskRead)
 async def get_task(service: Annotated[TaskService, FromDishka()], task_id: UUID,
                    current_user: dict = Depends(get_current_user)):
-    task = await service.get_task_by_id(task_id=task_id, user_id=UUID(current_user.get("id")))
-    return TaskRead.model_validate(task)
+    body = await service.get_task_json(task_id=task_id, user_id=UUID(current_user.get("id")))
+    return Response(content=body, media_type="application/json")
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(service: Annotated[TaskService, FromDishka()], task_id: UUID,
                       current_user: dict = Depends(get_current_user)):
     await service.delete_task_by_id(task_id=task_id, user_id=UUID(current_user.get("id")))
+
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+async def delete_tasks(service: Annotated[TaskService, FromDishka()], payload: TaskBulkDeleteRequest,
+                       current_user: dict = Depends(get_current_user)):
+    deleted = await service.delete_tasks(UUID(current_user.get("id")), task_ids=payload.ids, status=payload.status,
+                                         older_than=payload.older_than)
+    return BulkDeleteResponse(deleted=deleted)
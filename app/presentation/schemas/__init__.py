@@ -1,5 +1,9 @@
-from .model import ModelBase, ModelRead, ModelCreate, ModelCreateRequest, ModelListRequest
-from .dataset import DatasetBase, DatasetRead, DatasetCreate, DatasetCreateRequest, DatasetListRequest
+from .common import BulkDeleteRequest, BulkDeleteResponse
+from .model import ModelBase, ModelRead, ModelCreate, ModelCreateRequest, ModelListRequest, \
+    ModelBulkDeleteRequest
+from .dataset import DatasetBase, DatasetRead, DatasetCreate, DatasetCreateRequest, DatasetListRequest, \
+    DatasetBulkDeleteRequest
 from .auth import LoginRequest, RefreshTokenRequest, RegistrationCodeSent, RegistrationConfirmRequest, Token
 from .user import UserCreate, UserBase, UserRead
-from .task import TaskRead, TaskCreate, TaskBase, InferenceTaskCreateRequest, TrainingTaskCreateRequest, TaskListRequest
+from .task import TaskRead, TaskCreate, TaskBase, InferenceTaskCreateRequest, TrainingTaskCreateRequest, TaskListRequest, \
+    TaskBulkDeleteRequest
@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+# столько же объектов MinIO удаляет одним запросом DeleteObjects
+MAX_BULK_DELETE_IDS = 1000
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[list[uuid.UUID]] = Field(default=None, max_length=MAX_BULK_DELETE_IDS)
+    older_than: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def require_criteria(self) -> "BulkDeleteRequest":
+        # пустой запрос удалил бы все записи пользователя - нужен хотя бы один критерий
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("Specify ids or at least one filter")
+        return self
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: list[uuid.UUID]
@@ -4,6 +4,8 @@ from typing import Optional
 from fastapi import Form
 from pydantic import BaseModel, ConfigDict
 
+from app.presentation.schemas.common import BulkDeleteRequest
+
 
 class DatasetBase(BaseModel):
     name: str
@@ -39,3 +41,9 @@ class DatasetListRequest(BaseModel):
     skip: int = 0
     limit: int = 100
     name_contains: Optional[str] = None
+    cursor: Optional[str] = None  # "" - первая страница в режиме курсора, дальше - X-Next-Cursor из ответа
+    search: Optional[str] = None  # поиск по имени с ранжированием по похожести, страницы - через skip/limit
+
+
+class DatasetBulkDeleteRequest(BulkDeleteRequest):
+    pass
@@ -5,6 +5,7 @@ from fastapi import Form
 from pydantic import BaseModel, ConfigDict
 
 from app.core.enums import ModelArchitectures
+from app.presentation.schemas.common import BulkDeleteRequest
 
 
 class ModelBase(BaseModel):
@@ -56,3 +57,9 @@ class ModelListRequest(BaseModel):
     limit: int = 100
     dataset_id: Optional[uuid.UUID] = None
     include_system: bool = True
+    cursor: Optional[str] = None  # "" - первая страница в режиме курсора, дальше - X-Next-Cursor из ответа
+    search: Optional[str] = None  # поиск по имени с ранжированием по похожести, страницы - через skip/limit
+
+
+class ModelBulkDeleteRequest(BulkDeleteRequest):
+    dataset_id: Optional[uuid.UUID] = None
@@ -5,6 +5,7 @@ from fastapi import Form
 from pydantic import BaseModel, ConfigDict
 
 from app.core.enums import TaskStatus
+from app.presentation.schemas.common import BulkDeleteRequest
 
 
 class TaskBase(BaseModel):
@@ -68,3 +69,8 @@ class TrainingTaskCreateRequest(BaseModel):
 class TaskListRequest(BaseModel):
     skip: int = 0
     limit: int = 100
+    cursor: Optional[str] = None  # "" - первая страница в режиме курсора, дальше - X-Next-Cursor из ответа
+
+
+class TaskBulkDeleteRequest(BulkDeleteRequest):
+    status: Optional[TaskStatus] = None
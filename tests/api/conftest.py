@@ -7,6 +7,8 @@ from dishka import Provider, Scope, make_async_container, provide
 
 from app.core.interfaces import IMailService
 from app.core.services import TaskService
+from app.core.services.dataset_service import DatasetService
+from app.core.services.model_service import ModelService
 from app.core.services.auth_service import AuthService
 from app.main import app
 
@@ -19,9 +21,10 @@ class _ApiTestState:
         self.task_repo = _InMemoryTaskRepository()
         self.cache = _NoopCache()
         self.storage = _NoopStorage()
-        self.model_repo = SimpleNamespace()
-        self.dataset_repo = SimpleNamespace()
-        self.bobber = SimpleNamespace()
+        self.model_repo = _InMemoryModelRepository()
+        self.dataset_repo = _InMemoryDatasetRepository()
+        self.outbox_repo = SimpleNamespace()
+        self.uow = _NoopUnitOfWork()
 
 
 class _InMemoryUserRepository:
@@ -93,10 +96,26 @@ class _CapturingMailService(IMailService):
 
 
 class _InMemoryTaskRepository:
-    async def get_tasks(self, skip: int = 0, limit: int = 100, user_id=None, model_id=None):
+    async def get_tasks(self, skip: int = 0, limit: int = 100, user_id=None, model_id=None, cursor=None):
         return []
 
 
+class _InMemoryModelRepository:
+    def __init__(self):
+        self.models = {}
+
+    async def get_model_by_id(self, model_id):
+        return self.models.get(model_id)
+
+
+class _InMemoryDatasetRepository:
+    def __init__(self):
+        self.datasets = {}
+
+    async def get_dataset_by_id(self, dataset_id):
+        return self.datasets.get(dataset_id)
+
+
 class _NoopCache:
     async def get(self, _key):
         return None
@@ -104,6 +123,15 @@ class _NoopCache:
     async def set(self, _key, _value, expire=None) -> None:
         return None
 
+    async def get_or_load(self, _key, loader, expire=None, stale_after=None, missing_ttl=None):
+        return await loader()
+
+    async def is_known_missing(self, _key) -> bool:
+        return False
+
+    async def mark_missing(self, _key, expire=None) -> None:
+        return None
+
     async def delete(self, _key) -> None:
         return None
 
@@ -111,6 +139,14 @@ class _NoopCache:
         return None
 
 
+class _NoopUnitOfWork:
+    async def commit(self) -> None:
+        return None
+
+    async def rollback(self) -> None:
+        return None
+
+
 class _NoopStorage:
     async def get_presigned_file_url(self, *_args, **_kwargs):
         return "http://testserver/files/task-output"
@@ -127,6 +163,26 @@ class _ApiTestProvider(Provider):
             self.state.user_repo,
             self.state.confirmation_repo,
             self.state.mail_service,
+            self.state.uow,
+        )
+
+    @provide(scope=Scope.REQUEST)
+    def model_service(self) -> ModelService:
+        return ModelService(
+            self.state.model_repo,
+            self.state.storage,
+            self.state.dataset_repo,
+            self.state.cache,
+            self.state.uow,
+        )
+
+    @provide(scope=Scope.REQUEST)
+    def dataset_service(self) -> DatasetService:
+        return DatasetService(
+            self.state.dataset_repo,
+            self.state.storage,
+            self.state.cache,
+            self.state.uow,
         )
 
     @provide(scope=Scope.REQUEST)
@@ -137,7 +193,8 @@ class _ApiTestProvider(Provider):
             model_repo=self.state.model_repo,
             dataset_repo=self.state.dataset_repo,
             cache_repo=self.state.cache,
-            bobber_publisher=self.state.bobber,
+            outbox_repo=self.state.outbox_repo,
+            uow=self.state.uow,
         )
 
 
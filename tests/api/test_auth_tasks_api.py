@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from uuid import uuid4
 
 import pytest
@@ -74,3 +75,37 @@ async def test_tasks_list_requires_auth_and_returns_list(api_test_state):
         )
         assert authorized_response.status_code == 200
         assert isinstance(authorized_response.json(), list)
+
+
+async def test_models_and_datasets_of_another_user_are_not_found(api_test_state):
+    email = f"api_owner_{uuid4().hex}@example.com"
+    password = "12345678"
+
+    foreign_model = SimpleNamespace(id=uuid4(), user_id=uuid4(), name="m", architecture="yolo",
+                                    architecture_profile="p", minio_model_path="obj", is_system=False,
+                                    dataset_id=None, base_model_id=None)
+    system_model = SimpleNamespace(id=uuid4(), user_id=None, name="s", architecture="yolo",
+                                   architecture_profile="p", minio_model_path="obj", is_system=True,
+                                   dataset_id=None, base_model_id=None)
+    foreign_dataset = SimpleNamespace(id=uuid4(), user_id=uuid4(), name="ds", minio_path="obj", description=None)
+    for model in (foreign_model, system_model):
+        api_test_state.model_repo.models[model.id] = model
+    api_test_state.dataset_repo.datasets[foreign_dataset.id] = foreign_dataset
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+        await client.post("/auth/register", json={"email": email, "password": password, "role": "user"})
+        confirm_response = await client.post(
+            "/auth/register/confirm",
+            json={"email": email, "code": api_test_state.mail_service.registration_codes[email]},
+        )
+        headers = {"Authorization": f"Bearer {confirm_response.json()['access_token']}"}
+
+        model_response = await client.get(f"/models/{foreign_model.id}", headers=headers)
+        assert model_response.status_code == 404
+
+        dataset_response = await client.get(f"/datasets/{foreign_dataset.id}", headers=headers)
+        assert dataset_response.status_code == 404
+
+        system_response = await client.get(f"/models/{system_model.id}", headers=headers)
+        assert system_response.status_code == 200
+        assert system_response.json()["id"] == str(system_model.id)
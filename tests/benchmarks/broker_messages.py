@@ -0,0 +1,73 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel
+
+from app.core.enums import TaskStatus, TaskType
+from app.infrastructure.services.broker.messages import JSON_FORMAT, MSGPACK_FORMAT, MessageKind, decode_message, \
+    encode_message
+
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "100000"))
+
+
+class StatusUpdateModel(BaseModel):
+    # для сравнения: проверка статуса через промежуточную pydantic-модель
+    task_id: UUID
+    status: TaskStatus
+    output_path: Optional[str] = None
+    error_msg: Optional[str] = None
+
+
+def _inference_message() -> dict:
+    return {
+        "task_id": str(uuid4()),
+        "task_type": TaskType.inference,
+        "model_id": str(uuid4()),
+        "model_arch": "yolo",
+        "input_path": f"{uuid4()}/schema.png",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _status_message() -> dict:
+    return {"task_id": str(uuid4()), "status": TaskStatus.succeeded.value, "output_path": f"{uuid4()}/result.json"}
+
+
+def _measure(operation, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        operation(item)
+    return len(items) / (time.perf_counter() - started)
+
+
+def main():
+    inference = [_inference_message() for _ in range(MESSAGES)]
+    status = [_status_message() for _ in range(MESSAGES)]
+
+    print(f"{'operation':>28} {'format':>8} {'msg/s':>12} {'bytes':>7}")
+    for message_format in (JSON_FORMAT, MSGPACK_FORMAT):
+        encoded = [encode_message(MessageKind.inference, message, message_format) for message in inference]
+        size = sum(len(value) for value in encoded) / len(encoded)
+        encode_rate = _measure(lambda message: encode_message(MessageKind.inference, message, message_format),
+                               inference)
+        decode_rate = _measure(lambda value: decode_message(MessageKind.inference, value), encoded)
+        print(f"{'encode inference':>28} {message_format:>8} {encode_rate:>12,.0f} {size:>7.0f}")
+        print(f"{'decode inference':>28} {message_format:>8} {decode_rate:>12,.0f} {size:>7.0f}")
+
+    for message_format in (JSON_FORMAT, MSGPACK_FORMAT):
+        encoded = [encode_message(MessageKind.status, message, message_format) for message in status]
+        size = sum(len(value) for value in encoded) / len(encoded)
+        decode_rate = _measure(lambda value: decode_message(MessageKind.status, value), encoded)
+        print(f"{'decode status':>28} {message_format:>8} {decode_rate:>12,.0f} {size:>7.0f}")
+
+    raw_json = [json.dumps(message) for message in status]
+    pydantic_rate = _measure(lambda value: StatusUpdateModel.model_validate_json(value).model_dump(), raw_json)
+    print(f"{'decode status (pydantic)':>28} {JSON_FORMAT:>8} {pydantic_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
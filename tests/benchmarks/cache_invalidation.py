@@ -0,0 +1,48 @@
+import os
+import statistics
+import time
+from uuid import uuid4
+
+from app.core.enums import CacheKeysList
+from app.infrastructure.services.cache.cache_service import CacheService
+from tests.utils import run
+
+CACHE_SIZES = [int(size) for size in os.getenv("BENCH_CACHE_SIZES", "1000,10000,100000").split(",")]
+PAGES_PER_USER = int(os.getenv("BENCH_PAGES_PER_USER", "10"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "200"))
+
+
+async def _fill(cache: CacheService, size: int) -> list:
+    users = [uuid4() for _ in range(max(size // PAGES_PER_USER, 1))]
+    for user_id in users:
+        for page in range(PAGES_PER_USER):
+            await cache.set(CacheKeysList.tasks(user_id=user_id, skip=page * 100, limit=100), [], expire=60)
+    return users
+
+
+async def _measure(size: int) -> list[float]:
+    cache = CacheService(base_ttl=60, jitter_ratio=0)
+    users = await _fill(cache, size)
+
+    timings = []
+    for i in range(ROUNDS):
+        user_id = users[i % len(users)]
+        pattern = CacheKeysList.TASKS.pattern(user_id)
+        started = time.perf_counter()
+        await cache.delete_pattern(pattern)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+        for page in range(PAGES_PER_USER):
+            await cache.set(CacheKeysList.tasks(user_id=user_id, skip=page * 100, limit=100), [], expire=60)
+    return timings
+
+
+def main():
+    print(f"{'entries':>10} {'p50, us':>10} {'p99, us':>10}")
+    for size in CACHE_SIZES:
+        timings = sorted(run(_measure(size)))
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{size:>10} {statistics.median(timings):>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+
+from app.infrastructure.services.cache.cache_service import AsyncMemoryCache
+from tests.utils import run
+
+OPERATIONS = int(os.getenv("BENCH_OPERATIONS", "500000"))
+KEYS = int(os.getenv("BENCH_KEYS", "10000"))
+READ_RATIO = float(os.getenv("BENCH_READ_RATIO", "0.9"))
+
+
+class RLockMemoryCache(AsyncMemoryCache):
+    # прежняя реализация: каждая операция под threading.RLock
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.RLock()
+
+    async def get(self, key):
+        with self._lock:
+            entry = self.get_entry(key)
+            return entry.value if entry is not None else None
+
+    async def set(self, key, value, ttl=0, refresh_after=0):
+        with self._lock:
+            await super().set(key, value, ttl=ttl, refresh_after=refresh_after)
+
+    async def delete(self, key):
+        with self._lock:
+            return await super().delete(key)
+
+
+async def _measure(cache: AsyncMemoryCache) -> float:
+    keys = [f"tasks:user-{i % 100}:{i}:100" for i in range(KEYS)]
+    for key in keys:
+        await cache.set(key, b"[]", ttl=60)
+
+    reads = int(READ_RATIO * 100)
+    started = time.perf_counter()
+    for i in range(OPERATIONS):
+        key = keys[i % KEYS]
+        if i % 100 < reads:
+            await cache.get(key)
+        else:
+            await cache.set(key, b"[]", ttl=60)
+    return OPERATIONS / (time.perf_counter() - started)
+
+
+def main():
+    print(f"{'implementation':>16} {'ops/s':>12}")
+    for name, cache in (("rlock", RLockMemoryCache()), ("loop-confined", AsyncMemoryCache())):
+        print(f"{name:>16} {run(_measure(cache)):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
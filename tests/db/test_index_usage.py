@@ -0,0 +1,117 @@
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.infrastructure.config import settings
+from app.infrastructure.persistence.repositories import (
+    DatasetRepository,
+    ModelRepository,
+    TaskRepository,
+    UserRepository,
+)
+from tests.utils import run
+
+# Нужна база после `alembic upgrade head` (как в api-integration-tests); без нее тесты пропускаются.
+
+
+class _CapturingSession:
+    # отдает репозиторию пустой результат и запоминает запрос, чтобы потом прогнать его через EXPLAIN
+    def __init__(self):
+        self.query = None
+
+    async def execute(self, query):
+        self.query = query
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []), scalar_one_or_none=lambda: None)
+
+
+async def _captured(call) -> str:
+    session = _CapturingSession()
+    await call(session)
+    return str(session.query.compile(dialect=asyncpg.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def _index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+async def _used_indexes(sql: str) -> set[str]:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        async with engine.connect() as connection:
+            # на пустых таблицах CI планировщик честно выбрал бы seq scan; проверяем, что индекс вообще применим
+            await connection.execute(text("SET enable_seqscan = off"))
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = result.scalar_one()
+    except (OSError, ConnectionError) as exc:
+        pytest.skip(f"database is not available: {exc}")
+    finally:
+        await engine.dispose()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _index_names(plan[0]["Plan"])
+
+
+def _explain(call) -> set[str]:
+    async def scenario():
+        return await _used_indexes(await _captured(call))
+
+    return run(scenario())
+
+
+def test_task_list_page_uses_keyset_index():
+    cursor = (datetime.now(timezone.utc), uuid4())
+
+    used = _explain(lambda session: TaskRepository(session).get_tasks(user_id=uuid4(), limit=20, cursor=cursor))
+
+    assert used == {"ix_tasks_user_id_created_at_id"}
+
+
+def test_tasks_by_model_use_model_index():
+    used = _explain(lambda session: TaskRepository(session).get_tasks(model_id=uuid4()))
+
+    assert "ix_tasks_model_id" in used
+
+
+def test_model_list_combines_user_and_system_indexes():
+    used = _explain(lambda session: ModelRepository(session).get_models(uuid4(), limit=20))
+
+    assert {"ix_models_user_id_created_at_id", "ix_models_system_created_at_id"} <= used
+
+
+def test_user_models_use_partial_index():
+    used = _explain(lambda session: UserRepository(session).get_user_models(uuid4()))
+
+    assert used == {"ix_models_user_id_not_system"}
+
+
+def test_models_by_dataset_use_dataset_index():
+    used = _explain(lambda session: ModelRepository(session).get_models_by_dataset_id(uuid4(), uuid4()))
+
+    assert "ix_models_dataset_id" in used
+
+
+def test_dataset_list_uses_keyset_index():
+    used = _explain(lambda session: DatasetRepository(session).get_datasets(uuid4(), limit=20))
+
+    assert used == {"ix_datasets_user_id_created_at_id"}
+
+
+def test_dataset_search_uses_trigram_index():
+    used = _explain(lambda session: DatasetRepository(session).search_datasets(uuid4(), "helmets", limit=20))
+
+    assert "ix_datasets_name_trgm" in used
+
+
+def test_model_search_uses_trigram_index():
+    used = _explain(lambda session: ModelRepository(session).search_models(uuid4(), "yolo", limit=20))
+
+    assert "ix_models_name_trgm" in used
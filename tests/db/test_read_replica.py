@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import text
+
+from app.infrastructure.config import settings
+from app.infrastructure.database import AsyncReadSessionLocal, AsyncSessionLocal
+from app.infrastructure.read_routing import replica_reads, session_factory
+from tests.utils import run
+
+# Реплику в CI изображает вторая база на том же сервере (DATABASE_REPLICA_URL); без нее тесты пропускаются.
+pytestmark = pytest.mark.skipif(not settings.DATABASE_REPLICA_URL, reason="DATABASE_REPLICA_URL is not set")
+
+
+async def _scalar(factory, sql: str):
+    try:
+        async with factory() as session:
+            return (await session.execute(text(sql))).scalar_one()
+    except (OSError, ConnectionError) as exc:
+        pytest.skip(f"database is not available: {exc}")
+
+
+def test_replica_reads_use_the_second_database():
+    with replica_reads():
+        replica_factory = session_factory()
+
+    assert replica_factory is AsyncReadSessionLocal
+    assert session_factory() is AsyncSessionLocal
+    assert run(_scalar(replica_factory, "SELECT current_database()")) != \
+        run(_scalar(AsyncSessionLocal, "SELECT current_database()"))
+
+
+def test_replica_sessions_are_read_only():
+    assert run(_scalar(AsyncReadSessionLocal, "SHOW default_transaction_read_only")) == "on"
+    assert run(_scalar(AsyncSessionLocal, "SHOW default_transaction_read_only")) == "off"
@@ -28,7 +28,7 @@ def _make_service(user_repo, confirmation_repo=None, mail_service=None):
         delete_by_email=AsyncMock(),
     )
     mail_service = mail_service or SimpleNamespace(send_registration_confirmation=AsyncMock())
-    return AuthService(user_repo, confirmation_repo, mail_service)
+    return AuthService(user_repo, confirmation_repo, mail_service, AsyncMock())
 
 
 def test_register_existing_email_raises():
@@ -196,6 +196,8 @@ def test_confirm_registration_increments_attempts_for_invalid_code(monkeypatch):
 
     confirmation_repo.increment_attempts.assert_awaited_once_with("user@example.com")
     confirmation_repo.delete_by_email.assert_not_awaited()
+    # счетчик попыток фиксируется, хотя запрос завершается ошибкой
+    service.uow.commit.assert_awaited_once()
 
 
 def test_login_invalid_email_raises():
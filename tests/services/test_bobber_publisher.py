@@ -1,8 +1,11 @@
+import asyncio
 import json
+import time
 
 import pytest
 
 from app.infrastructure.services.broker.bobber_publisher import BobberPublisher
+from tests.utils import run
 
 
 class _HealthyBobberClient:
@@ -41,7 +44,8 @@ def test_publish_methods_build_expected_keys_and_payloads(monkeypatch):
         _HealthyBobberClient,
     )
 
-    publisher = BobberPublisher()
+    publisher = BobberPublisher(pool_size=1)
+    client = publisher.clients[0]
 
     inference_message = {"task_id": "11", "foo": "bar"}
     training_message = {"task_id": "22", "foo": "baz"}
@@ -49,22 +53,84 @@ def test_publish_methods_build_expected_keys_and_payloads(monkeypatch):
     assert publisher.publish_inference("inf-q", inference_message) is True
     assert publisher.publish_training("train-q", training_message) is True
 
-    assert publisher.client.produce_calls[0][0] == "inf-q"
-    assert publisher.client.produce_calls[0][1] == "inference_11"
-    assert json.loads(publisher.client.produce_calls[0][2]) == inference_message
+    assert client.produce_calls[0][0] == "inf-q"
+    assert client.produce_calls[0][1] == "inference_11"
+    assert json.loads(client.produce_calls[0][2]) == inference_message
 
-    assert publisher.client.produce_calls[1][0] == "train-q"
-    assert publisher.client.produce_calls[1][1] == "training_22"
-    assert json.loads(publisher.client.produce_calls[1][2]) == training_message
+    assert client.produce_calls[1][0] == "train-q"
+    assert client.produce_calls[1][1] == "training_22"
+    assert json.loads(client.produce_calls[1][2]) == training_message
 
 
-def test_close_delegates_to_client(monkeypatch):
+def test_close_delegates_to_clients(monkeypatch):
     monkeypatch.setattr(
         "app.infrastructure.services.broker.bobber_publisher.BobberClient",
         _HealthyBobberClient,
     )
 
-    publisher = BobberPublisher()
+    publisher = BobberPublisher(pool_size=2)
     publisher.close()
 
-    assert publisher.client.closed is True
+    assert all(client.closed for client in publisher.clients)
+
+
+def test_publish_batch_spreads_blocking_produce_over_client_pool(monkeypatch):
+    class _SlowBobberClient(_HealthyBobberClient):
+        def produce(self, queue, key, value):
+            time.sleep(0.05)
+            if key == "inference_bad":
+                raise RuntimeError("broker timeout")
+            return super().produce(queue, key, value)
+
+    monkeypatch.setattr(
+        "app.infrastructure.services.broker.bobber_publisher.BobberClient",
+        _SlowBobberClient,
+    )
+    publisher = BobberPublisher(pool_size=4)
+    messages = [("inf-q", {"task_id": str(index), "task_type": "inference"}) for index in range(3)]
+    messages.append(("inf-q", {"task_id": "bad", "task_type": "inference"}))
+    loop_ticks = []
+
+    async def ticker():
+        while True:
+            loop_ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def scenario():
+        ticks = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        results = await publisher.publish_batch(messages)
+        elapsed = time.perf_counter() - started
+        ticks.cancel()
+        return results, elapsed
+
+    results, elapsed = run(scenario())
+    publisher.close()
+
+    assert results[:3] == [True, True, True]
+    assert isinstance(results[3], RuntimeError)
+    # четыре отправки по 50 мс идут параллельно через разные клиенты, event loop при этом не стоит
+    assert elapsed < 0.15
+    assert len(loop_ticks) >= 5
+    assert sum(len(client.produce_calls) for client in publisher.clients) == 3
+
+
+def test_app_container_closes_publisher_on_teardown(monkeypatch):
+    from dishka import make_async_container
+
+    from app.infrastructure.di.service_provider import ServiceProvider
+
+    monkeypatch.setattr("app.infrastructure.services.broker.bobber_publisher.BobberClient", _HealthyBobberClient)
+
+    async def scenario():
+        container = make_async_container(ServiceProvider(), skip_validation=True)
+        publisher = await container.get(BobberPublisher)
+        closed_before = any(client.closed for client in publisher.clients)
+        await container.close()
+        return closed_before, publisher
+
+    closed_before, publisher = run(scenario())
+
+    assert not closed_before
+    assert all(client.closed for client in publisher.clients)
+    assert publisher._executor._shutdown
@@ -0,0 +1,129 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import msgpack
+import pytest
+
+from app.core.enums import TaskStatus, TaskType
+from app.infrastructure.services.broker.bobber_publisher import BobberPublisher
+from app.infrastructure.services.broker.messages import MESSAGE_VERSION, MSGPACK_FORMAT, MessageDecodeError, \
+    MessageKind, decode_message, encode_message
+from app.infrastructure.services.broker.task_status_consumer import BobberTaskStatusConsumer
+
+
+def _inference_message():
+    return {
+        "task_id": str(uuid4()),
+        "task_type": TaskType.inference,
+        "model_id": str(uuid4()),
+        "model_arch": "yolo",
+        "input_path": "user/file.jpg",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def test_msgpack_round_trip_is_compact_and_typed():
+    message = _inference_message()
+
+    packed = encode_message(MessageKind.inference, message, MSGPACK_FORMAT)
+    decoded = decode_message(MessageKind.inference, packed)
+
+    assert len(packed) < len(encode_message(MessageKind.inference, message)) / 2
+    assert msgpack.unpackb(packed, timestamp=3)[:2] == [MESSAGE_VERSION, MessageKind.inference]
+    assert str(decoded["task_id"]) == message["task_id"]
+    assert str(decoded["model_id"]) == message["model_id"]
+    assert decoded["timestamp"] == datetime.fromisoformat(message["timestamp"])
+    assert decoded["input_path"] == "user/file.jpg"
+
+
+def test_json_stays_legacy_and_decodes_through_same_schema():
+    message = _inference_message()
+
+    raw = encode_message(MessageKind.inference, message)
+
+    assert json.loads(raw) == json.loads(json.dumps(message))
+    assert decode_message(MessageKind.inference, raw) == decode_message(
+        MessageKind.inference, encode_message(MessageKind.inference, message, MSGPACK_FORMAT),
+    )
+
+
+def test_training_message_keeps_missing_model_as_none():
+    message = {
+        "task_id": str(uuid4()),
+        "task_type": TaskType.training,
+        "model_id": "None",
+        "dataset_id": str(uuid4()),
+        "user_id": str(uuid4()),
+        "image_size": 640,
+        "epochs": 10,
+        "name": "train-v1",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+    decoded = decode_message(MessageKind.training, encode_message(MessageKind.training, message, MSGPACK_FORMAT))
+
+    assert decoded["model_id"] is None
+    assert decoded["epochs"] == 10
+
+
+def test_status_message_from_newer_worker_ignores_extra_fields():
+    task_id = uuid4()
+    packed = msgpack.packb([MESSAGE_VERSION + 1, MessageKind.status, task_id.bytes, "succeeded", "out.json", None, 42])
+
+    decoded = decode_message(MessageKind.status, packed)
+
+    assert decoded == {"task_id": task_id, "status": TaskStatus.succeeded, "output_path": "out.json",
+                       "error_msg": None}
+
+
+@pytest.mark.parametrize("raw", [
+    msgpack.packb([MESSAGE_VERSION, MessageKind.inference, uuid4().bytes, "succeeded", None, None]),
+    msgpack.packb([MESSAGE_VERSION, MessageKind.status, b"short", "succeeded", None, None]),
+    msgpack.packb([MESSAGE_VERSION, MessageKind.status, uuid4().bytes, "unknown", None, None]),
+    msgpack.packb([MESSAGE_VERSION, MessageKind.status, uuid4().bytes, "running"]),
+    msgpack.packb([0, MessageKind.status, uuid4().bytes, "running", None, None]),
+    json.dumps({"status": "running"}),
+    json.dumps({"task_id": str(uuid4()), "status": "running", "error_msg": 1}),
+    b"\xc1",
+    "[1, 2]",
+])
+def test_decode_rejects_invalid_status_messages(raw):
+    with pytest.raises(MessageDecodeError):
+        decode_message(MessageKind.status, raw)
+
+
+def test_consumer_parses_msgpack_and_drops_invalid_messages():
+    task_id = uuid4()
+    packed = encode_message(MessageKind.status, {"task_id": task_id, "status": "failed", "error_msg": "oom"},
+                            MSGPACK_FORMAT)
+
+    parsed = BobberTaskStatusConsumer._parse_message({"value": packed})
+
+    assert parsed["task_id"] == task_id
+    assert parsed["status"] == TaskStatus.failed
+    assert parsed["error_msg"] == "oom"
+    assert BobberTaskStatusConsumer._parse_message({"value": '{"status": "running"}'}) is None
+
+
+def test_publisher_sends_msgpack_when_configured(monkeypatch):
+    class _RecordingBobberClient:
+        def __init__(self, *_args, **_kwargs):
+            self.produce_calls = []
+
+        def healthcheck(self):
+            return True
+
+        def produce(self, queue, key, value):
+            self.produce_calls.append((queue, key, value))
+            return True
+
+    monkeypatch.setattr("app.infrastructure.services.broker.bobber_publisher.BobberClient", _RecordingBobberClient)
+    publisher = BobberPublisher(pool_size=1, message_format=MSGPACK_FORMAT)
+    message = _inference_message()
+
+    assert publisher.publish_inference("inf-q", message) is True
+
+    _, key, value = publisher.clients[0].produce_calls[0]
+    assert key == f"inference_{message['task_id']}"
+    assert str(decode_message(MessageKind.inference, value)["task_id"]) == message["task_id"]
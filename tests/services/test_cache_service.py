@@ -1,6 +1,12 @@
+import asyncio
 import time
+from uuid import uuid4
 
+import pytest
+
+from app.core.enums import CacheKeysList, CacheKeysObject
 from app.infrastructure.services.cache.cache_service import CacheService
+from app.infrastructure.services.cache.keys import key_family
 from tests.utils import run
 
 
@@ -36,3 +42,366 @@ def test_cache_value_expires_with_explicit_ttl():
 
     time.sleep(1.1)
     assert run(cache.get("temp")) is None
+
+
+def test_cache_delete_pattern_uses_segment_prefix():
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+
+    run(cache.set("tasks:u1:0:100", "a"))
+    run(cache.set("tasks:u1:100:100", "b"))
+    run(cache.set("tasks:u10:0:100", "c"))
+    run(cache.set("task:u1", "d"))
+
+    run(cache.delete_pattern("tasks:u1:*"))
+
+    assert run(cache.get("tasks:u1:0:100")) is None
+    assert run(cache.get("tasks:u1:100:100")) is None
+    assert run(cache.get("tasks:u10:0:100")) == "c"
+    assert run(cache.get("task:u1")) == "d"
+
+
+def test_cache_delete_pattern_supports_wildcards_inside_key():
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+
+    run(cache.set("models:u1:0:100:all", "a"))
+    run(cache.set("models:u1:0:100:d1", "b"))
+    run(cache.set("models:u2:0:100:all", "c"))
+
+    run(cache.delete_pattern("models:*:0:100:all"))
+
+    assert run(cache.get("models:u1:0:100:all")) is None
+    assert run(cache.get("models:u2:0:100:all")) is None
+    assert run(cache.get("models:u1:0:100:d1")) == "b"
+
+
+def test_cache_prefix_index_is_cleaned_up_on_delete():
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+
+    run(cache.set("tasks:u1:0:100", "a"))
+    run(cache.delete("tasks:u1:0:100"))
+
+    assert cache._cache._prefix_index == {}
+
+
+def test_cache_evicts_least_recently_used_when_entry_limit_reached():
+    cache = CacheService(base_ttl=10, jitter_ratio=0, max_entries=2)
+
+    run(cache.set("a", 1))
+    run(cache.set("b", 2))
+    assert run(cache.get("a")) == 1
+    run(cache.set("c", 3))
+
+    assert run(cache.get("b")) is None
+    assert run(cache.get("a")) == 1
+    assert run(cache.get("c")) == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_evicts_by_approximate_size_and_rejects_oversized_values():
+    cache = CacheService(base_ttl=10, jitter_ratio=0, max_bytes=2048)
+
+    run(cache.set("small:1", "x" * 600))
+    run(cache.set("small:2", "x" * 600))
+    run(cache.set("small:3", "x" * 600))
+    run(cache.set("huge", "x" * 4096))
+
+    stats = cache.stats()
+    assert run(cache.get("small:1")) is None
+    assert run(cache.get("small:3")) is not None
+    assert run(cache.get("huge")) is None
+    assert stats["bytes"] <= 2048
+    assert stats["evictions"] == 1
+    assert stats["rejected"] == 1
+
+
+def test_cache_sweep_removes_expired_keys_in_bounded_batches():
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+
+    for i in range(5):
+        run(cache.set(f"tmp:{i}", i, expire=1))
+    run(cache.set("keep", "v", expire=100))
+    assert cache._cache.size == 6
+
+    time.sleep(1.1)
+    assert cache._cache.sweep(max_keys=3) == 3
+    assert cache._cache.size == 3
+    assert cache._cache.sweep(max_keys=3) == 2
+    assert cache._cache.size == 1
+    assert cache.stats()["expired"] == 5
+    assert run(cache.get("keep")) == "v"
+
+
+def test_cache_sweep_skips_keys_overwritten_with_new_ttl():
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+
+    run(cache.set("k", "old", expire=1))
+    run(cache.set("k", "new", expire=100))
+
+    time.sleep(1.1)
+    cache._cache.sweep(max_keys=10)
+
+    assert run(cache.get("k")) == "new"
+
+
+def test_cache_sweeper_task_starts_and_stops():
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        await cache.set("tmp", "v", expire=1)
+        cache.start_sweeper(interval=0.05, batch_size=10)
+        await asyncio.sleep(1.2)
+        await cache.stop_sweeper()
+        return cache._cache.size
+
+    assert run(scenario()) == 0
+
+
+def test_get_or_load_coalesces_concurrent_misses():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["page"]
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        results = await asyncio.gather(*(cache.get_or_load("tasks:u1:0:100", loader) for _ in range(10)))
+        cached = await cache.get("tasks:u1:0:100")
+        return results, cached
+
+    results, cached = run(scenario())
+
+    assert len(calls) == 1
+    assert results == [["page"]] * 10
+    assert cached == ["page"]
+
+
+def test_get_or_load_propagates_loader_error_to_all_waiters_and_retries():
+    calls = []
+
+    async def failing_loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        results = await asyncio.gather(
+            *(cache.get_or_load("k", failing_loader) for _ in range(3)), return_exceptions=True
+        )
+        value = await cache.get_or_load("k", _constant("ok"))
+        return results, value
+
+    results, value = run(scenario())
+
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert value == "ok"
+
+
+def test_get_or_load_does_not_cache_value_invalidated_during_load():
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        started = asyncio.Event()
+
+        async def slow_loader():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "stale"
+
+        load = asyncio.create_task(cache.get_or_load("tasks:u1:0:100", slow_loader))
+        await started.wait()
+        await cache.delete_pattern("tasks:u1:*")
+        value = await load
+        return value, await cache.get("tasks:u1:0:100")
+
+    assert run(scenario()) == ("stale", None)
+
+
+def test_get_or_load_does_not_cache_none():
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        first = await cache.get_or_load("missing", _constant(None))
+        second = await cache.get_or_load("missing", _constant("found"))
+        return first, second
+
+    assert run(scenario()) == (None, "found")
+
+
+def _constant(value):
+    async def loader():
+        return value
+
+    return loader
+
+
+def test_get_or_load_serves_stale_value_and_refreshes_once_in_background():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return f"v{len(calls)}"
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        first = await cache.get_or_load("models:u1:0:100:all", loader, expire=100, stale_after=1)
+        await asyncio.sleep(1.1)
+        stale = await asyncio.gather(
+            *(cache.get_or_load("models:u1:0:100:all", loader, expire=100, stale_after=1) for _ in range(5))
+        )
+        await asyncio.sleep(0.1)
+        fresh = await cache.get_or_load("models:u1:0:100:all", loader, expire=100, stale_after=1)
+        return first, stale, fresh
+
+    first, stale, fresh = run(scenario())
+
+    assert first == "v1"
+    assert stale == ["v1"] * 5
+    assert fresh == "v2"
+    assert len(calls) == 2
+
+
+def test_get_or_load_keeps_stale_value_when_background_refresh_fails():
+    async def failing_loader():
+        raise RuntimeError("db down")
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        await cache.set("datasets:u1:0:100:", "v1", expire=100, stale_after=1)
+        await asyncio.sleep(1.1)
+        stale = await cache.get_or_load("datasets:u1:0:100:", failing_loader, expire=100, stale_after=1)
+        await asyncio.sleep(0.01)
+        return stale, await cache.get("datasets:u1:0:100:")
+
+    assert run(scenario()) == ("v1", "v1")
+
+
+def test_submit_runs_cache_operation_on_bound_loop_from_another_thread():
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        await cache.set("task:1", "t")
+        cache.bind_loop(asyncio.get_running_loop())
+
+        future = await asyncio.to_thread(lambda: cache.submit(cache.delete("task:1")))
+        await asyncio.wrap_future(future)
+        return await cache.get("task:1")
+
+    assert run(scenario()) is None
+
+
+def test_submit_without_bound_loop_raises():
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+
+    with pytest.raises(RuntimeError):
+        cache.submit(cache.delete("task:1"))
+
+
+def test_keys_render_enum_values_as_families():
+    user_id = uuid4()
+
+    assert CacheKeysObject.task(task_id=user_id).startswith("task:")
+    assert CacheKeysList.models(user_id=user_id).startswith(f"models:{user_id}:")
+    assert CacheKeysList.TASKS.pattern(user_id) == f"tasks:{user_id}:*"
+    assert key_family(CacheKeysList.datasets(user_id=user_id)) == "datasets"
+
+
+def test_metrics_are_broken_down_by_key_family():
+    user_id = uuid4()
+    task_key, missing_task_key = CacheKeysObject.task(task_id=uuid4()), CacheKeysObject.task(task_id=uuid4())
+    model_key = CacheKeysObject.model(model_id=uuid4())
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        await cache.set(task_key, "t")
+        await cache.set(CacheKeysList.tasks(user_id=user_id), "list")
+        await cache.get(task_key)
+        await cache.get(missing_task_key)
+
+        async def loader():
+            return "m"
+
+        await cache.get_or_load(model_key, loader)
+        await cache.get_or_load(model_key, loader)
+        await cache.delete_pattern(CacheKeysList.TASKS.pattern(user_id))
+        return cache.family_stats()
+
+    families = run(scenario())
+
+    assert set(families) == {"task", "tasks", "model"}
+    assert families["task"]["hits"] == 1
+    assert families["task"]["misses"] == 1
+    assert families["task"]["entries"] == 1
+    assert families["task"]["bytes"] > 0
+    assert families["model"]["hits"] == 1
+    assert families["model"]["misses"] == 1
+    assert families["model"]["sets"] == 1
+    assert families["model"]["load"]["count"] == 1
+    assert families["tasks"]["invalidations"] == 1
+    assert families["tasks"]["entries"] == 0
+    assert families["tasks"]["pattern_scan"]["count"] == 1
+
+
+def test_metrics_count_evictions_and_expirations_per_family():
+    dataset_key, model_key = CacheKeysObject.dataset(dataset_id=uuid4()), CacheKeysObject.model(model_id=uuid4())
+    cache = CacheService(base_ttl=10, jitter_ratio=0, max_entries=1)
+    run(cache.set(dataset_key, "a"))
+    run(cache.set(model_key, "b", expire=1))
+    cache._cache._store[model_key].expiry = time.time() - 1
+
+    assert run(cache.get(model_key)) is None
+    families = cache.family_stats()
+    assert families["dataset"]["evictions"] == 1
+    assert families["model"]["expirations"] == 1
+    assert families["model"]["entries"] == 0
+
+
+def test_metrics_registry_renders_prometheus_text():
+    from app.infrastructure.metrics import MetricsRegistry
+    from app.infrastructure.services.cache import CacheMetrics
+
+    task_key = CacheKeysObject.task(task_id=uuid4())
+    registry = MetricsRegistry()
+    cache = CacheService(base_ttl=10, jitter_ratio=0, metrics=CacheMetrics(registry))
+    run(cache.set(task_key, "t"))
+    run(cache.get(task_key))
+
+    text = registry.render()
+    assert '# TYPE cache_hits_total counter' in text
+    assert 'cache_hits_total{family="task"} 1' in text
+    assert 'cache_entries{family="task"} 1' in text
+
+
+def test_get_or_load_remembers_missing_value_for_missing_ttl():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return None
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        first = await cache.get_or_load("task:1", loader, missing_ttl=30)
+        second = await cache.get_or_load("task:1", loader, missing_ttl=30)
+        known = await cache.is_known_missing("task:1"), await cache.get("task:1")
+        await cache.delete("task:1")
+        return first, second, known, await cache.is_known_missing("task:1")
+
+    assert run(scenario()) == (None, None, (True, None), False)
+    assert len(calls) == 1
+
+
+def test_get_or_load_without_missing_ttl_does_not_remember_none():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return None
+
+    async def scenario():
+        cache = CacheService(base_ttl=10, jitter_ratio=0)
+        await cache.get_or_load("task:1", loader)
+        await cache.get_or_load("task:1", loader)
+
+    run(scenario())
+    assert len(calls) == 2
@@ -0,0 +1,98 @@
+import asyncio
+from uuid import uuid4
+
+from dishka import Provider, Scope, make_async_container, provide
+
+from app.core.interfaces import ITaskRepository
+from app.core.services import DatasetService, ModelService
+from app.infrastructure.services.cache.warmup import CacheWarmer
+from tests.utils import run
+
+
+class _Tracker:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+
+    async def step(self, name, *args):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.calls.append((name, *args))
+        await asyncio.sleep(0.01)
+        self.active -= 1
+
+
+class _ModelService:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    async def warm_system_models(self):
+        await self.tracker.step("system")
+        return 3
+
+    async def get_models_json(self, user_id):
+        await self.tracker.step("models", user_id)
+        return b"[]"
+
+
+class _DatasetService:
+    def __init__(self, tracker, fail_for=None):
+        self.tracker = tracker
+        self.fail_for = fail_for
+
+    async def get_datasets_json(self, user_id):
+        await self.tracker.step("datasets", user_id)
+        if user_id == self.fail_for:
+            raise RuntimeError("db is down")
+        return b"[]"
+
+
+class _TaskRepository:
+    def __init__(self, user_ids):
+        self.user_ids = user_ids
+
+    async def get_recently_active_user_ids(self, limit):
+        return self.user_ids[:limit]
+
+
+def _container(tracker, user_ids, fail_for=None):
+    provider = Provider(scope=Scope.REQUEST)
+    provider.provide(lambda: _ModelService(tracker), provides=ModelService)
+    provider.provide(lambda: _DatasetService(tracker, fail_for), provides=DatasetService)
+    provider.provide(lambda: _TaskRepository(user_ids), provides=ITaskRepository)
+    return make_async_container(provider)
+
+
+def test_warmer_preloads_system_models_and_hot_users_with_bounded_concurrency():
+    tracker = _Tracker()
+    user_ids = [uuid4() for _ in range(5)]
+
+    async def scenario():
+        container = _container(tracker, user_ids)
+        counts = await CacheWarmer(container, concurrency=2, hot_users=3).run()
+        await container.close()
+        return counts
+
+    counts = run(scenario())
+
+    assert counts == {"system_models": 3, "models": 3, "datasets": 3, "failed": 0}
+    assert tracker.peak == 2
+    assert {call[1] for call in tracker.calls if call[0] == "models"} == set(user_ids[:3])
+
+
+def test_warmer_skips_hot_users_by_default_and_survives_failures():
+    tracker = _Tracker()
+    user_ids = [uuid4(), uuid4()]
+
+    async def scenario():
+        container = _container(tracker, user_ids, fail_for=user_ids[0])
+        default = await CacheWarmer(container).run()
+        with_users = await CacheWarmer(container, hot_users=2).run()
+        await container.close()
+        return default, with_users
+
+    default, with_users = run(scenario())
+
+    assert default == {"system_models": 3, "models": 0, "datasets": 0, "failed": 0}
+    assert with_users == {"system_models": 3, "models": 2, "datasets": 1, "failed": 1}
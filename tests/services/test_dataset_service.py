@@ -5,8 +5,12 @@ from unittest.mock import AsyncMock
 import pytest
 
 from app.core.enums import CacheKeysList, CacheKeysObject
+from app.core.exceptions import NotFoundError, ValidationError
+from app.core.ownership import pack_owned
 from app.core.services.dataset_service import DatasetService
-from app.presentation.schemas import DatasetCreate
+from app.infrastructure.config import settings
+from app.infrastructure.services.cache import CacheService
+from app.presentation.schemas import DatasetCreate, DatasetRead
 from tests.utils import run
 
 
@@ -21,13 +25,13 @@ def test_create_dataset_uploads_and_clears_cache(monkeypatch):
     storage = SimpleNamespace(upload_file=AsyncMock(return_value="obj"))
     cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
 
-    service = DatasetService(dataset_repo, storage, cache_repo)
+    service = DatasetService(dataset_repo, storage, cache_repo, AsyncMock())
     result = run(service.create_dataset(dataset, b"data", "file.zip", "application/zip", user_id))
 
     assert dataset.minio_path == "obj"
     dataset_repo.create_dataset.assert_awaited_once()
     cache_repo.delete.assert_awaited_once_with(CacheKeysObject.dataset(dataset_id=created.id))
-    cache_repo.delete_pattern.assert_awaited_once_with(f"{CacheKeysList.DATASETS}:{user_id}:*")
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.DATASETS.pattern(user_id))
     assert result == created
 
 
@@ -38,27 +42,29 @@ def test_get_dataset_by_id_uses_cache():
 
     dataset_repo = SimpleNamespace(get_dataset_by_id=AsyncMock())
     storage = SimpleNamespace()
-    cache_repo = SimpleNamespace(get=AsyncMock(return_value=cached), set=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    run(cache_repo.set(CacheKeysObject.dataset(dataset_id=dataset_id),
+                       pack_owned(user_id, DatasetRead(**cached).model_dump_json().encode())))
 
-    service = DatasetService(dataset_repo, storage, cache_repo)
+    service = DatasetService(dataset_repo, storage, cache_repo, AsyncMock())
     result = run(service.get_dataset_by_id(dataset_id, user_id))
 
     assert result.id == dataset_id
     dataset_repo.get_dataset_by_id.assert_not_called()
 
 
-def test_get_dataset_by_id_permission_denied():
+def test_get_dataset_by_id_hides_dataset_of_another_user():
     user_id = uuid4()
     dataset_id = uuid4()
     dataset = SimpleNamespace(id=dataset_id, user_id=uuid4(), name="ds", minio_path="obj")
 
     dataset_repo = SimpleNamespace(get_dataset_by_id=AsyncMock(return_value=dataset))
     storage = SimpleNamespace()
-    cache_repo = SimpleNamespace(get=AsyncMock(return_value=None), set=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
 
-    service = DatasetService(dataset_repo, storage, cache_repo)
+    service = DatasetService(dataset_repo, storage, cache_repo, AsyncMock())
 
-    with pytest.raises(PermissionError):
+    with pytest.raises(NotFoundError):
         run(service.get_dataset_by_id(dataset_id, user_id))
 
 
@@ -72,15 +78,19 @@ def test_delete_dataset_by_id_deletes_storage_and_cache():
         delete_dataset_by_id=AsyncMock(),
     )
     storage = SimpleNamespace(delete_file=AsyncMock())
-    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+    cache_repo = SimpleNamespace(
+        is_known_missing=AsyncMock(return_value=False),
+        delete=AsyncMock(),
+        delete_pattern=AsyncMock(),
+    )
 
-    service = DatasetService(dataset_repo, storage, cache_repo)
+    service = DatasetService(dataset_repo, storage, cache_repo, AsyncMock())
     run(service.delete_dataset_by_id(dataset_id, user_id))
 
     storage.delete_file.assert_awaited_once()
     dataset_repo.delete_dataset_by_id.assert_awaited_once_with(dataset_id)
     cache_repo.delete.assert_awaited_once_with(CacheKeysObject.dataset(dataset_id=dataset_id))
-    cache_repo.delete_pattern.assert_awaited_once_with(f"{CacheKeysList.DATASETS}:{user_id}:*")
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.DATASETS.pattern(user_id))
 
 
 def test_download_dataset_checks_access_and_returns_url():
@@ -90,9 +100,42 @@ def test_download_dataset_checks_access_and_returns_url():
 
     dataset_repo = SimpleNamespace(get_dataset_by_id=AsyncMock(return_value=dataset))
     storage = SimpleNamespace(get_presigned_file_url=AsyncMock(return_value="url"))
-    cache_repo = SimpleNamespace(get=AsyncMock(return_value=None))
+    cache_repo = SimpleNamespace(is_known_missing=AsyncMock(return_value=False), get=AsyncMock(return_value=None))
 
-    service = DatasetService(dataset_repo, storage, cache_repo)
+    service = DatasetService(dataset_repo, storage, cache_repo, AsyncMock())
     url = run(service.download_dataset(dataset_id, user_id))
 
     assert url == "url"
+
+
+def test_search_datasets_json_normalizes_query_and_caches_ranked_page():
+    user_id = uuid4()
+    found = SimpleNamespace(id=uuid4(), user_id=user_id, name="Helmets v2", minio_path="obj", description=None)
+
+    dataset_repo = SimpleNamespace(search_datasets=AsyncMock(return_value=[found]))
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = DatasetService(dataset_repo, SimpleNamespace(), cache_repo, AsyncMock())
+
+    first = run(service.search_datasets_json(user_id, "  Helmets ", limit=10))
+    second = run(service.search_datasets_json(user_id, "helmets", limit=10))
+
+    assert second is first
+    dataset_repo.search_datasets.assert_awaited_once_with(user_id=user_id, query="helmets", skip=0, limit=10)
+    with pytest.raises(ValidationError):
+        run(service.search_datasets_json(user_id, "   "))
+
+
+def test_delete_datasets_removes_objects_in_one_call():
+    user_id = uuid4()
+    datasets = [SimpleNamespace(id=uuid4(), minio_path="a"), SimpleNamespace(id=uuid4(), minio_path="b")]
+
+    dataset_repo = SimpleNamespace(delete_datasets=AsyncMock(return_value=datasets))
+    storage = SimpleNamespace(delete_files=AsyncMock(return_value=[]))
+    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+
+    service = DatasetService(dataset_repo, storage, cache_repo, AsyncMock())
+    deleted = run(service.delete_datasets(user_id, dataset_ids=[dataset.id for dataset in datasets]))
+
+    assert deleted == [dataset.id for dataset in datasets]
+    storage.delete_files.assert_awaited_once_with(["a", "b"], settings.MINIO_DATASETS_BUCKET)
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.DATASETS.pattern(user_id))
@@ -1,3 +1,9 @@
+import hmac
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from miniopy_async import Minio
+
 from app.infrastructure.services.cloud_storage.minio_storage import MinioStorage
 from tests.utils import run
 
@@ -26,9 +32,14 @@ class _FakeMinio:
     async def remove_object(self, bucket_name, object_name):
         self.remove_calls.append((bucket_name, object_name))
 
-    async def presigned_get_object(self, bucket_name, object_name, expires):
+    async def remove_objects(self, bucket_name, delete_object_list):
+        names = [delete_object._name for delete_object in delete_object_list]
+        self.remove_calls.append((bucket_name, names))
+        return [SimpleNamespace(name=name) for name in names if name.startswith("locked")]
+
+    async def presigned_get_object(self, bucket_name, object_name, expires, request_date=None):
         self.presigned_calls.append((bucket_name, object_name, expires))
-        return "url"
+        return f"url-{len(self.presigned_calls)}"
 
 
 def test_upload_file_creates_bucket_and_uploads(monkeypatch):
@@ -51,6 +62,73 @@ def test_delete_and_presign(monkeypatch):
     url = run(storage.get_presigned_file_url("obj", "bucket", expires=10))
 
     assert storage.client.remove_calls == [("bucket", "obj")]
+    # ссылка подписывается локально, без обращения к MinIO
     assert storage.client.presigned_calls == []
-    assert storage.signer_client.presigned_calls
-    assert url == "url"
+    assert url.startswith("http://localhost:9000/bucket/obj?X-Amz-Algorithm=AWS4-HMAC-SHA256&")
+
+
+def test_presigned_url_is_reused_within_expiry_window(monkeypatch):
+    monkeypatch.setattr("app.infrastructure.services.cloud_storage.minio_storage.Minio", _FakeMinio)
+    now = [1_000_000]
+    monkeypatch.setattr("app.infrastructure.services.cloud_storage.minio_storage.time.time", lambda: now[0])
+
+    storage = MinioStorage("endpoint", "key", "secret")
+    first = run(storage.get_presigned_file_url("obj", "bucket", expires=400))
+    now[0] += 50
+    second = run(storage.get_presigned_file_url("obj", "bucket", expires=400))
+    now[0] += 100
+    third = run(storage.get_presigned_file_url("obj", "bucket", expires=400))
+
+    assert first == second
+    assert third != first
+    # ссылка продлена на длину окна, поэтому из кеша она живет не меньше запрошенного срока
+    assert "X-Amz-Expires=500&" in first
+
+
+def test_delete_file_drops_cached_presigned_urls(monkeypatch):
+    monkeypatch.setattr("app.infrastructure.services.cloud_storage.minio_storage.Minio", _FakeMinio)
+
+    storage = MinioStorage("endpoint", "key", "secret")
+    run(storage.get_presigned_file_url("obj", "bucket", expires=3600))
+    run(storage.delete_file("obj", "bucket"))
+
+    assert ("bucket", "obj") not in storage._presigned
+
+
+def test_presigned_url_matches_minio_client_signature():
+    # та же подпись, что у miniopy-async: расхождение означает, что ссылки перестанут приниматься MinIO
+    request_date = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    storage = MinioStorage("minio:9000", "key", "secret")
+    reference = Minio("localhost:9000", access_key="key", secret_key="secret", secure=False, region="us-east-1")
+
+    url = storage._presign_get("bucket", "user/схема 1.png", 600, request_date)
+    expected = run(reference.presigned_get_object("bucket", "user/схема 1.png", expires=timedelta(seconds=600),
+                                                  request_date=request_date))
+
+    assert url == expected
+
+
+def test_signing_key_is_derived_once_per_day(monkeypatch):
+    derived = []
+    new_hmac = hmac.new
+    monkeypatch.setattr("app.infrastructure.services.cloud_storage.minio_storage.hmac.new",
+                        lambda key, *args: derived.append(key) or new_hmac(key, *args))
+
+    storage = MinioStorage("minio:9000", "key", "secret")
+    urls = [run(storage.get_presigned_file_url(f"obj-{i}", "bucket", expires=60)) for i in range(5)]
+
+    assert len(set(urls)) == 5
+    # 4 HMAC на вывод ключа за день и по одному на подпись каждой ссылки
+    assert len(derived) == 4 + 5
+
+
+def test_delete_files_removes_batch_in_one_call_and_reports_failures(monkeypatch):
+    monkeypatch.setattr("app.infrastructure.services.cloud_storage.minio_storage.Minio", _FakeMinio)
+
+    storage = MinioStorage("endpoint", "key", "secret")
+    run(storage.get_presigned_file_url("a", "bucket", expires=10))
+    failed = run(storage.delete_files(["a", "locked-b"], "bucket"))
+
+    assert storage.client.remove_calls == [("bucket", ["a", "locked-b"])]
+    assert failed == ["locked-b"]
+    assert ("bucket", "a") not in storage._presigned
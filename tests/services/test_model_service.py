@@ -5,11 +5,28 @@ from unittest.mock import AsyncMock
 import pytest
 
 from app.core.enums import CacheKeysList, CacheKeysObject
+from app.core.exceptions import NotFoundError
+from app.core.ownership import pack_owned
 from app.core.services.model_service import ModelService
-from app.presentation.schemas import ModelCreate
+from app.infrastructure.services.cache import CacheService
+from app.presentation.schemas import ModelCreate, ModelRead
 from tests.utils import run
 
 
+def _model(model_id, user_id, is_system=False):
+    return SimpleNamespace(
+        id=model_id,
+        user_id=user_id,
+        name="m",
+        architecture="a",
+        architecture_profile="p",
+        is_system=is_system,
+        minio_model_path="obj",
+        dataset_id=None,
+        base_model_id=None,
+    )
+
+
 def test_create_model_uploads_and_clears_cache(monkeypatch):
     async def _validate(*_):
         return None
@@ -25,12 +42,12 @@ def test_create_model_uploads_and_clears_cache(monkeypatch):
     storage = SimpleNamespace(upload_file=AsyncMock(return_value="obj"))
     cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
 
-    service = ModelService(model_repo, storage, dataset_repo, cache_repo)
+    service = ModelService(model_repo, storage, dataset_repo, cache_repo, AsyncMock())
     result = run(service.create_model(model, b"data", "model.pt", "application/octet-stream", user_id))
 
     assert model.minio_model_path == "obj"
     cache_repo.delete.assert_awaited_once_with(CacheKeysObject.model(model_id=created.id))
-    cache_repo.delete_pattern.assert_awaited_once_with(f"{CacheKeysList.MODELS}:{user_id}:*")
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.MODELS.pattern(user_id))
     assert result == created
 
 
@@ -52,9 +69,11 @@ def test_get_model_by_id_uses_cache():
     model_repo = SimpleNamespace(get_model_by_id=AsyncMock())
     dataset_repo = SimpleNamespace()
     storage = SimpleNamespace()
-    cache_repo = SimpleNamespace(get=AsyncMock(return_value=cached), set=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    run(cache_repo.set(CacheKeysObject.model(model_id=model_id),
+                       pack_owned(user_id, ModelRead(**cached).model_dump_json().encode())))
 
-    service = ModelService(model_repo, storage, dataset_repo, cache_repo)
+    service = ModelService(model_repo, storage, dataset_repo, cache_repo, AsyncMock())
     result = run(service.get_model_by_id(model_id, user_id))
 
     assert result.id == model_id
@@ -64,14 +83,14 @@ def test_get_model_by_id_uses_cache():
 def test_delete_model_by_id_rejects_system_model():
     user_id = uuid4()
     model_id = uuid4()
-    model = SimpleNamespace(id=model_id, user_id=user_id, is_system=True)
+    model = _model(model_id, user_id, is_system=True)
 
     model_repo = SimpleNamespace(get_model_by_id=AsyncMock(return_value=model))
     dataset_repo = SimpleNamespace()
     storage = SimpleNamespace(delete_file=AsyncMock())
-    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
 
-    service = ModelService(model_repo, storage, dataset_repo, cache_repo)
+    service = ModelService(model_repo, storage, dataset_repo, cache_repo, AsyncMock())
 
     with pytest.raises(PermissionError):
         run(service.delete_model_by_id(model_id, user_id))
@@ -80,14 +99,79 @@ def test_delete_model_by_id_rejects_system_model():
 def test_download_model_returns_url():
     user_id = uuid4()
     model_id = uuid4()
-    model = SimpleNamespace(id=model_id, user_id=user_id, is_system=False, minio_model_path="obj")
+    model = _model(model_id, user_id)
 
     model_repo = SimpleNamespace(get_model_by_id=AsyncMock(return_value=model))
     dataset_repo = SimpleNamespace()
     storage = SimpleNamespace(get_presigned_file_url=AsyncMock(return_value="url"))
-    cache_repo = SimpleNamespace()
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
 
-    service = ModelService(model_repo, storage, dataset_repo, cache_repo)
+    service = ModelService(model_repo, storage, dataset_repo, cache_repo, AsyncMock())
     url = run(service.download_model(model_id, user_id))
 
     assert url == "url"
+
+
+def test_missing_model_lookups_stop_reaching_repository_until_created():
+    user_id = uuid4()
+    model_id = uuid4()
+
+    model_repo = SimpleNamespace(get_model_by_id=AsyncMock(return_value=None))
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = ModelService(model_repo, SimpleNamespace(), SimpleNamespace(), cache_repo, AsyncMock())
+
+    for _ in range(3):
+        with pytest.raises(NotFoundError):
+            run(service.download_model(model_id, user_id))
+    model_repo.get_model_by_id.assert_awaited_once_with(model_id)
+
+    model_repo.get_model_by_id.return_value = _model(model_id, user_id)
+    run(cache_repo.delete(CacheKeysObject.model(model_id=model_id)))
+    service.storage = SimpleNamespace(get_presigned_file_url=AsyncMock(return_value="url"))
+
+    assert run(service.download_model(model_id, user_id)) == "url"
+
+
+def test_warm_system_models_serves_task_lookups_from_cache():
+    model_id = uuid4()
+    model_repo = SimpleNamespace(
+        get_system_models=AsyncMock(return_value=[_model(model_id, None, is_system=True)]),
+        get_model_by_id=AsyncMock(),
+    )
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = ModelService(model_repo, SimpleNamespace(), SimpleNamespace(), cache_repo, AsyncMock())
+
+    assert run(service.warm_system_models()) == 1
+    with pytest.raises(PermissionError):
+        run(service.download_model(model_id, uuid4()))
+    model_repo.get_model_by_id.assert_not_called()
+
+
+def test_search_models_json_keeps_system_and_own_results_apart():
+    user_id = uuid4()
+    model_repo = SimpleNamespace(search_models=AsyncMock(return_value=[_model(uuid4(), user_id)]))
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = ModelService(model_repo, SimpleNamespace(), SimpleNamespace(), cache_repo, AsyncMock())
+
+    run(service.search_models_json(user_id, "YOLO"))
+    run(service.search_models_json(user_id, "yolo", include_system=False))
+
+    assert [call.kwargs["include_system"] for call in model_repo.search_models.await_args_list] == [True, False]
+    assert model_repo.search_models.await_args.kwargs["query"] == "yolo"
+
+
+def test_get_models_json_caches_pages_with_and_without_system_models_apart():
+    user_id = uuid4()
+    own, system = _model(uuid4(), user_id), _model(uuid4(), None, is_system=True)
+    model_repo = SimpleNamespace(
+        get_models=AsyncMock(side_effect=lambda include_system, **kwargs: [own, system] if include_system else [own]),
+    )
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = ModelService(model_repo, SimpleNamespace(), SimpleNamespace(), cache_repo, AsyncMock())
+
+    with_system = run(service.get_models(user_id))
+    without_system = run(service.get_models(user_id, include_system=False))
+
+    assert [model.id for model in with_system] == [own.id, system.id]
+    assert [model.id for model in without_system] == [own.id]
+    assert [call.kwargs["include_system"] for call in model_repo.get_models.await_args_list] == [True, False]
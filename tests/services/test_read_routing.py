@@ -0,0 +1,66 @@
+from uuid import uuid4
+
+from app.common.security import create_access_token
+from app.core.enums import CacheKeysObject
+from app.infrastructure.database import AsyncReadSessionLocal, AsyncSessionLocal
+from app.infrastructure.read_routing import ReadYourWrites, session_factory
+from app.infrastructure.services.cache import CacheService
+from app.middleware.read_routing import ReadRoutingMiddleware
+from tests.utils import run
+
+
+class _RecordingApp:
+    def __init__(self):
+        self.factories = []
+
+    async def __call__(self, scope, receive, send):
+        self.factories.append(session_factory())
+
+
+def _middleware(window_seconds: float):
+    app = _RecordingApp()
+    cache = CacheService(base_ttl=10, jitter_ratio=0)
+    return ReadRoutingMiddleware(app, ReadYourWrites(cache, window_seconds)), app
+
+
+def _request(middleware, method: str, path: str = "/tasks/", user_id=None):
+    headers = []
+    if user_id is not None:
+        token = create_access_token({"sub": str(user_id)})
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    scope = {"type": "http", "method": method, "path": path, "headers": headers}
+    run(middleware(scope, None, None))
+
+
+def test_reads_go_to_replica_once_user_has_no_recent_writes():
+    middleware, app = _middleware(window_seconds=0)
+    user_id = uuid4()
+
+    # первый GET не знает, когда пользователь писал в последний раз, - основная база
+    _request(middleware, "GET", user_id=user_id)
+    _request(middleware, "GET", user_id=user_id)
+    _request(middleware, "GET")
+
+    assert app.factories == [AsyncSessionLocal, AsyncReadSessionLocal, AsyncReadSessionLocal]
+
+
+def test_write_keeps_user_on_primary_for_the_window():
+    middleware, app = _middleware(window_seconds=60)
+    user_id, other_user_id = uuid4(), uuid4()
+    # оба пользователя давно ничего не писали
+    for known_user_id in (user_id, other_user_id):
+        run(middleware.read_your_writes.cache.set(CacheKeysObject.replica_reads(user_id=known_user_id), b"0"))
+
+    _request(middleware, "POST", path="/tasks/create/inference", user_id=user_id)
+    _request(middleware, "GET", user_id=user_id)
+    _request(middleware, "GET", user_id=other_user_id)
+
+    assert app.factories == [AsyncSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal]
+
+
+def test_task_subscription_always_reads_primary():
+    middleware, app = _middleware(window_seconds=0)
+
+    _request(middleware, "GET", path=f"/tasks/subscribe/{uuid4()}")
+
+    assert app.factories == [AsyncSessionLocal]
@@ -0,0 +1,281 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.infrastructure.services.cache import CacheService, RedisCacheStore
+from tests.utils import run
+
+
+class _FakeRedisServer:
+    # минимальный сервер Redis-протокола в памяти: только команды, которые использует RedisCacheStore
+    def __init__(self):
+        self.data: dict[bytes, object] = {}
+        self.expiry: dict[bytes, float] = {}
+        self.commands: list[list[bytes]] = []
+        self.writes = 0
+        self._server: asyncio.AbstractServer | None = None
+
+    async def __aenter__(self) -> "_FakeRedisServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        queued = None
+        try:
+            while True:
+                command = await self._read_command(reader)
+                self.commands.append(command)
+                name = command[0].upper()
+                # MULTI/EXEC: команды копятся на соединении и выполняются разом
+                if name == b"MULTI":
+                    queued, reply = [], "OK"
+                elif name == b"EXEC":
+                    reply, queued = [self._execute(queued_command) for queued_command in queued], None
+                elif queued is not None:
+                    queued.append(command)
+                    reply = "QUEUED"
+                else:
+                    reply = self._execute(command)
+                writer.write(self._reply(reply))
+                if reader._buffer:
+                    continue
+                self.writes += 1
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def _read_command(self, reader):
+        count = int((await reader.readuntil(b"\r\n"))[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _alive(self, key):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    def _execute(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == b"GET":
+            return self.data[args[0]] if self._alive(args[0]) else None
+        if name == b"PTTL":
+            if not self._alive(args[0]):
+                return -2
+            return int((self.expiry[args[0]] - time.time()) * 1000) if args[0] in self.expiry else -1
+        if name == b"SET":
+            self.data[args[0]] = args[1]
+            self.expiry.pop(args[0], None)
+            if len(args) == 4 and args[2].upper() == b"EX":
+                self.expiry[args[0]] = time.time() + int(args[3])
+            return "OK"
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == b"ZADD":
+            self._alive(args[0])
+            members = self.data.setdefault(args[0], {})
+            before = len(members)
+            for score, member in zip(args[1::2], args[2::2]):
+                members[member] = float(score)
+            return len(members) - before
+        if name == b"ZREM":
+            members = self.data.get(args[0], {})
+            return sum(members.pop(member, None) is not None for member in args[1:])
+        if name == b"ZREMRANGEBYSCORE":
+            members = self.data.get(args[0], {}) if self._alive(args[0]) else {}
+            low, high = float(args[1]), float(args[2])
+            expired = [member for member, score in members.items() if low <= score <= high]
+            for member in expired:
+                del members[member]
+            return len(expired)
+        if name == b"ZSCAN":
+            # весь тег за один шаг курсора
+            members = self.data[args[0]] if self._alive(args[0]) else {}
+            return [b"0", [item for member, score in members.items() for item in (member, repr(score).encode())]]
+        if name == b"EXPIRE":
+            if not self._alive(args[0]):
+                return 0
+            self.expiry[args[0]] = time.time() + int(args[1])
+            return 1
+        return Exception(f"ERR unknown command '{name.decode()}'")
+
+    def _reply(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return b"-%s\r\n" % str(value).encode()
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"*%d\r\n" % len(value) + b"".join(self._reply(item) for item in value)
+
+
+def test_store_round_trips_values_with_ttl():
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            store = RedisCacheStore.from_url(server.url)
+            await store.set("task:1", b'{"id": 1}', ttl=30)
+            value, ttl_ms = await store.get("task:1")
+            missing = await store.get("task:2")
+            await store.close()
+            return value, ttl_ms, missing
+
+    value, ttl_ms, missing = run(scenario())
+
+    assert value == b'{"id": 1}'
+    assert 0 < ttl_ms <= 30_000
+    assert missing == (None, -2)
+
+
+def _data_commands(commands):
+    # служебные команды клиента при подключении (CLIENT SETINFO) к делу не относятся
+    return [command for command in commands if command[0].upper() != b"CLIENT"]
+
+
+def test_store_tags_list_key_by_owner_in_one_transaction():
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            store = RedisCacheStore.from_url(server.url)
+            await store.get("tasks:u1:0:100")
+            server.commands.clear()
+            writes = server.writes
+            await store.set("tasks:u1:0:100", b"[]", ttl=30)
+            await store.close()
+            return _data_commands(server.commands), server.writes - writes, set(server.data)
+
+    commands, writes, keys = run(scenario())
+
+    assert [command[0] for command in commands] == [b"MULTI", b"SET", b"ZADD", b"ZREMRANGEBYSCORE", b"EXPIRE",
+                                                    b"EXEC"]
+    assert commands[2][1] == b"ztag:tasks:u1:"
+    # тега на все семейство ("ztag:tasks:") нет: он рос бы без ограничений
+    assert keys == {b"tasks:u1:0:100", b"ztag:tasks:u1:"}
+    assert writes == 1
+
+
+def test_store_does_not_tag_object_keys_and_untags_on_delete():
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            store = RedisCacheStore.from_url(server.url)
+            await store.set("task:1", b"t", ttl=30)
+            await store.set("tasks:u1:0:100", b"a", ttl=30)
+            await store.delete("tasks:u1:0:100")
+            await store.close()
+            return set(server.data), server.data.get(b"ztag:tasks:u1:")
+
+    keys, tag = run(scenario())
+
+    assert keys == {b"task:1", b"ztag:tasks:u1:"}
+    assert tag == {}
+
+
+def test_store_deletes_tagged_keys_without_scan():
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            store = RedisCacheStore.from_url(server.url)
+            await store.set("tasks:u1:0:100", b"a", ttl=30)
+            await store.set("tasks:u1:100:100", b"b", ttl=30)
+            await store.set("tasks:u2:0:100", b"c", ttl=30)
+            deleted = await store.delete_tagged("tasks:u1:", lambda key: True)
+            remaining = [await store.get(key) for key in ("tasks:u1:0:100", "tasks:u2:0:100")]
+            await store.close()
+            return deleted, remaining, [command[0] for command in server.commands], server.data[b"ztag:tasks:u1:"]
+
+    deleted, remaining, names, tag = run(scenario())
+
+    assert deleted == 2
+    assert remaining[0] == (None, -2)
+    assert remaining[1][0] == b"c"
+    assert tag == {}
+    assert b"ZSCAN" in names
+    assert b"SCAN" not in names and b"KEYS" not in names and b"ZRANGE" not in names
+
+
+def test_store_prunes_expired_keys_from_tag(monkeypatch):
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            store = RedisCacheStore.from_url(server.url)
+            await store.set("datasets:u1:0:100:first", b"a", ttl=30)
+            await store.set("datasets:u1:0:100:second", b"b", ttl=300)
+            # следующая запись приходит, когда первый ключ уже истек
+            later = time.time() + 60
+            monkeypatch.setattr("app.infrastructure.services.cache.redis_store.time",
+                                SimpleNamespace(time=lambda: later))
+            await store.set("datasets:u1:0:100:third", b"c", ttl=30)
+            await store.close()
+            return set(server.data[b"ztag:datasets:u1:"])
+
+    assert run(scenario()) == {b"datasets:u1:0:100:second", b"datasets:u1:0:100:third"}
+
+
+def test_new_worker_starts_warm_from_shared_store():
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            worker_a = CacheService(base_ttl=10, jitter_ratio=0, shared=RedisCacheStore.from_url(server.url))
+            worker_b = CacheService(base_ttl=10, jitter_ratio=0, shared=RedisCacheStore.from_url(server.url))
+            calls = []
+
+            async def loader():
+                calls.append(1)
+                return b"payload"
+
+            first = await worker_a.get_or_load("models:u1:0:100:all", loader, expire=30)
+            second = await worker_b.get_or_load("models:u1:0:100:all", loader, expire=30)
+            # значение из L2 закешировано и в L1 второго воркера
+            local = await worker_b._cache.get("models:u1:0:100:all")
+            await worker_a.close_shared()
+            await worker_b.close_shared()
+            return first, second, local, len(calls)
+
+    assert run(scenario()) == (b"payload", b"payload", b"payload", 1)
+
+
+def test_delete_pattern_invalidates_shared_store():
+    async def scenario():
+        async with _FakeRedisServer() as server:
+            cache = CacheService(base_ttl=10, jitter_ratio=0, shared=RedisCacheStore.from_url(server.url))
+            await cache.set("datasets:u1:0:100:", b"a")
+            await cache.set("datasets:u2:0:100:", b"b")
+            await cache.delete_pattern("datasets:u1:*")
+            await cache.clear_local()
+            result = await cache.get("datasets:u1:0:100:"), await cache.get("datasets:u2:0:100:")
+            await cache.close_shared()
+            return result
+
+    assert run(scenario()) == (None, b"b")
+
+
+def test_unavailable_shared_store_falls_back_to_loader():
+    async def scenario():
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+
+        cache = CacheService(base_ttl=10, jitter_ratio=0, shared=RedisCacheStore(port=port, host="127.0.0.1"))
+
+        async def loader():
+            return b"payload"
+
+        value = await cache.get_or_load("task:1", loader)
+        return value, cache.family_stats()["task"]["shared_errors"]
+
+    value, errors = run(scenario())
+
+    assert value == b"payload"
+    assert errors == 2
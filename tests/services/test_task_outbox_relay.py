@@ -0,0 +1,163 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+from app.core.enums import QueueTypes, TaskStatus, TaskType
+from app.core.interfaces import OutboxEntry
+from app.infrastructure.services.broker import outbox_relay
+from app.infrastructure.services.broker.metrics import OutboxMetrics
+from tests.utils import run
+
+
+class _FakeOutboxRepository:
+    messages = []
+    deleted = []
+    rescheduled = []
+
+    def __init__(self, session):
+        pass
+
+    async def claim_messages(self, limit, lease_seconds):
+        return self.messages[:limit]
+
+    async def delete_messages(self, message_ids):
+        self.deleted.extend(message_ids)
+
+    async def reschedule_message(self, message_id, available_at, error):
+        self.rescheduled.append((message_id, available_at, error))
+
+
+class _RecordingStatusService:
+    updates = []
+
+    def __init__(self, task_repo, cache_repo, uow):
+        pass
+
+    async def apply_updates(self, updates):
+        self.updates.extend(updates)
+        return []
+
+
+class _FakePublisher:
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.calls = []
+
+    def publish_inference(self, queue, message):
+        self.calls.append(("inference", queue, message["task_id"]))
+        return message["task_id"] not in self.rejected
+
+    def publish_training(self, queue, message):
+        self.calls.append(("training", queue, message["task_id"]))
+        return message["task_id"] not in self.rejected
+
+    async def publish_batch(self, messages):
+        return [
+            self.publish_training(queue, message) if message["task_type"] == TaskType.training
+            else self.publish_inference(queue, message)
+            for queue, message in messages
+        ]
+
+
+def _message(message_id, task_type=TaskType.inference, attempts=1):
+    task_id = uuid4()
+    queue = QueueTypes.training_queue if task_type == TaskType.training else QueueTypes.inference_queue
+    return OutboxEntry(
+        id=message_id,
+        task_id=task_id,
+        queue=queue.value,
+        payload={"task_id": str(task_id), "task_type": task_type.value},
+        attempts=attempts,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def _relay(monkeypatch, messages, publisher, **kwargs):
+    _FakeOutboxRepository.messages = messages
+    _FakeOutboxRepository.deleted = []
+    _FakeOutboxRepository.rescheduled = []
+    _RecordingStatusService.updates = []
+    session = SimpleNamespace(commit=AsyncMock())
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    monkeypatch.setattr(outbox_relay, "OutboxRepository", _FakeOutboxRepository)
+    monkeypatch.setattr(outbox_relay, "TaskStatusService", _RecordingStatusService)
+    relay = outbox_relay.TaskOutboxRelay(publisher, session_factory=session_factory, metrics=OutboxMetrics(),
+                                         **kwargs)
+    return relay, session
+
+
+def test_relay_publishes_batch_and_deletes_sent_messages(monkeypatch):
+    messages = [_message(1), _message(2, TaskType.training)]
+    publisher = _FakePublisher()
+    relay, session = _relay(monkeypatch, messages, publisher)
+
+    relayed = run(relay.relay_once())
+
+    assert relayed == 2
+    assert [call[:2] for call in publisher.calls] == [
+        ("inference", QueueTypes.inference_queue.value),
+        ("training", QueueTypes.training_queue.value),
+    ]
+    assert _FakeOutboxRepository.deleted == [1, 2]
+    assert _FakeOutboxRepository.rescheduled == []
+    # забор строк и результат отправки - две отдельные транзакции
+    assert session.commit.await_count == 2
+    assert relay._metrics.messages.value("published") == 2
+
+
+def test_relay_reschedules_rejected_message_with_backoff(monkeypatch):
+    sent, rejected = _message(1), _message(2, attempts=3)
+    publisher = _FakePublisher(rejected={rejected.payload["task_id"]})
+    relay, session = _relay(monkeypatch, [sent, rejected], publisher, retry_base=1.0, retry_max=60.0)
+
+    before = datetime.now(timezone.utc)
+    run(relay.relay_once())
+
+    assert _FakeOutboxRepository.deleted == [1]
+    [(message_id, available_at, error)] = _FakeOutboxRepository.rescheduled
+    assert message_id == 2
+    # третья попытка - пауза 1 * 2**2 секунды
+    assert 4 <= (available_at - before).total_seconds() < 5
+    assert error == "broker rejected the message"
+    assert session.commit.await_count == 2
+    assert relay._metrics.messages.value("retried") == 1
+
+
+def test_relay_fails_task_after_last_attempt(monkeypatch):
+    message = _message(1, attempts=3)
+    publisher = _FakePublisher(rejected={message.payload["task_id"]})
+    relay, session = _relay(monkeypatch, [message], publisher, max_attempts=3)
+
+    run(relay.relay_once())
+
+    assert _FakeOutboxRepository.deleted == [1]
+    assert _FakeOutboxRepository.rescheduled == []
+    [update] = _RecordingStatusService.updates
+    assert update["task_id"] == message.task_id
+    assert update["status"] == TaskStatus.failed.value
+    # после забора строк вторую транзакцию фиксирует сервис статусов, вместе с удалением строки outbox
+    session.commit.assert_awaited_once()
+    assert relay._metrics.messages.value("failed") == 1
+
+
+def test_relay_commits_claim_before_publishing(monkeypatch):
+    events = []
+
+    class _OrderedPublisher(_FakePublisher):
+        async def publish_batch(self, messages):
+            events.append("publish")
+            return await super().publish_batch(messages)
+
+    relay, session = _relay(monkeypatch, [_message(1)], _OrderedPublisher())
+    session.commit.side_effect = lambda: events.append("commit")
+
+    run(relay.relay_once())
+
+    # строки помечены арендой и транзакция закрыта до обращения к брокеру
+    assert events == ["commit", "publish", "commit"]
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+from uuid import uuid4
+from unittest.mock import AsyncMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.enums import TaskStatus, TaskType
+from app.infrastructure.persistence.repositories import TaskRepository
+from app.presentation.schemas import TaskCreate
+from tests.utils import run
+
+
+class _RecordingSession:
+    def __init__(self, row=None):
+        self.row = row
+        self.statements = []
+        self.commit = AsyncMock()
+        self.refresh = AsyncMock()
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(scalar_one_or_none=lambda: self.row)
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_update_task_statuses_applies_batch_in_one_statement():
+    rows = [SimpleNamespace(id=uuid4()), SimpleNamespace(id=uuid4())]
+    session = _RecordingSession()
+    session.execute = AsyncMock(return_value=SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: rows)))
+
+    result = run(TaskRepository(session).update_task_statuses([
+        {"task_id": rows[0].id, "status": TaskStatus.running.value},
+        {"task_id": rows[1].id, "status": TaskStatus.failed.value, "error_msg": "boom"},
+    ]))
+
+    assert result == rows
+    [statement] = session.execute.await_args.args
+    sql = _sql(statement)
+    assert sql.startswith("UPDATE tasks SET")
+    assert "FROM (VALUES" in sql and "RETURNING" in sql
+    # промежуточный статус не переоткрывает завершенную задачу, финальный может переписать другой финальный
+    assert "tasks.status NOT IN" in sql and "updates.status IN" in sql
+    session.commit.assert_not_called()
+    session.refresh.assert_not_called()
+
+
+def test_update_task_statuses_skips_empty_batch():
+    session = _RecordingSession()
+
+    assert run(TaskRepository(session).update_task_statuses([])) == []
+    assert session.statements == []
+
+
+def test_delete_tasks_checks_owner_inside_single_delete_returning():
+    user_id = uuid4()
+    session = _RecordingSession()
+    session.execute = AsyncMock(return_value=SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [])))
+
+    run(TaskRepository(session).delete_tasks(user_id, task_ids=[uuid4()], status=TaskStatus.failed.value))
+
+    [statement] = session.execute.await_args.args
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("DELETE FROM tasks WHERE")
+    assert "RETURNING" in str(compiled)
+    assert user_id in compiled.params.values()
+    session.commit.assert_not_called()
+
+
+def test_create_inference_task_flushes_without_commit_or_refresh():
+    session = _RecordingSession()
+    session.add = lambda _task: None
+    session.flush = AsyncMock()
+
+    run(TaskRepository(session).create_inference_task(
+        TaskCreate(task_type=TaskType.inference, user_id=uuid4(), model_id=uuid4(), input_path="in")
+    ))
+
+    # created_at приходит в RETURNING того же INSERT (eager_defaults), фиксирует транзакцию unit of work
+    session.flush.assert_awaited_once()
+    session.commit.assert_not_called()
+    session.refresh.assert_not_called()
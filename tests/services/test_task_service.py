@@ -1,30 +1,42 @@
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 from uuid import uuid4
 from unittest.mock import AsyncMock
 
 import pytest
 
-from app.core.enums import CacheKeysList, CacheKeysObject, QueueTypes, TaskType
+from app.core.enums import CacheKeysList, CacheKeysObject, QueueTypes, TaskStatus, TaskType
 from app.core.exceptions import NotFoundError, ValidationError
+from app.core.ownership import pack_owned, unpack_owned
+from app.core.pagination import decode_cursor
 from app.core.services.task_service import TaskService
-from app.presentation.schemas import TaskCreate
+from app.infrastructure.services.cache import CacheService
+from app.presentation.schemas import ModelRead, TaskCreate, TaskRead
 from tests.utils import run
 
 
-class _FakeBobberPublisher:
-    def __init__(self, inference_ok: bool = True, training_ok: bool = True):
-        self.inference_ok = inference_ok
-        self.training_ok = training_ok
-        self.inference_calls = []
-        self.training_calls = []
+class _FakeOutbox:
+    def __init__(self):
+        self.messages = []
 
-    def publish_inference(self, queue, message):
-        self.inference_calls.append((queue, message))
-        return self.inference_ok
+    async def add_message(self, task_id, queue, payload):
+        self.messages.append((task_id, queue, payload))
 
-    def publish_training(self, queue, message):
-        self.training_calls.append((queue, message))
-        return self.training_ok
+
+def _system_model(model_id):
+    return SimpleNamespace(
+        id=model_id,
+        user_id=None,
+        name="m",
+        architecture="yolo",
+        architecture_profile="p",
+        is_system=True,
+        minio_model_path="obj",
+        dataset_id=None,
+        base_model_id=None,
+    )
 
 
 def test_create_inference_task_without_model_id_raises_not_found():
@@ -34,7 +46,7 @@ def test_create_inference_task_without_model_id_raises_not_found():
     dataset_repo = SimpleNamespace()
     cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeBobberPublisher())
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeOutbox(), AsyncMock())
     task = TaskCreate(task_type=TaskType.inference, user_id=uuid4(), model_id=None)
 
     with pytest.raises(NotFoundError):
@@ -45,39 +57,50 @@ def test_create_inference_task_invalid_content_type():
     model_id = uuid4()
     task_repo = SimpleNamespace(create_inference_task=AsyncMock())
     storage = SimpleNamespace(upload_file=AsyncMock())
-    model_repo = SimpleNamespace(get_model_by_id=AsyncMock(return_value=SimpleNamespace(id=model_id)))
+    model_repo = SimpleNamespace(get_model_by_id=AsyncMock(return_value=_system_model(model_id)))
     dataset_repo = SimpleNamespace()
-    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeBobberPublisher())
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeOutbox(), AsyncMock())
     task = TaskCreate(task_type=TaskType.inference, user_id=uuid4(), model_id=model_id)
 
     with pytest.raises(ValidationError):
         run(service.create_inference_task(task, b"data", "file.txt", "text/plain", task.user_id))
 
 
-def test_create_inference_task_uploads_publishes_and_clears_cache():
+def test_create_inference_task_uploads_writes_outbox_and_clears_cache():
     user_id = uuid4()
     model_id = uuid4()
     created = SimpleNamespace(id=uuid4(), user_id=user_id)
-    model = SimpleNamespace(id=model_id, architecture="yolo")
+    model = _system_model(model_id)
 
     task_repo = SimpleNamespace(create_inference_task=AsyncMock(return_value=created))
     storage = SimpleNamespace(upload_file=AsyncMock(return_value="input/path"))
     model_repo = SimpleNamespace(get_model_by_id=AsyncMock(return_value=model))
     dataset_repo = SimpleNamespace()
-    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
-    bobber = _FakeBobberPublisher()
+    cached_model = pack_owned(None, ModelRead.model_validate(model).model_dump_json().encode())
+    cache_repo = SimpleNamespace(
+        get_or_load=AsyncMock(return_value=cached_model),
+        delete=AsyncMock(),
+        delete_pattern=AsyncMock(),
+    )
+    outbox = _FakeOutbox()
+    outbox_at_commit = []
+    uow = SimpleNamespace(commit=AsyncMock(side_effect=lambda: outbox_at_commit.extend(outbox.messages)))
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, bobber)
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, outbox, uow)
     task = TaskCreate(task_type=TaskType.inference, user_id=user_id, model_id=model_id)
 
     result = run(service.create_inference_task(task, b"data", "file.jpg", "image/jpeg", user_id))
 
     assert result == created
-    assert len(bobber.inference_calls) == 1
-    queue, message = bobber.inference_calls[0]
-    assert queue == QueueTypes.inference_queue
+    # сообщение для брокера попадает в ту же фиксацию, что и задача
+    uow.commit.assert_awaited_once()
+    assert outbox_at_commit == outbox.messages
+    assert len(outbox.messages) == 1
+    task_id, queue, message = outbox.messages[0]
+    assert task_id == created.id
+    assert queue == QueueTypes.inference_queue.value
     assert message["task_id"] == str(created.id)
     assert message["task_type"] == TaskType.inference
     assert message["model_id"] == str(model_id)
@@ -85,10 +108,10 @@ def test_create_inference_task_uploads_publishes_and_clears_cache():
     assert message["input_path"] == "input/path"
 
     cache_repo.delete.assert_awaited_once_with(CacheKeysObject.task(task_id=created.id))
-    cache_repo.delete_pattern.assert_awaited_once_with(f"{CacheKeysList.TASKS}:{user_id}:*")
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.TASKS.pattern(user_id))
 
 
-def test_create_training_task_publishes_and_clears_cache():
+def test_create_training_task_writes_outbox_and_clears_cache():
     user_id = uuid4()
     model_id = uuid4()
     dataset_id = uuid4()
@@ -97,11 +120,17 @@ def test_create_training_task_publishes_and_clears_cache():
     task_repo = SimpleNamespace(create_training_task=AsyncMock(return_value=created))
     storage = SimpleNamespace()
     model_repo = SimpleNamespace()
-    dataset_repo = SimpleNamespace(get_dataset_by_id=AsyncMock(return_value=SimpleNamespace(id=dataset_id)))
-    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
-    bobber = _FakeBobberPublisher()
+    dataset_repo = SimpleNamespace(
+        get_dataset_by_id=AsyncMock(return_value=SimpleNamespace(id=dataset_id, user_id=user_id)),
+    )
+    cache_repo = SimpleNamespace(
+        is_known_missing=AsyncMock(return_value=False),
+        delete=AsyncMock(),
+        delete_pattern=AsyncMock(),
+    )
+    outbox = _FakeOutbox()
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, bobber)
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, outbox, AsyncMock())
     task = TaskCreate(
         task_type=TaskType.training,
         user_id=user_id,
@@ -115,9 +144,10 @@ def test_create_training_task_publishes_and_clears_cache():
     result = run(service.create_training_task(task))
 
     assert result == created
-    assert len(bobber.training_calls) == 1
-    queue, message = bobber.training_calls[0]
-    assert queue == QueueTypes.training_queue
+    assert len(outbox.messages) == 1
+    task_id, queue, message = outbox.messages[0]
+    assert task_id == created.id
+    assert queue == QueueTypes.training_queue.value
     assert message["task_id"] == str(created.id)
     assert message["task_type"] == TaskType.training
     assert message["model_id"] == str(model_id)
@@ -128,7 +158,7 @@ def test_create_training_task_publishes_and_clears_cache():
     assert message["name"] == "train-v1"
 
     cache_repo.delete.assert_awaited_once_with(CacheKeysObject.task(task_id=created.id))
-    cache_repo.delete_pattern.assert_awaited_once_with(f"{CacheKeysList.TASKS}:{user_id}:*")
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.TASKS.pattern(user_id))
 
 
 def test_get_task_by_id_uses_cache():
@@ -140,9 +170,11 @@ def test_get_task_by_id_uses_cache():
     storage = SimpleNamespace(get_presigned_file_url=AsyncMock())
     model_repo = SimpleNamespace()
     dataset_repo = SimpleNamespace()
-    cache_repo = SimpleNamespace(get=AsyncMock(return_value=cached), set=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    run(cache_repo.set(CacheKeysObject.task(task_id=task_id),
+                       pack_owned(user_id, TaskRead(**cached).model_dump_json().encode())))
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeBobberPublisher())
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeOutbox(), AsyncMock())
     result = run(service.get_task_by_id(task_id, user_id))
 
     assert result.id == task_id
@@ -158,13 +190,15 @@ def test_get_task_by_id_attaches_output_url_and_writes_cache():
     storage = SimpleNamespace(get_presigned_file_url=AsyncMock(return_value="url"))
     model_repo = SimpleNamespace()
     dataset_repo = SimpleNamespace()
-    cache_repo = SimpleNamespace(get=AsyncMock(return_value=None), set=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeBobberPublisher())
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeOutbox(), AsyncMock())
     result = run(service.get_task_by_id(task_id, user_id))
 
     assert result.output_url == "url"
-    cache_repo.set.assert_awaited_once()
+    owner, body = unpack_owned(run(cache_repo.get(CacheKeysObject.task(task_id=task_id))))
+    assert owner == str(user_id).encode()
+    assert json.loads(body)["output_url"] == "url"
 
 
 def test_delete_task_by_id_clears_task_and_list_cache_patterns():
@@ -181,9 +215,173 @@ def test_delete_task_by_id_clears_task_and_list_cache_patterns():
     dataset_repo = SimpleNamespace()
     cache_repo = SimpleNamespace(get=AsyncMock(), delete_pattern=AsyncMock())
 
-    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeBobberPublisher())
+    service = TaskService(task_repo, storage, model_repo, dataset_repo, cache_repo, _FakeOutbox(), AsyncMock())
     run(service.delete_task_by_id(task_id, user_id))
 
     task_repo.delete_task_by_id.assert_awaited_once_with(task_id)
     cache_repo.delete_pattern.assert_any_await(CacheKeysObject.task(task_id=task_id))
-    cache_repo.delete_pattern.assert_any_await(f"{CacheKeysList.TASKS}:{user_id}:*")
+    cache_repo.delete_pattern.assert_any_await(CacheKeysList.TASKS.pattern(user_id))
+
+
+def test_get_tasks_json_serializes_once_and_serves_cached_bytes():
+    user_id = uuid4()
+    task = SimpleNamespace(id=uuid4(), user_id=user_id, task_type=TaskType.inference, output_path=None)
+
+    task_repo = SimpleNamespace(get_tasks=AsyncMock(return_value=[task]))
+    storage = SimpleNamespace(get_presigned_file_url=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+
+    service = TaskService(task_repo, storage, SimpleNamespace(), SimpleNamespace(), cache_repo, _FakeOutbox(),
+                          AsyncMock())
+    first = run(service.get_tasks_json(user_id, skip=0, limit=10))
+    second = run(service.get_tasks_json(user_id, skip=0, limit=10))
+
+    assert second is first
+    assert json.loads(first)[0]["id"] == str(task.id)
+    task_repo.get_tasks.assert_awaited_once()
+
+
+def test_get_task_json_hides_cached_task_of_another_user():
+    task_id = uuid4()
+    owner_id = uuid4()
+    cached = pack_owned(owner_id, TaskRead(id=task_id, user_id=owner_id,
+                                           task_type=TaskType.inference).model_dump_json().encode())
+
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    run(cache_repo.set(CacheKeysObject.task(task_id=task_id), cached))
+
+    service = TaskService(SimpleNamespace(), SimpleNamespace(), SimpleNamespace(), SimpleNamespace(), cache_repo,
+                          _FakeOutbox(), AsyncMock())
+
+    with pytest.raises(NotFoundError):
+        run(service.get_task_json(task_id, uuid4()))
+
+
+def test_get_task_by_id_remembers_missing_task():
+    task_id = uuid4()
+
+    task_repo = SimpleNamespace(get_task_by_id=AsyncMock(return_value=None))
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+
+    service = TaskService(task_repo, SimpleNamespace(), SimpleNamespace(), SimpleNamespace(), cache_repo,
+                          _FakeOutbox(), AsyncMock())
+
+    for _ in range(3):
+        with pytest.raises(NotFoundError):
+            run(service.get_task_by_id(task_id, uuid4()))
+
+    task_repo.get_task_by_id.assert_awaited_once_with(task_id)
+
+
+def test_get_tasks_page_json_hands_out_cursor_of_last_row():
+    user_id = uuid4()
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    tasks = [
+        SimpleNamespace(id=uuid4(), user_id=user_id, task_type=TaskType.inference, output_path=None,
+                        created_at=created_at - timedelta(minutes=minutes))
+        for minutes in range(2)
+    ]
+
+    task_repo = SimpleNamespace(get_tasks=AsyncMock(side_effect=[tasks, tasks[1:]]))
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = TaskService(task_repo, SimpleNamespace(), SimpleNamespace(), SimpleNamespace(), cache_repo,
+                          _FakeOutbox(), AsyncMock())
+
+    body, cursor = run(service.get_tasks_page_json(user_id, limit=2, cursor=""))
+    assert [item["id"] for item in json.loads(body)] == [str(task.id) for task in tasks]
+    assert decode_cursor(cursor) == (tasks[1].created_at, tasks[1].id)
+
+    body, last = run(service.get_tasks_page_json(user_id, limit=2, cursor=cursor))
+    assert last is None
+    assert task_repo.get_tasks.await_args.kwargs["cursor"] == (tasks[1].created_at, tasks[1].id)
+
+    # офсетный режим не делит ключи с режимом курсора
+    assert CacheKeysList.tasks(user_id=user_id, limit=2) != CacheKeysList.tasks(user_id=user_id, limit=2, cursor="")
+
+
+def test_get_tasks_page_json_rejects_malformed_cursor():
+    task_repo = SimpleNamespace(get_tasks=AsyncMock())
+    service = TaskService(task_repo, SimpleNamespace(), SimpleNamespace(), SimpleNamespace(),
+                          CacheService(base_ttl=10, jitter_ratio=0), _FakeOutbox(), AsyncMock())
+
+    with pytest.raises(ValidationError):
+        run(service.get_tasks_page_json(uuid4(), cursor="not-a-cursor"))
+    task_repo.get_tasks.assert_not_called()
+
+
+def test_delete_tasks_removes_objects_in_batches_and_invalidates_user_once():
+    user_id = uuid4()
+    tasks = [
+        SimpleNamespace(id=uuid4(), input_path="in-1", output_path="out-1"),
+        SimpleNamespace(id=uuid4(), input_path="in-2", output_path=None),
+    ]
+    older_than = datetime.now(timezone.utc)
+
+    task_repo = SimpleNamespace(delete_tasks=AsyncMock(return_value=tasks))
+    storage = SimpleNamespace(delete_files=AsyncMock(return_value=[]))
+    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+
+    service = TaskService(task_repo, storage, SimpleNamespace(), SimpleNamespace(), cache_repo, _FakeOutbox(),
+                          AsyncMock())
+    deleted = run(service.delete_tasks(user_id, status=TaskStatus.failed, older_than=older_than))
+
+    assert deleted == [task.id for task in tasks]
+    task_repo.delete_tasks.assert_awaited_once_with(user_id, task_ids=None, status=TaskStatus.failed.value,
+                                                    older_than=older_than)
+    assert [call.args[0] for call in storage.delete_files.await_args_list] == [["in-1", "in-2"], ["out-1"]]
+    assert cache_repo.delete.await_count == 2
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.TASKS.pattern(user_id))
+
+
+def test_delete_tasks_without_matches_touches_nothing_else():
+    task_repo = SimpleNamespace(delete_tasks=AsyncMock(return_value=[]))
+    storage = SimpleNamespace(delete_files=AsyncMock())
+    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+
+    service = TaskService(task_repo, storage, SimpleNamespace(), SimpleNamespace(), cache_repo, _FakeOutbox(),
+                          AsyncMock())
+
+    assert run(service.delete_tasks(uuid4(), task_ids=[uuid4()])) == []
+    storage.delete_files.assert_not_called()
+    cache_repo.delete_pattern.assert_not_called()
+
+
+def test_create_training_task_rejects_other_users_dataset_and_remembers_missing_one():
+    user_id, foreign_id, missing_id = uuid4(), uuid4(), uuid4()
+    datasets = {foreign_id: SimpleNamespace(id=foreign_id, user_id=uuid4())}
+    dataset_repo = SimpleNamespace(get_dataset_by_id=AsyncMock(side_effect=datasets.get))
+    task_repo = SimpleNamespace(create_training_task=AsyncMock())
+    cache_repo = CacheService(base_ttl=10, jitter_ratio=0)
+    service = TaskService(task_repo, SimpleNamespace(), SimpleNamespace(), dataset_repo, cache_repo, _FakeOutbox(),
+                          AsyncMock())
+
+    for dataset_id in (foreign_id, missing_id, missing_id):
+        task = TaskCreate(task_type=TaskType.training, user_id=user_id, dataset_id=dataset_id)
+        with pytest.raises(NotFoundError):
+            run(service.create_training_task(task))
+
+    # правило то же, что у DatasetService и ModelService; отсутствующий датасет второй раз в БД не ищется
+    assert [call.args[0] for call in dataset_repo.get_dataset_by_id.await_args_list] == [foreign_id, missing_id]
+    task_repo.create_training_task.assert_not_called()
+
+
+def test_task_and_model_loaders_use_their_own_repository_scope():
+    task_id, model_id, user_id = uuid4(), uuid4(), uuid4()
+    task = SimpleNamespace(id=task_id, user_id=user_id, task_type=TaskType.inference, output_path=None)
+    scoped_tasks = SimpleNamespace(get_task_by_id=AsyncMock(return_value=task))
+    scoped_models = SimpleNamespace(get_model_by_id=AsyncMock(return_value=_system_model(model_id)))
+    scopes = []
+
+    @asynccontextmanager
+    async def scope(repo):
+        scopes.append(repo)
+        yield repo
+
+    # репозитории запроса не трогаются: сессию запроса может закрыть отмена первого из ждущих загрузку
+    service = TaskService(SimpleNamespace(), SimpleNamespace(), SimpleNamespace(), SimpleNamespace(),
+                          CacheService(base_ttl=10, jitter_ratio=0), _FakeOutbox(), AsyncMock(),
+                          task_repo_scope=lambda: scope(scoped_tasks), model_repo_scope=lambda: scope(scoped_models))
+
+    assert run(service.get_task_by_id(task_id, user_id)).id == task_id
+    assert run(service._ensure_model_exists(model_id)).id == model_id
+    assert scopes == [scoped_tasks, scoped_models]
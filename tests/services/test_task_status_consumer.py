@@ -0,0 +1,218 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.core.enums import TaskStatus
+from app.infrastructure.services.broker import task_status_consumer
+from app.infrastructure.services.broker.metrics import TaskStatusMetrics
+from tests.utils import run
+
+
+class _RecordingStatusService:
+    batches = []
+
+    def __init__(self, task_repo, cache_repo, uow):
+        pass
+
+    async def apply_updates(self, updates):
+        self.batches.append(list(updates))
+        await asyncio.sleep(0.01)
+        return [SimpleNamespace(id=update["task_id"], status=update["status"]) for update in updates]
+
+
+@asynccontextmanager
+async def _session():
+    yield object()
+
+
+def _consumer(monkeypatch, **kwargs):
+    _RecordingStatusService.batches = []
+    monkeypatch.setattr(task_status_consumer, "TaskStatusService", _RecordingStatusService)
+    return task_status_consumer.BobberTaskStatusConsumer(
+        loop=asyncio.get_running_loop(), session_factory=_session, metrics=TaskStatusMetrics(), **kwargs,
+    )
+
+
+def _payload():
+    return {"value": {"task_id": str(uuid4()), "status": TaskStatus.running.value}}
+
+
+def test_consumer_applies_burst_from_broker_threads_as_batches(monkeypatch):
+    async def scenario():
+        consumer = _consumer(monkeypatch, max_batch_size=50, flush_interval=0.005, workers=1)
+        consumer.start()
+        threads = [
+            threading.Thread(target=lambda: [consumer._on_broker_message(_payload()) for _ in range(30)])
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        await asyncio.sleep(0.05)
+        await consumer.drain()
+        return consumer._metrics
+
+    metrics = run(scenario())
+
+    batches = _RecordingStatusService.batches
+    assert sum(len(batch) for batch in batches) == 60
+    assert len(batches) <= 2
+    assert metrics.batch_size.snapshot()[()]["count"] == len(batches)
+    assert metrics.updates.value("applied") == 60
+    assert metrics.apply_seconds.snapshot()[()]["count"] == 60
+    assert metrics.queue_depth.value() == 0
+
+
+def test_consumer_flushes_full_batch_and_drains_rest_on_shutdown(monkeypatch):
+    async def scenario():
+        consumer = _consumer(monkeypatch, max_batch_size=3, flush_interval=60, workers=1)
+        consumer.start()
+        for _ in range(4):
+            consumer._on_broker_message(_payload())
+        # полная пачка ушла сразу, не дожидаясь таймера
+        await asyncio.sleep(0.005)
+        in_flight = [len(batch) for batch in _RecordingStatusService.batches]
+        await consumer.drain()
+        return in_flight
+
+    in_flight = run(scenario())
+
+    assert in_flight == [3]
+    assert [len(batch) for batch in _RecordingStatusService.batches] == [3, 1]
+
+
+def test_consumer_routes_updates_of_one_task_to_one_worker(monkeypatch):
+    task_id = uuid4()
+
+    async def scenario():
+        consumer = _consumer(monkeypatch, workers=4)
+        for status in (TaskStatus.running, TaskStatus.running, TaskStatus.succeeded):
+            consumer._enqueue({"task_id": task_id, "status": status.value}, 0.0)
+        return [queue.qsize() for queue in consumer._queues]
+
+    # одна очередь - один воркер, поэтому running не обгонит succeeded из соседней транзакции
+    assert sorted(run(scenario())) == [0, 0, 0, 3]
+
+
+def test_full_queue_blocks_subscription_thread_until_workers_catch_up(monkeypatch):
+    async def scenario():
+        consumer = _consumer(monkeypatch, max_batch_size=1, flush_interval=0, workers=1, max_pending=2)
+        consumer.start()
+        subscriber = threading.Thread(target=lambda: [consumer._on_broker_message(_payload()) for _ in range(10)])
+        subscriber.start()
+        await asyncio.sleep(0.015)
+        # каждая пачка применяется 10 мс: поток подписки все еще ждет места, а в очереди не больше max_pending
+        blocked = subscriber.is_alive()
+        depth = consumer._metrics.queue_depth.value()
+        await asyncio.to_thread(subscriber.join)
+        await consumer.drain()
+        return blocked, depth, consumer._metrics
+
+    blocked, depth, metrics = run(scenario())
+
+    assert blocked
+    assert depth <= 2
+    assert metrics.backpressure_waits.value() > 0
+    assert sum(len(batch) for batch in _RecordingStatusService.batches) == 10
+
+
+class _FlakyStatusService(_RecordingStatusService):
+    # первая транзакция падает (например, разрыв соединения), повтор проходит
+    failures = 1
+
+    async def apply_updates(self, updates):
+        if _FlakyStatusService.failures:
+            _FlakyStatusService.failures -= 1
+            raise ConnectionError("connection reset")
+        return await super().apply_updates(updates)
+
+
+class _PoisonStatusService(_RecordingStatusService):
+    # пачка с этим сообщением не применяется никогда
+    poison = "poison"
+
+    async def apply_updates(self, updates):
+        if any(update["task_id"] == self.poison for update in updates):
+            raise ValueError("bad update")
+        return await super().apply_updates(updates)
+
+
+def _batch(*task_ids):
+    return [({"task_id": task_id, "status": TaskStatus.running.value}, 0.0) for task_id in task_ids]
+
+
+def test_consumer_retries_batch_after_failure(monkeypatch):
+    async def scenario():
+        consumer = _consumer(monkeypatch, retry_backoff=0)
+        monkeypatch.setattr(task_status_consumer, "TaskStatusService", _FlakyStatusService)
+        _FlakyStatusService.failures = 1
+        await consumer._apply_batch(_batch("a", "b"))
+        return consumer._metrics
+
+    metrics = run(scenario())
+
+    assert _RecordingStatusService.batches == [[{"task_id": task_id, "status": TaskStatus.running.value}
+                                                for task_id in ("a", "b")]]
+    assert metrics.updates.value("applied") == 2
+    assert metrics.updates.value("failed") == 0
+
+
+def test_consumer_applies_updates_one_by_one_when_batch_keeps_failing(monkeypatch):
+    async def scenario():
+        consumer = _consumer(monkeypatch, retry_attempts=2, retry_backoff=0)
+        monkeypatch.setattr(task_status_consumer, "TaskStatusService", _PoisonStatusService)
+        await consumer._apply_batch(_batch("a", "poison", "b"))
+        return consumer._metrics
+
+    metrics = run(scenario())
+
+    # теряется только сломанное сообщение, остальные применены в исходном порядке
+    assert [[update["task_id"] for update in batch] for batch in _RecordingStatusService.batches] == [["a"], ["b"]]
+    assert metrics.updates.value("applied") == 2
+    assert metrics.updates.value("failed") == 1
+    assert metrics.updates.value("skipped") == 0
+
+
+def _blocked_subscriber(consumer):
+    # единственное место в очереди уже занято - следующее сообщение заставит поток подписки ждать
+    consumer._slots.acquire()
+    subscriber = threading.Thread(target=consumer._on_broker_message, args=(_payload(),))
+    subscriber.start()
+    subscriber.join(0.05)
+    assert subscriber.is_alive()
+    return subscriber
+
+
+def test_close_releases_subscription_thread_waiting_for_slot():
+    loop = asyncio.new_event_loop()
+    consumer = task_status_consumer.BobberTaskStatusConsumer(loop=loop, max_pending=1, metrics=TaskStatusMetrics())
+    subscriber = _blocked_subscriber(consumer)
+
+    consumer.close()
+    subscriber.join(1)
+
+    assert not subscriber.is_alive()
+    loop.close()
+
+
+def test_subscription_thread_drops_update_when_loop_closed_while_waiting():
+    loop = asyncio.new_event_loop()
+    consumer = task_status_consumer.BobberTaskStatusConsumer(loop=loop, max_pending=1, metrics=TaskStatusMetrics())
+    errors = []
+    previous_hook = threading.excepthook
+    threading.excepthook = lambda args: errors.append(args.exc_value)
+    try:
+        subscriber = _blocked_subscriber(consumer)
+        loop.close()
+        consumer._slots.release()
+        subscriber.join(1)
+    finally:
+        threading.excepthook = previous_hook
+
+    assert not subscriber.is_alive()
+    assert errors == []
+    # место, занятое потоком, возвращено: сообщение в закрытый цикл не ушло
+    assert consumer._slots.acquire(blocking=False)
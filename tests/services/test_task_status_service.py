@@ -11,9 +11,9 @@ def test_apply_update_writes_status_and_clears_task_cache():
     task_id = uuid4()
     user_id = uuid4()
     task = SimpleNamespace(id=task_id, user_id=user_id)
-    task_repo = SimpleNamespace(update_task_status=AsyncMock(return_value=task))
+    task_repo = SimpleNamespace(update_task_statuses=AsyncMock(return_value=[task]))
     cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
-    service = TaskStatusService(task_repo, cache_repo)
+    service = TaskStatusService(task_repo, cache_repo, AsyncMock())
 
     result = run(
         service.apply_update(
@@ -27,20 +27,25 @@ def test_apply_update_writes_status_and_clears_task_cache():
     )
 
     assert result is task
-    task_repo.update_task_status.assert_awaited_once_with(
-        task_id=task_id,
-        status=TaskStatus.succeeded.value,
-        output_path="inference/result.json",
-        error_msg=None,
-    )
-    cache_repo.delete.assert_awaited_once_with(CacheKeysObject.task(task_id=task_id))
-    cache_repo.delete_pattern.assert_awaited_once_with(f"{CacheKeysList.TASKS}:{user_id}:*")
+    task_repo.update_task_statuses.assert_awaited_once_with([
+        {
+            "task_id": task_id,
+            "status": TaskStatus.succeeded.value,
+            "output_path": "inference/result.json",
+            "error_msg": None,
+        }
+    ])
+    assert [call.args[0] for call in cache_repo.delete.await_args_list] == [
+        CacheKeysObject.task(task_id=task_id),
+        CacheKeysObject.replica_reads(user_id=user_id),
+    ]
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.TASKS.pattern(user_id))
 
 
 def test_apply_update_returns_none_when_task_is_missing():
-    task_repo = SimpleNamespace(update_task_status=AsyncMock(return_value=None))
+    task_repo = SimpleNamespace(update_task_statuses=AsyncMock(return_value=[]))
     cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
-    service = TaskStatusService(task_repo, cache_repo)
+    service = TaskStatusService(task_repo, cache_repo, AsyncMock())
 
     result = run(
         service.apply_update(
@@ -54,3 +59,36 @@ def test_apply_update_returns_none_when_task_is_missing():
     assert result is None
     cache_repo.delete.assert_not_called()
     cache_repo.delete_pattern.assert_not_called()
+
+
+def test_apply_updates_writes_one_batch_and_clears_each_user_once():
+    user_id = uuid4()
+    first, second = uuid4(), uuid4()
+    tasks = [SimpleNamespace(id=first, user_id=user_id), SimpleNamespace(id=second, user_id=user_id)]
+    task_repo = SimpleNamespace(update_task_statuses=AsyncMock(return_value=tasks))
+    cache_repo = SimpleNamespace(delete=AsyncMock(), delete_pattern=AsyncMock())
+    service = TaskStatusService(task_repo, cache_repo, AsyncMock())
+
+    result = run(
+        service.apply_updates(
+            [
+                {"task_id": str(first), "status": TaskStatus.running.value},
+                {"task_id": str(first), "status": TaskStatus.succeeded.value, "output_path": "out.json"},
+                # пришло позже, но задача уже завершена в этой же пачке
+                {"task_id": str(first), "status": TaskStatus.running.value},
+                {"task_id": str(second), "status": TaskStatus.running.value},
+                {"task_id": "not-a-uuid", "status": TaskStatus.running.value},
+            ]
+        )
+    )
+
+    assert result == tasks
+    [updates] = task_repo.update_task_statuses.await_args.args
+    assert updates == [
+        {"task_id": first, "status": "succeeded", "output_path": "out.json", "error_msg": None},
+        {"task_id": second, "status": "running", "output_path": None, "error_msg": None},
+    ]
+    # две задачи и одно окно чтения с основной базы на пользователя
+    assert cache_repo.delete.await_count == 3
+    cache_repo.delete.assert_any_await(CacheKeysObject.replica_reads(user_id=user_id))
+    cache_repo.delete_pattern.assert_awaited_once_with(CacheKeysList.TASKS.pattern(user_id))
@@ -15,7 +15,7 @@ def test_create_user_existing_email_raises():
     user_repo = SimpleNamespace(get_user_by_email=AsyncMock(return_value=SimpleNamespace(id=uuid4())))
     cache_repo = SimpleNamespace(delete=AsyncMock())
 
-    service = UserService(user_repo, cache_repo)
+    service = UserService(user_repo, cache_repo, AsyncMock())
 
     with pytest.raises(ValidationError):
         run(service.create_user(UserCreate(email="user@example.com", password="pw")))
@@ -29,7 +29,7 @@ def test_create_user_deletes_cache_and_returns_user():
     )
     cache_repo = SimpleNamespace(delete=AsyncMock())
 
-    service = UserService(user_repo, cache_repo)
+    service = UserService(user_repo, cache_repo, AsyncMock())
     result = run(service.create_user(UserCreate(email="user@example.com", password="pw")))
 
     cache_repo.delete.assert_awaited_once_with(CacheKeysObject.user(user_id=created_user.id))
@@ -46,7 +46,7 @@ def test_getters_delegate_to_repo():
     )
     cache_repo = SimpleNamespace(delete=AsyncMock())
 
-    service = UserService(user_repo, cache_repo)
+    service = UserService(user_repo, cache_repo, AsyncMock())
 
     assert run(service.get_user_by_email("user@example.com")) == "email-user"
     assert run(service.get_user_by_id(user_id)) == "id-user"